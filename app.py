@@ -1,768 +1,653 @@
-from flask import Flask, render_template, request
-import pandas as pd
+from flask import Flask, Response, g, jsonify, redirect, render_template, request, stream_with_context
+import logging
 import os
+import time
 
-app = Flask(__name__)
-
-# Define the path to the Excel file in CML
-file_path = '/home/cdsw/sizing.xlsx'
-
-# Load Excel data into memory
-dev_df = pd.read_excel(file_path, sheet_name='DEV')
-
-# Helper function to calculate hardware requirements
-def calculate_requirements(inputs):
-    results = {
-        'nodes': 0,
-        'cpu_cores': 0,
-        'ram_gb': 0,
-        'storage_gb': 0,
-        'nfs_gb': 0,
-        'cdw_local_disk_gb': 0,
-        'warnings': []
-    }
-
-    # Resource calculations for ECS Master/Server
-    ecs_master_cpu = 32
-    ecs_master_ram = 64
-    ecs_master_os_disk = 1000
-    ecs_master_longhorn_disk = 235
+import formula
+import memo
+import metrics
+import schema
+import store
+import workbook
 
-    # Resource calculations for ECS Worker/Agent
-    ecs_worker_nodes = 14
-    ecs_worker_cpu = 64
-    ecs_worker_ram = 256
-    ecs_worker_os_disk = 1000
-    ecs_worker_longhorn_disk = 235
-    ecs_worker_cdw_disk = 630
+_import_started = time.perf_counter()
+log = logging.getLogger(__name__)
 
-    # Add resources for Environment and Embedded Database
-    results['nodes'] += inputs['environment']  # Add the specified number of environment nodes
-    results['storage_gb'] += inputs['embedded_db']  # Add embedded database storage in GB
-
-    # CDW: Data Catalog
-    results['nodes'] += inputs['data_catalog']  # Each Data Catalog adds 1 node
-
-    # CDW: Hive Virtual Warehouse
-    results['nodes'] += inputs['hive_vw']  # Each Hive VW adds 1 node
-
-    # CDW: Hive LITE Executor
-    results['cpu_cores'] += inputs['hive_lite_exec'] * 2  # 2 CPU per Hive LITE Executor
-    results['ram_gb'] += inputs['hive_lite_exec'] * 4    # 4 GB per Hive LITE Executor
+app = Flask(__name__)
 
-    # CDW: Hive PROD Executor
-    results['cpu_cores'] += inputs['hive_prod_exec'] * 8  # 8 CPU per Hive PROD Executor
-    results['ram_gb'] += inputs['hive_prod_exec'] * 32    # 32 GB per Hive PROD Executor
+# Define the path to the Excel file in CML
+file_path = os.environ.get('SIZING_WORKBOOK', '/home/cdsw/sizing.xlsx')
 
-    # CDW: Impala Virtual Warehouse
-    results['nodes'] += inputs['impala_vw']  # Each Impala VW adds 1 node
 
-    # CDW: Impala LITE Executor
-    results['cpu_cores'] += inputs['impala_lite_exec'] * inputs['impala_lite_exec_cpu']
-    results['ram_gb'] += inputs['impala_lite_exec'] * inputs['impala_lite_exec_mem']
+# Reload sizing.xlsx when it changes on disk, without a restart: a watcher
+# thread reads and validates the new file and swaps it in, and requests that
+# started on the old version finish on it (each request pins one snapshot).
+# The serving entry points start the watcher (watch_workbook()); until then,
+# or with SIZING_WATCH_INTERVAL=0, the file is checked (and validated the
+# same way) on each request instead.
+def _prepare(snapshot):
+    # Build what requests read from a new workbook, so a file the catalog or
+    # the formulas reject is never swapped in and the first request after the
+    # swap finds everything ready
+    import catalog
 
-    # CDW: Impala LITE Coordinator
-    results['cpu_cores'] += inputs['impala_lite_coord_qty'] * inputs['impala_lite_coord_cpu']
-    results['ram_gb'] += inputs['impala_lite_coord_qty'] * inputs['impala_lite_coord_mem']
+    with workbook.pinned(snapshot):
+        catalog.current()
+        catalog.profile_set()
+        formula.current()
 
-    # CDW: Impala PROD Executor
-    results['cpu_cores'] += inputs['impala_prod_exec'] * inputs['impala_prod_exec_cpu']
-    results['ram_gb'] += inputs['impala_prod_exec'] * inputs['impala_prod_exec_mem']
 
-    # CDW: Impala PROD Coordinator
-    results['cpu_cores'] += inputs['impala_prod_coord_qty'] * inputs['impala_prod_coord_cpu']
-    results['ram_gb'] += inputs['impala_prod_coord_qty'] * inputs['impala_prod_coord_mem']
+# Excel data is converted to a binary cache once and loaded on first use
+workbook.configure(file_path, sheets=(formula.ROOT_SHEET,) + workbook.PROFILES + ('Resources',),
+                   validate=_prepare)
 
-    # CDW: Data Viz (Small, Medium, Large)
-    results['cpu_cores'] += inputs['data_viz_small'] * 2  # 2 CPU per small Data Viz
-    results['ram_gb'] += inputs['data_viz_small'] * 8     # 8 GB per small Data Viz
 
-    results['cpu_cores'] += inputs['data_viz_medium'] * 4  # 4 CPU per medium Data Viz
-    results['ram_gb'] += inputs['data_viz_medium'] * 16    # 16 GB per medium Data Viz
+def watch_workbook():
+    # Called by the process that serves requests (app_local.py, the gunicorn
+    # post_fork hook, the ASGI lifespan), not at import, so importing the app
+    # from a script or test starts no thread
+    interval = float(os.environ.get('SIZING_WATCH_INTERVAL', 2))
+    if interval > 0:
+        workbook.watch(interval)
 
-    results['cpu_cores'] += inputs['data_viz_large'] * 6  # 6 CPU per large Data Viz
-    results['ram_gb'] += inputs['data_viz_large'] * 24    # 24 GB per large Data Viz
 
-    # CDE: Service
-    results['nodes'] += inputs['cde_service']  # Each CDE service adds 1 node
+# Memoized results and rendered pages, keyed on the canonical input hash and
+# tagged with the workbook version they were computed for. Size 0 disables a cache.
+cache_size = int(os.environ.get('SIZING_CACHE_SIZE', 4096))
+cache_ttl = float(os.environ.get('SIZING_CACHE_TTL', 0)) or None
+result_cache = memo.LRUCache(cache_size, ttl=cache_ttl, version=workbook.version)
+page_cache = memo.LRUCache(int(os.environ.get('SIZING_PAGE_CACHE_SIZE', 512)), ttl=cache_ttl,
+                           version=workbook.version)
 
-    # CDE: Virtual Cluster
-    results['nodes'] += inputs['cde_vc']  # Each virtual cluster adds 1 node
 
-    # CDE: Job Driver
-    results['cpu_cores'] += inputs['job_quantity'] * inputs['job_driver_cpu']  # CPU per Job Driver
-    results['ram_gb'] += inputs['job_quantity'] * inputs['job_driver_mem']     # RAM per Job Driver
+# Second level shared by all worker processes on the host (SQLite in the
+# workbook cache directory). Its entries outlive a restart, so they are also
+# keyed on the code and templates they were rendered with.
+def _release():
+    here = os.path.dirname(os.path.abspath(__file__))
+    names = sorted(name for name in os.listdir(here) if name.endswith('.py')) + \
+        sorted(os.path.join('templates', name) for name in os.listdir(os.path.join(here, 'templates')))
+    return memo.input_key([(name, os.stat(os.path.join(here, name)).st_mtime_ns) for name in names])[:12]
 
-    # CDE: Job Executor
-    results['cpu_cores'] += inputs['job_exec'] * inputs['job_exec_cpu']  # CPU per Job Executor
-    results['ram_gb'] += inputs['job_exec'] * inputs['job_exec_mem']     # RAM per Job Executor
 
-    # Add ECS Master resources
-    results['nodes'] += 1  # 1 master node
-    results['cpu_cores'] += ecs_master_cpu
-    results['ram_gb'] += ecs_master_ram
-    results['storage_gb'] += ecs_master_os_disk + ecs_master_longhorn_disk
+def _shared_cache_path():
+    # Resolved when a connection is opened, so it follows workbook.configure()
+    return os.environ.get('SIZING_SHARED_CACHE') or os.path.join(workbook.default().cache_dir, 'shared.sqlite3')
 
-    # Add ECS Worker resources
-    results['nodes'] += ecs_worker_nodes
-    results['cpu_cores'] += ecs_worker_nodes * ecs_worker_cpu
-    results['ram_gb'] += ecs_worker_nodes * ecs_worker_ram
-    results['storage_gb'] += ecs_worker_nodes * (ecs_worker_os_disk + ecs_worker_longhorn_disk)
-    results['cdw_local_disk_gb'] += ecs_worker_nodes * ecs_worker_cdw_disk
 
-    # CML: Workspace
-    results['nodes'] += inputs['cml_workspace']  # Each workspace adds 1 node
+_release_key = _release()
+shared_cache = memo.SharedCache(
+    _shared_cache_path, int(os.environ.get('SIZING_SHARED_CACHE_SIZE', 20000)), ttl=cache_ttl,
+    version=lambda: '%s/%s' % (workbook.version(), _release_key))
 
-    # CML: XSmall Session (2 CPU, 4 GB)
-    results['cpu_cores'] += inputs['cml_xsmall_session'] * 2  # 2 CPU per XSmall session
-    results['ram_gb'] += inputs['cml_xsmall_session'] * 4     # 4 GB per XSmall session
 
-    # CML: Small Session (4 CPU, 8 GB)
-    results['cpu_cores'] += inputs['cml_small_session'] * 4  # 4 CPU per small session
-    results['ram_gb'] += inputs['cml_small_session'] * 8    # 8 GB per small session
+# Saved runs (store.py), opened on first use
+scenario_store = store.Store(os.environ.get('SIZING_STORE', store.DEFAULT_PATH))
 
-    # CML: Medium Session (6 CPU, 16 GB)
-    results['cpu_cores'] += inputs['cml_medium_session'] * 6  # 6 CPU per medium session
-    results['ram_gb'] += inputs['cml_medium_session'] * 16    # 16 GB per medium session
 
-    # CML: Backup Workspace
-    if inputs['backup_workspace'] > 0:
-        results['nodes'] += inputs['backup_workspace']  # Each backup workspace adds 1 node
+# Cache and workbook figures for /metrics, read when it is scraped
+def _cache_stat(field):
+    def collect():
+        for name, cache in (('results', result_cache), ('pages', page_cache), ('shared', shared_cache)):
+            yield (name,), cache.stats()[field]
+    return collect
 
-    # CML: Model Registry
-    if inputs['model_registry']:
-        results['nodes'] += 1  # Model Registry adds 1 node
 
+for _field, _kind, _help in (
+        ('hits', 'counter', 'Cache lookups that found an entry.'),
+        ('misses', 'counter', 'Cache lookups that found nothing.'),
+        ('evictions', 'counter', 'Entries dropped to stay within maxsize.'),
+        ('expirations', 'counter', 'Entries dropped after their TTL.'),
+        ('invalidations', 'counter', 'Times the cache was cleared for a new workbook version.'),
+        ('size', 'gauge', 'Entries currently held.')):
+    metrics.REGISTRY.register(metrics.Collector(
+        'sizing_cache_%s' % (_field + '_total' if _kind == 'counter' else _field), _help, _kind, ('cache',),
+        _cache_stat(_field)))
 
-    # Check if Internal NFS is used
-    if inputs['internal_nfs']:
-        results['nfs_gb'] += inputs['cml_nfs']
-    else:
-        results['nfs_gb'] = 0  # No contribution from internal NFS if external is used
 
-    # DRS: Control Plane Backup
-    if inputs['drs_backup'] > 0:
-        results['nodes'] += inputs['drs_backup']  # Each control plane backup adds 1 node
+def _workbook_info():
+    stats = workbook.stats()
+    return [((stats['key'], stats['source']), 1)] if stats.get('key') else []
 
 
-    # Add additional OCP Worker resources
-    ocp_worker_nodes = 30
-    ocp_worker_cpu = 32
-    ocp_worker_ram = 128
+metrics.REGISTRY.register(metrics.Collector(
+    'sizing_workbook_load_seconds', 'Time the last workbook load took.',
+    fn=lambda: [((), workbook.stats().get('load_seconds'))]))
+metrics.REGISTRY.register(metrics.Collector(
+    'sizing_workbook_reloads_total', 'Changed workbooks swapped in without a restart.', 'counter',
+    fn=lambda: [((), workbook.stats().get('reloads'))]))
+metrics.REGISTRY.register(metrics.Collector(
+    'sizing_workbook_rejected_total', 'Changed workbooks that failed to load or validate and were not used.',
+    'counter', fn=lambda: [((), workbook.stats().get('rejected'))]))
+metrics.REGISTRY.register(metrics.Collector(
+    'sizing_workbook_info', 'Workbook in use: content key and whether it came from the cache or the xlsx.',
+    labels=('key', 'source'), fn=_workbook_info))
+
+
+@app.before_request
+def start_timer():
+    g.timer = metrics.Timer()
+    workbook.pin()
 
-    results['nodes'] += ocp_worker_nodes
-    results['cpu_cores'] += ocp_worker_nodes * ocp_worker_cpu
-    results['ram_gb'] += ocp_worker_nodes * ocp_worker_ram
 
-    # Add CCU total resources
-    results['ccu_cpu'] = results['cpu_cores'] + 928  # ECS baseline CPU
-    results['ccu_ram'] = results['ram_gb'] + 3648    # ECS baseline RAM
+@app.teardown_request
+def release_workbook(exc=None):
+    workbook.unpin()
 
-    # Add OCP CCU total resources
-    results['ccu_cpu'] += 960  # OCP CPU
-    results['ccu_ram'] += 3840  # OCP RAM
 
-    return results
-# Define the results template as a global variable
-# Create results page with Hardware Dimensioning Output format in one block
-result_template = '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <title>Sizing Results</title>
-    <style>
-        /* General Body Styling */
-        body {
-            background-color: #f4f4f4;
-            font-family: Arial, sans-serif;
-            color: #333;
-        }
+@app.after_request
+def record_timing(response):
+    # Server-Timing lists the phases the view marked plus the total; streamed
+    # responses are timed up to their first byte
+    timer = g.pop('timer', None)
+    if timer is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        response.headers['Server-Timing'] = timer.finish(route, request.method, response.status_code)
+    return response
 
-        .container {
-            max-width: 1200px;
-            margin: 20px auto;
-            padding: 20px;
-            background-color: #ffffff;
-            box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-            border-radius: 8px;
-        }
 
-        h1, h2 {
-            color: #005a8b;
+# Helper function to calculate hardware requirements for one scenario.
+# The model itself lives in engine.py so batches can be sized in one pass;
+# the totals are engine.calculate_batch() of this one scenario, and the
+# Hardware Dimensioning Output comes from the workbook's own CALCULATOR
+# formulas (formula.py) as a separate estimate (catalog.size).
+def calculate_requirements(inputs):
+    import catalog
+
+    key = memo.input_key(inputs)
+    results = result_cache.get(key)
+    if results is None:
+        results = shared_cache.get('results:' + key)
+        if results is not None:
+            result_cache.put(key, results)
+    if results is None:
+        results = catalog.size(inputs)
+        result_cache.put(key, results)
+        shared_cache.put('results:' + key, results)
+    # Callers add to the result, so hand out a copy
+    return dict(results, warnings=list(results['warnings']))
+
+
+def _component_rows(groups, parts):
+    import engine
+
+    return {group: dict(zip(engine.OUTPUTS, row)) for group, row in zip(groups, parts.tolist())}
+
+
+class _Scenario:
+    # A sized scenario kept for incremental updates: the model it was sized
+    # with, its breakdown rows, its totals (engine.calculate_batch, which the
+    # rows sum to) and its CALCULATOR cell values
+    __slots__ = ('model', 'parts', 'totals', 'calc')
+
+    def __init__(self, model, parts, totals, calc):
+        self.model = model
+        self.parts = parts
+        self.totals = totals
+        self.calc = calc
+
+
+def _scenario(inputs):
+    import catalog
+    import engine
+
+    key = 'scenario:' + memo.input_key(inputs)
+    scenario = result_cache.get(key)
+    if scenario is None:
+        model = catalog.current().model
+        parts = model.breakdown(inputs)[0]
+        try:
+            calc = formula.current().calculation()
+            calc.set_inputs(inputs)
+        except formula.FormulaError:
+            calc = None
+        scenario = _Scenario(model, parts, engine.calculate_batch(inputs, model)[0], calc)
+        result_cache.put(key, scenario)
+    return scenario
+
+
+def calculate_delta(base, field=None, value=None):
+    # The base scenario with one field changed: only the breakdown rows and
+    # CALCULATOR outputs that field feeds are recomputed and returned, with
+    # the new totals. The changed scenario is cached in turn, so a form
+    # sending one edit after another always starts from a cached base.
+    import engine
+
+    scenario = _scenario(base)
+    model = scenario.model
+    sheet_outputs = formula.OUTPUT_CELLS
+    if field is None:
+        return {
+            'rows': list(model.groups),
+            'components': _component_rows(model.groups, scenario.parts),
+            'totals': dict(zip(engine.OUTPUTS, scenario.totals.tolist())),
+            'sheet': {name: scenario.calc[ref] for name, ref in sheet_outputs.items()} if scenario.calc else None,
+            'workbook_version': workbook.version(),
         }
+    inputs = dict(base)
+    inputs[field] = value
+    groups = list(model.affected[field])
+    parts = scenario.parts.copy()
+    parts[[model.groups.index(group) for group in groups]] = model.breakdown(inputs, groups)[0]
+    calc = sheet = None
+    if scenario.calc is not None:
+        calc = scenario.calc.copy()
+        changed = set(calc.set_inputs({field: value}))
+        sheet = {name: calc[ref] for name, ref in sheet_outputs.items() if ref in changed}
+    index = [model.groups.index(group) for group in groups]
+    totals = scenario.totals + (parts[index] - scenario.parts[index]).sum(axis=0)
+    result_cache.put('scenario:' + memo.input_key(inputs), _Scenario(model, parts, totals, calc))
+    return {
+        'field': field,
+        'value': value,
+        'components': _component_rows(groups, parts[index]),
+        'totals': dict(zip(engine.OUTPUTS, totals.tolist())),
+        'sheet': sheet,
+        'workbook_version': workbook.version(),
+    }
 
-        h1 {
-            font-size: 28px;
-            border-bottom: 2px solid #005a8b;
-            padding-bottom: 8px;
-        }
 
-        h2 {
-            font-size: 24px;
-            margin-top: 20px;
-            margin-bottom: 10px;
-        }
+def calculate_profiles(inputs):
+    # One scenario against every workbook profile, evaluated in a single
+    # stacked pass; profiles the workbook cannot provide are listed under 'missing'
+    import catalog
+    import engine
+
+    key = 'profiles:' + memo.input_key(inputs)
+    results = result_cache.get(key)
+    if results is None:
+        profiles = catalog.profile_set()
+        rows = profiles.stack.evaluate(inputs)[:, 0, :].tolist() if profiles.stack else []
+        results = {'profiles': {}, 'missing': dict(profiles.missing)}
+        for cat, row in zip(profiles.catalogs, rows):
+            result = dict(zip(engine.OUTPUTS, row))
+            result['node_groups'] = {group: cat.baselines[group]['nodes']
+                                     for group in ('ecs_master', 'ecs_worker', 'ocp_worker')}
+            results['profiles'][cat.profile] = result
+        results['workbook_version'] = profiles.version
+        result_cache.put(key, results)
+    return results
 
-        .results-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-            font-size: 14px;
-        }
 
-        .results-table th, .results-table td {
-            border: 1px solid #ccc;
-            padding: 8px;
-            text-align: center;
-        }
+# Templates live in templates/ and are compiled once by Jinja's template cache.
+# The input form is generated from schema.py; without submitted values or
+# errors it has no per-request data, so that version is rendered a single time.
+_index_page = None
 
-        .results-table th {
-            background-color: #005a8b;
-            color: white;
-            font-weight: bold;
-        }
 
-        .results-table .header {
-            background-color: #e0e0e0;  /* Gray background for section headers */
-            font-weight: bold;
-            text-align: left;
-        }
+def render_form(values=None, errors=None):
+    return render_template('index.html', sections=schema.SECTIONS, values=values or {}, errors=errors or {})
 
-        .results-table .gray {
-            background-color: #e0e0e0;  /* Gray for external NFS rows */
-        }
 
-        .results-table .highlight {
-            background-color: #f0e68c;  /* Highlight for important values */
-        }
+def index_page():
+    global _index_page
+    if _index_page is None:
+        with app.app_context():
+            _index_page = render_form().encode('utf-8')
+    return _index_page
 
-        .results-table .yellow {
-            background-color: #fffdd0;  /* Light yellow background for cells */
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Sizing Results</h1>
-
-        <h2>Hardware Dimensioning Output:</h2>
-        <table class="results-table">
-            <!-- Table Header -->
-            <tr>
-                <th>ECS</th>
-                <th>Nodes</th>
-                <th>Resource</th>
-                <th>Value</th>
-                <th>Metric</th>
-                <th>Remark</th>
-            </tr>
-
-            <!-- Master/Server Section -->
-            <tr class="header">
-                <td rowspan="4">Master/Server</td>
-                <td rowspan="4" class="highlight">1</td>
-                <td>CPU cores</td>
-                <td class="yellow">32</td>
-                <td></td>
-                <td>Each node.</td>
-            </tr>
-            <tr>
-                <td>RAM</td>
-                <td class="yellow">64</td>
-                <td>GB</td>
-                <td>Each node.</td>
-            </tr>
-            <tr>
-                <td>OS Disk</td>
-                <td class="yellow">1000</td>
-                <td>GB</td>
-                <td>Each node. SSD/NVMe is required. If RAID 1, deploy 2 disks.</td>
-            </tr>
-            <tr>
-                <td>Longhorn Disk</td>
-                <td class="yellow">235</td>
-                <td>GB</td>
-                <td>Each node. SSD/NVMe is recommended.</td>
-            </tr>
-
-            <!-- Worker/Agent Section -->
-            <tr class="header">
-                <td rowspan="5">Worker/Agent</td>
-                <td rowspan="5" class="highlight">14</td>
-                <td>CPU cores</td>
-                <td class="yellow">64</td>
-                <td></td>
-                <td>Each node.</td>
-            </tr>
-            <tr>
-                <td>RAM</td>
-                <td class="yellow">256</td>
-                <td>GB</td>
-                <td>Each node.</td>
-            </tr>
-            <tr>
-                <td>OS Disk</td>
-                <td class="yellow">1000</td>
-                <td>GB</td>
-                <td>Each node. SSD/NVMe is recommended. If RAID 1, deploy 2 disks.</td>
-            </tr>
-            <tr>
-                <td>Longhorn Disk</td>
-                <td class="yellow">235</td>
-                <td>GB</td>
-                <td>Each node. SSD/NVMe is recommended. Use Logical Volume Manager (LVM).</td>
-            </tr>
-            <tr>
-                <td>CDW Local Disk</td>
-                <td class="yellow">630</td>
-                <td>GB</td>
-                <td>Each node. SSD/NVMe is recommended. Use Logical Volume Manager (LVM).</td>
-            </tr>
-
-            <!-- External NFS -->
-            <tr class="gray">
-                <td>External NFS</td>
-                <td></td>
-                <td></td>
-                <td>{{ cml_nfs }}</td>
-                <td>GB</td>
-                <td>CML only. Minimum size.</td>
-            </tr>
-
-            <!-- Openshift 4 Worker Section -->
-            <tr class="header">
-                <td rowspan="3">Openshift 4 Worker</td>
-                <td rowspan="3" class="highlight">30</td>
-                <td>CPU cores</td>
-                <td class="yellow">32</td>
-                <td></td>
-                <td>Each node.</td>
-            </tr>
-            <tr>
-                <td>RAM</td>
-                <td class="yellow">128</td>
-                <td>GB</td>
-                <td>Each node.</td>
-            </tr>
-            <tr>
-                <td>CDW 630GB Disk</td>
-                <td class="yellow">1</td>
-                <td>unit</td>
-                <td>Each node. SSD/NVMe is required.</td>
-            </tr>
-
-            <!-- OCS/ODF -->
-            <tr class="gray">
-                <td>OCS/ODF</td>
-                <td></td>
-                <td></td>
-                <td>1525</td>
-                <td>GB</td>
-                <td>Usable Capacity (before applying replication).</td>
-            </tr>
-
-            <!-- CCU Section -->
-            <tr class="header">
-                <td colspan="2">CCU:</td>
-                <td>Total</td>
-                <td>CPU</td>
-                <td>Memory</td>
-                <td></td>
-            </tr>
-            <tr>
-                <td colspan="2">ECS</td>
-                <td></td>
-                <td class="yellow">{{ results['ccu_cpu'] }}</td>
-                <td class="yellow">{{ results['ccu_ram'] }}</td>
-                <td></td>
-            </tr>
-            <tr>
-                <td colspan="2">OCP</td>
-                <td></td>
-                <td class="yellow">960</td>
-                <td class="yellow">3840</td>
-                <td></td>
-            </tr>
-        </table>
-    </div>
-
-
-    {% if results['warnings'] %}
-        <div class="warnings">
-            <h3>Warnings:</h3>
-            {% for warning in results['warnings'] %}
-                <p class="orange">{{ warning }}</p>
-            {% endfor %}
-        </div>
-    {% endif %}
-    <br>
-    <a href="/">Back to Calculator</a>
-</body>
-</html>
-'''
 
 @app.route('/')
 def index():
-    # Expanded input form with detailed CDW, CDE, and CML components
-    from flask import Flask, render_template_string, request
-
-    app = Flask(__name__)
-
-    # Updated template with Cloudera styling
-    html_content = '''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Dynamic Sizing Calculator</title>
-        <style>
-            /* General Body Styling */
-            body {
-                background-color: #f4f4f4;  /* Light grey background */
-                font-family: Arial, sans-serif;
-                margin: 0;
-                padding: 0;
-                color: #333;  /* Darker grey text */
-            }
-
-            /* Container for content */
-            .container {
-                max-width: 1200px;
-                margin: 20px auto;
-                padding: 20px;
-                background-color: #ffffff;  /* White background for content */
-                box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);  /* Soft shadow */
-                border-radius: 8px;
-            }
-
-            /* Header Styling */
-            h1, h2 {
-                color: #005a8b;  /* Cloudera dark blue */
-            }
-
-            h1 {
-                font-size: 28px;
-                border-bottom: 2px solid #005a8b;
-                padding-bottom: 8px;
-            }
-
-            h2 {
-                font-size: 24px;
-                margin-top: 20px;
-                margin-bottom: 10px;
-            }
-
-            /* Input form styling */
-            label {
-                font-weight: bold;
-                display: block;
-                margin-bottom: 5px;
-                margin-top: 10px;
-                color: #005a8b;  /* Cloudera blue */
-            }
-
-            input[type="number"],
-            input[type="text"],
-            select {
-                width: 100%;
-                padding: 8px;
-                margin-bottom: 10px;
-                border: 1px solid #ccc;
-                border-radius: 4px;
-                box-sizing: border-box;
-                font-size: 16px;
-            }
-
-            input[type="checkbox"] {
-                margin-right: 5px;
-            }
-
-            input[type="submit"] {
-                background-color: #005a8b;  /* Cloudera dark blue */
-                color: white;
-                padding: 12px 20px;
-                border: none;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 16px;
-            }
-
-            input[type="submit"]:hover {
-                background-color: #00436a;  /* Darker blue on hover */
-            }
-
-            .yellow {
-                background-color: #fffdd0;  /* Light yellow background */
-            }
-
-            .green {
-                background-color: #d4edda;  /* Light green background */
-            }
-
-            .error {
-                color: red;
-                margin-top: 10px;
-            }
-
-            .output {
-                margin-top: 20px;
-                font-weight: bold;
-            }
-
-            .results-table {
-                width: 100%;
-                border-collapse: collapse;
-                margin-top: 20px;
-            }
-
-            .results-table th, .results-table td {
-                border: 1px solid #ccc;
-                padding: 10px;
-                text-align: left;
-            }
-
-            .results-table th {
-                background-color: #005a8b;  /* Cloudera dark blue */
-                color: white;
-            }
-
-            .results-table td {
-                background-color: #f4f4f4;  /* Light grey for rows */
-            }
-
-            a {
-                color: #005a8b;  /* Cloudera dark blue */
-                text-decoration: none;
-            }
-
-            a:hover {
-                text-decoration: underline;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Dynamic Sizing Calculator</h1>
-            <form action="/calculate" method="post">
-                <!-- Add other inputs here -->
-                <!-- CDW Inputs with Validations -->
-                             <!-- Environment Inputs -->
-                             <h2>Environment Inputs</h2>
-                             <label for="environment">Environment (Min: 1):</label>
-                             <input type="number" name="environment" min="1" value="1" class="green" required><br><br>
-
-                             <label for="embedded_db">Embedded Database (GB, Recommend: 200):</label>
-                             <input type="number" name="embedded_db" min="0" value="200" class="yellow" required><br><br>
-
-
-                            <!-- CDW Inputs -->
-                            <h2>CDW Inputs</h2>
-
-                            <!-- Data Catalog -->
-                            <label for="data_catalog">Data Catalog (Min: 1):</label>
-                            <input type="number" name="data_catalog" min="1" class="green" value="1" required><br><br>
-
-                            <!-- Hive Virtual Warehouse -->
-                            <label for="hive_vw">Hive Virtual Warehouse (Min: 1):</label>
-                            <input type="number" name="hive_vw" min="1" class="yellow" value="1" required><br><br>
-
-                            <!-- Hive LITE Executor -->
-                            <label for="hive_lite_exec">Hive LITE Executor (Min: 1):</label>
-                            <input type="number" name="hive_lite_exec" min="1" class="yellow" value="1" required><br><br>
-
-                            <!-- Hive PROD Executor -->
-                            <label for="hive_prod_exec">Hive PROD Executor (Min: 1):</label>
-                            <input type="number" name="hive_prod_exec" min="1" class="yellow" value="1" required><br><br>
-
-                            <!-- Impala Virtual Warehouse -->
-                            <label for="impala_vw">Impala Virtual Warehouse (Min: 1):</label>
-                            <input type="number" name="impala_vw" min="1" class="green" value="1" required><br><br>
-
-                            <!-- Impala LITE Executor -->
-                            <label for="impala_lite_exec">Impala LITE Executor (Min: 1):</label>
-                            <input type="number" name="impala_lite_exec" min="1" class="yellow" value="1" required><br><br>
+    # Expanded input form with detailed CDW, CDE, and CML components;
+    # ?run=<id> fills it in with the inputs of a saved run
+    run_id = request.args.get('run', type=int)
+    if run_id is None:
+        return Response(index_page(), mimetype='text/html')
+    run = scenario_store.get(run_id)
+    if run is None:
+        return jsonify(error='no saved run %d' % run_id), 404
+    values = {name: ('on' if value else '') if isinstance(value, bool) else value
+              for name, value in run['inputs'].items()}
+    return render_form(values)
 
-                            <label for="impala_lite_exec_cpu">Impala LITE Executor CPU cores (Default: 3):</label>
-                            <input type="number" name="impala_lite_exec_cpu" min="1" class="yellow" value="3"><br><br>
 
-                            <label for="impala_lite_exec_mem">Impala LITE Executor Mem (GB, Default: 25):</label>
-                            <input type="number" name="impala_lite_exec_mem" min="25" class="yellow" value="25"><br><br>
-
-                            <!-- Impala LITE Coordinator -->
-                            <label for="impala_lite_coord_qty">Impala LITE Coordinator Quantity (Default: 2):</label>
-                            <input type="number" name="impala_lite_coord_qty" min="1" class="yellow" value="2"><br><br>
-
-                            <label for="impala_lite_coord_cpu">Impala LITE Coordinator CPU cores (Default: 1):</label>
-                            <input type="number" name="impala_lite_coord_cpu" min="1" class="yellow" value="1"><br><br>
-
-                            <label for="impala_lite_coord_mem">Impala LITE Coordinator Mem (GB, Default: 25):</label>
-                            <input type="number" name="impala_lite_coord_mem" min="25" class="yellow" value="25"><br><br>
-
-                            <!-- Impala PROD Executor Inputs -->
-                            <h2>Impala PROD Executor Inputs</h2>
-
-                            <label for="impala_prod_exec">Impala PROD Executor (Min: 1):</label>
-                            <input type="number" name="impala_prod_exec" min="1" class="yellow" value="1" required><br><br>
-
-                            <label for="impala_prod_exec_cpu">Impala PROD Executor CPU cores (Default: 14):</label>
-                            <input type="number" name="impala_prod_exec_cpu" min="1" class="yellow" value="14" required><br><br>
-
-                            <label for="impala_prod_exec_mem">Impala PROD Executor Mem (GB, Default: 128):</label>
-                            <input type="number" name="impala_prod_exec_mem" min="128" class="yellow" value="128" required><br><br>
-
-                            <!-- Impala PROD Coordinator Inputs -->
-                            <h2>Impala PROD Coordinator Inputs</h2>
-
-                            <label for="impala_prod_coord_qty">Impala PROD Coordinator (Quantity, Default: 2):</label>
-                            <input type="number" name="impala_prod_coord_qty" min="1" class="yellow" value="2" required><br><br>
-
-                            <label for="impala_prod_coord_cpu">Impala PROD Coordinator CPU cores (Default: 14):</label>
-                            <input type="number" name="impala_prod_coord_cpu" min="1" class="yellow" value="14" required><br><br>
-
-                            <label for="impala_prod_coord_mem">Impala PROD Coordinator Mem (GB, Default: 128):</label>
-                            <input type="number" name="impala_prod_coord_mem" min="128" class="yellow" value="128" required><br><br>
-
-                            <!-- Data Viz Inputs -->
-                            <h2>Data Viz Inputs</h2>
-
-                            <label for="data_viz_small">Data Viz (small) 2 CPU, 8GB (Min: 1):</label>
-                            <input type="number" name="data_viz_small" min="1" class="green" value="1" required><br><br>
-
-                            <label for="data_viz_medium">Data Viz (medium) 4 CPU, 16GB (Min: 1):</label>
-                            <input type="number" name="data_viz_medium" min="1" class="green" value="1" required><br><br>
-
-                            <label for="data_viz_large">Data Viz (large) 6 CPU, 24GB (Min: 1):</label>
-                            <input type="number" name="data_viz_large" min="1" class="green" value="1" required><br><br>
-
-                           <!-- CDE Inputs -->
-                           <h2>CDE Inputs</h2>
-
-                           <label for="cde_service">CDE Service (Min: 1):</label>
-                           <input type="number" name="cde_service" min="1" class="green" value="1" required><br><br>
-
-                           <label for="cde_vc">Virtual Cluster (Min: 1):</label>
-                           <input type="number" name="cde_vc" min="1" class="green" value="1" required><br><br>
-
-                           <label for="job_quantity">Quantity of Job(s) (Min: 1):</label>
-                           <input type="number" name="job_quantity" min="1" class="green" value="7" required><br><br>
-
-                           <label for="job_exec">Quantity of Executor(s) (Min: 1):</label>
-                           <input type="number" name="job_exec" min="1" class="green" value="2" required><br><br>
+@app.route('/calculate', methods=['POST'])
+def calculate():
+    # Collect and validate user inputs; invalid fields are shown on the form again
+    import packing
+
+    timer = g.timer
+    try:
+        inputs, node_shape = schema.parse_form(request.form)
+    except schema.ValidationError as exc:
+        timer.lap('parse')
+        page = render_form(request.form, exc.errors)
+        timer.lap('render')
+        return page, 400
+    inputs, node_shape = inputs._asdict(), node_shape._asdict()
+    page_key = memo.input_key(dict(inputs, **node_shape))
+    timer.lap('parse')
+    page = page_cache.get(page_key)
+    if page is None:
+        page = shared_cache.get('page:' + page_key)
+        if page is not None:
+            page_cache.put(page_key, page)
+    if page is not None:
+        timer.lap('cache')
+        return page
 
-                           <label for="job_driver_cpu">Job Driver CPU (Min: 1):</label>
-                           <input type="number" name="job_driver_cpu" min="1" class="green" value="2" required><br><br>
+    # Calculate requirements
+    results = calculate_requirements(inputs)
 
-                           <label for="job_driver_mem">Job Driver Mem (GB, Min: 1):</label>
-                           <input type="number" name="job_driver_mem" min="1" class="green" value="4" required><br><br>
+    # Place the workload pods onto nodes of the requested shape
+    placement = packing.pack(inputs, node_shape)
+    results['packing'] = placement.summary()
+    results['packing']['per_node'] = placement.per_node()
+    for kind, count in placement.unplaced.items():
+        results['warnings'].append('%d %s pod(s) do not fit on a %d CPU / %d GB RAM / %d GB storage node.'
+                                   % (count, kind, node_shape['max_cpu_per_node'], node_shape['max_ram_per_node'],
+                                      node_shape['max_storage_per_node']))
+    timer.lap('compute')
+    page = render_template('results.html', inputs=inputs, node_shape=node_shape, results=results)
+    page_cache.put(page_key, page)
+    shared_cache.put('page:' + page_key, page)
+    timer.lap('render')
+    return page
+
+
+@app.route('/compare', methods=['POST'])
+def compare():
+    # The form's inputs sized against every profile, side by side
+    timer = g.timer
+    try:
+        inputs, _ = schema.parse_form(request.form)
+    except schema.ValidationError as exc:
+        timer.lap('parse')
+        return render_form(request.form, exc.errors), 400
+    timer.lap('parse')
+    results = calculate_profiles(inputs._asdict())
+    timer.lap('compute')
+    page = render_template('profiles.html', results=results)
+    timer.lap('render')
+    return page
+
+
+@app.route('/api/calculate/profiles', methods=['POST'])
+def calculate_profiles_api():
+    # {<form fields>} -> {"profiles": {profile: results}, "missing": {profile: reason}}
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify(error='expected a JSON object'), 400
+    try:
+        inputs = schema.parse_inputs(body)
+    except schema.ValidationError as exc:
+        return jsonify(error='invalid input', fields=exc.errors), 400
+    return jsonify(calculate_profiles(inputs._asdict()))
+
+
+@app.route('/api/calculate/delta', methods=['POST'])
+def calculate_delta_api():
+    # {"base": {<form fields>}, "field": name, "value": v} -> {"components": {row: results},
+    # "totals": results, "sheet": {output: value}} holding only what the change affects;
+    # without "field", the whole breakdown of the base scenario plus "rows", their order
+    import engine
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('base', {}), dict):
+        return jsonify(error='expected a JSON object with a "base" object'), 400
+    values = body.get('base') or {}
+    field = body.get('field')
+    if field is not None and field not in engine.INPUT_INDEX:
+        return jsonify(error='unknown field %r' % (field,)), 400
+    try:
+        base = schema.parse_inputs(values)
+        value = getattr(schema.parse_inputs(dict(values, **{field: body.get('value')})), field) if field else None
+    except schema.ValidationError as exc:
+        return jsonify(error='invalid input', fields=exc.errors), 400
+    return jsonify(calculate_delta(base._asdict(), field, value))
+
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    # Newline-delimited JSON scenarios in, one result line per scenario out,
+    # followed by a {"summary": ...} trailer. Nothing is buffered beyond one chunk.
+    import batch
+
+    chunk_size = request.args.get('chunk', batch.DEFAULT_CHUNK_SIZE, type=int)
+    lines = stream_with_context(batch.stream_ndjson(request.stream, chunk_size=max(chunk_size, 1)))
+    return Response(lines, mimetype='application/x-ndjson')
+
+
+def _download(fmt, tables, filename):
+    # Streams the export; the file starts downloading with its first block
+    import export
+
+    body = stream_with_context(export.stream(fmt, tables))
+    return Response(body, mimetype=export.CONTENT_TYPES[fmt],
+                    headers={'Content-Disposition': 'attachment; filename="%s.%s"' % (filename, fmt)})
+
+
+@app.route('/export/<fmt>', methods=['POST'])
+def export_results(fmt):
+    # The /calculate form's results as a file: XLSX with one sheet per table,
+    # or one table (?table=summary|components|nodes|inputs) as CSV or Parquet
+    import export
+    import packing
+
+    table = request.args.get('table')
+    try:
+        export.require(fmt)
+        if table is not None and table not in export.SCENARIO_TABLES:
+            raise ValueError('unknown table %r; expected one of %s' % (table, ', '.join(export.SCENARIO_TABLES)))
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    except RuntimeError as exc:
+        return jsonify(error=str(exc)), 501
+    try:
+        inputs, node_shape = schema.parse_form(request.form)
+    except schema.ValidationError as exc:
+        return render_form(request.form, exc.errors), 400
+    inputs = inputs._asdict()
+    results = calculate_requirements(inputs)
+    placement = packing.pack(inputs, node_shape._asdict())
+    names = (table,) if table else export.SCENARIO_TABLES if fmt == 'xlsx' else ('summary',)
+    return _download(fmt, export.scenario_tables(inputs, results, placement, names),
+                     'sizing' if len(names) > 1 else 'sizing-' + names[0])
+
+
+@app.route('/api/export/batch', methods=['POST'])
+def export_batch():
+    # Newline-delimited JSON scenarios in, a results file out
+    # (?format=csv|xlsx|parquet): one row per scenario, inputs then outputs
+    import export
+
+    fmt = request.args.get('format', 'csv')
+    try:
+        export.require(fmt)
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    except RuntimeError as exc:
+        return jsonify(error=str(exc)), 501
+    chunk_size = request.args.get('chunk', export.DEFAULT_CHUNK_SIZE, type=int)
+    return _download(fmt, [export.batch_table(request.stream, max(chunk_size, 1))], 'results')
+
+
+@app.route('/api/montecarlo', methods=['POST'])
+def monte_carlo():
+    # {"distributions": {name: "normal(10, 3)", ...}, "samples": N, "seed": S,
+    #  <point values of the other form fields>} -> percentiles of the outputs
+    import montecarlo
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('distributions'), dict):
+        return jsonify(error='expected a JSON object with a "distributions" object'), 400
+    try:
+        inputs = schema.parse_inputs(body)
+    except schema.ValidationError as exc:
+        return jsonify(error='invalid input', fields=exc.errors), 400
+    try:
+        distributions = [montecarlo.parse_distribution('%s=%s' % item) for item in body['distributions'].items()]
+        seed = body.get('seed')
+        return jsonify(montecarlo.simulate(
+            distributions, inputs._asdict(), int(body.get('samples', montecarlo.DEFAULT_SAMPLES)),
+            None if seed is None else int(seed), body.get('outputs') or montecarlo.REPORTED,
+            [float(q) for q in body.get('percentiles') or montecarlo.PERCENTILES]))
+    except (TypeError, ValueError) as exc:
+        return jsonify(error=str(exc)), 400
+
+
+@app.route('/api/projection', methods=['POST'])
+def projection_api():
+    # {"scenarios": [{<form fields>, "id": ..., "growth": {...}}, ...], "growth": {name: spec},
+    #  "months": 36, "nodes": N, "budget": {resource: limit}, <node shape fields>} -> a month-by-month
+    # table (?format=csv|xlsx|parquet); XLSX adds the first month over budget per scenario,
+    # which CSV and Parquet give with ?table=crossings
+    import export
+    import projection
+
+    fmt = request.args.get('format', 'csv')
+    table = request.args.get('table', 'projection')
+    body = request.get_json(silent=True)
+    try:
+        export.require(fmt)
+        if not isinstance(body, dict) or not isinstance(body.get('scenarios'), list):
+            raise ValueError('expected a JSON object with a "scenarios" list')
+        if table not in ('projection', 'crossings'):
+            raise ValueError('unknown table %r; expected projection or crossings' % table)
+        node_shape = schema.parse_node_shape(body)
+        growth = body.get('growth') or {}
+        budget = body.get('budget') or {}
+        if not isinstance(growth, dict) or not isinstance(budget, dict):
+            raise ValueError('growth and budget must be objects')
+        unknown = set(budget) - set(projection.RESOURCE_NAMES)
+        if unknown:
+            raise ValueError('unknown budget resources: %s' % ', '.join(sorted(unknown)))
+        nodes = body.get('nodes')
+        limits = projection.budget_vector(budget, None if nodes is None else int(nodes), node_shape._asdict())
+        series, crossings = projection.tables(body['scenarios'], growth, int(body.get('months', projection.DEFAULT_MONTHS)),
+                                              limits)
+    except schema.ValidationError as exc:
+        return jsonify(error='invalid input', fields=exc.errors), 400
+    except (TypeError, ValueError) as exc:
+        return jsonify(error=str(exc)), 400
+    except RuntimeError as exc:
+        return jsonify(error=str(exc)), 501
+    if fmt == 'xlsx':
+        return _download(fmt, [series, crossings], 'projection')
+    if table == 'crossings':
+        # The crossings are collected while the series is sized
+        return _download(fmt, [crossings._replace(chunks=_drain(series.chunks, crossings.chunks))], 'crossings')
+    return _download(fmt, [series], 'projection')
+
+
+def _drain(first, then):
+    for _ in first:
+        pass
+    yield from then
+
+
+def _store_filters():
+    return {name: request.args.get(name) for name in ('customer', 'tag', 'since', 'until')}
+
+
+@app.route('/scenarios', methods=['POST'])
+def save_form():
+    # Save button of the results page: stores the run and opens the form filled in from it
+    try:
+        inputs = schema.parse_inputs(request.form)._asdict()
+    except schema.ValidationError as exc:
+        return render_form(request.form, exc.errors), 400
+    run_id, _ = scenario_store.save(inputs, calculate_requirements(inputs), request.form.get('customer', ''),
+                                    request.form.get('tag', ''), workbook.version())
+    return redirect('/?run=%d' % run_id, 303)
+
+
+@app.route('/api/scenarios', methods=['POST'])
+def save_scenario():
+    # {<form fields>, "customer": ..., "tag": ...} -> the run it was saved as,
+    # or the existing run with the same inputs, workbook, customer and tag
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify(error='expected a JSON object'), 400
+    customer, tag = body.get('customer') or '', body.get('tag') or ''
+    if not isinstance(customer, str) or not isinstance(tag, str):
+        return jsonify(error='customer and tag must be strings'), 400
+    try:
+        inputs = schema.parse_inputs(body)._asdict()
+    except schema.ValidationError as exc:
+        return jsonify(error='invalid input', fields=exc.errors), 400
+    results = calculate_requirements(inputs)
+    run_id, new = scenario_store.save(inputs, results, customer, tag, workbook.version())
+    return jsonify(dict(scenario_store.get(run_id), new=new)), 201 if new else 200
 
-                           <label for="job_exec_cpu">Job Executor CPU (Min: 1):</label>
-                           <input type="number" name="job_exec_cpu" min="1" class="green" value="2" required><br><br>
 
-                           <label for="job_exec_mem">Job Executor Mem (GB, Min: 1):</label>
-                           <input type="number" name="job_exec_mem" min="1" class="green" value="20" required><br><br>
+@app.route('/api/scenarios')
+def list_scenarios():
+    # Newest first; filter by ?customer= ?tag= ?since= ?until= (ISO dates),
+    # page with ?limit= and the "next" cursor of the previous page
+    try:
+        return jsonify(scenario_store.page(request.args.get('limit', store.PAGE_SIZE, type=int),
+                                           request.args.get('cursor'), **_store_filters()))
+    except store.StoreError as exc:
+        return jsonify(error=str(exc)), 400
 
-                            <!-- CML Inputs with Validations -->
-                            <h2>CML Inputs</h2>
-                            <label for="cml_workspace">Workspace (Min: 1):</label>
-                            <input type="number" name="cml_workspace" min="1" class="green" value="1" required><br><br>
 
-                            <label for="cml_xsmall_session">XSmall Session (2 CPU, 4 GB, Min: 1):</label>
-                            <input type="number" name="cml_xsmall_session" min="1" class="yellow" value="2" required><br><br>
+@app.route('/api/scenarios/<int:run_id>')
+def get_scenario(run_id):
+    run = scenario_store.get(run_id)
+    if run is None:
+        return jsonify(error='no saved run %d' % run_id), 404
+    return jsonify(run)
 
-                            <label for="cml_small_session">Small Session (4 CPU, 8 GB, Min: 1):</label>
-                            <input type="number" name="cml_small_session" min="1" class="yellow" value="2" required><br><br>
 
-                            <label for="cml_medium_session">Medium Session (6 CPU, 16 GB, Min: 1):</label>
-                            <input type="number" name="cml_medium_session" min="1" class="yellow" value="3" required><br><br>
+@app.route('/api/scenarios/export')
+def export_scenarios():
+    # Every matching run as NDJSON, streamed from the database in batches
+    try:
+        lines = stream_with_context(scenario_store.export_ndjson(**_store_filters()))
+    except store.StoreError as exc:
+        return jsonify(error=str(exc)), 400
+    return Response(lines, mimetype='application/x-ndjson')
 
-                            <label for="cml_nfs">NFS (GB, Min: 100):</label>
-                            <input type="number" name="cml_nfs" min="100" class="yellow" value="100" required><br><br>
 
-                            <label for="internal_nfs">Use Internal NFS:</label>
-                            <input type="checkbox" name="internal_nfs" value="on"><br><br>
+@app.route('/api/scenarios/import', methods=['POST'])
+def import_scenarios():
+    # NDJSON runs, as exported, in; lines without results are sized (totals only)
+    summary = scenario_store.import_ndjson(request.stream, size=store.size_totals)
+    return jsonify(summary)
 
-                            <label for="backup_workspace">Backup Workspace (Quantity, Min: 0):</label>
-                            <input type="number" name="backup_workspace" min="0" class="yellow" value="0" required><br><br>
 
-                            <label for="model_registry">Model Registry (Tick to use):</label>
-                            <input type="checkbox" name="model_registry"><br><br>
+@app.route('/api/solve', methods=['POST'])
+def solve():
+    # Inverse sizing: {"nodes": N, "components": [...], <form fields>} -> maxima and Pareto set
+    import solver
 
-                            <!-- DRS Inputs -->
-                            <h2>DRS Backup</h2>
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify(error='expected a JSON object'), 400
+    try:
+        inputs, node_shape = schema.parse_form(body)
+    except schema.ValidationError as exc:
+        return jsonify(error='invalid input', fields=exc.errors), 400
+    try:
+        components = body.get('components') or []
+        if not components:
+            raise ValueError('components is required')
+        return jsonify(solver.solve(inputs._asdict(), components, int(body['nodes']), node_shape._asdict()))
+    except KeyError:
+        return jsonify(error='nodes is required'), 400
+    except (TypeError, ValueError) as exc:
+        return jsonify(error=str(exc)), 400
 
-                            <label for="drs_backup">Number of Control Plane Backup(s) (Min: 0):</label>
-                            <input type="number" name="drs_backup" min="0" class="yellow" value="0" required><br><br>
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(results=result_cache.stats(), pages=page_cache.stats(), shared=shared_cache.stats())
 
-                            <!-- Hardware Specifications -->
-                            <h3>Hardware Specifications</h3>
-                            <label for="max_cpu_per_node">Max CPU per Node:</label>
-                            <input type="number" name="max_cpu_per_node" min="1" value="32" required><br><br>
 
-                            <label for="max_ram_per_node">Max RAM (GB) per Node:</label>
-                            <input type="number" name="max_ram_per_node" min="1" value="128" required><br><br>
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
 
-                            <label for="max_storage_per_node">Max Storage (GB) per Node:</label>
-                            <input type="number" name="max_storage_per_node" min="1" value="2000" required><br><br>
-                <input type="submit" value="Calculate">
-            </form>
-        </div>
-    </body>
-    </html>
-    '''
-    return render_template_string(html_content)
-@app.route('/calculate', methods=['POST'])
-def calculate():
-    # Collect user inputs
-    inputs = {
-        'environment': int(request.form.get('environment', 1)),
-        'embedded_db': int(request.form.get('embedded_db', 200)),
-        'data_catalog': int(request.form.get('data_catalog', 1)),
-        'hive_vw': int(request.form.get('hive_vw', 1)),
-        'hive_lite_exec': int(request.form.get('hive_lite_exec', 1)),
-        'hive_prod_exec': int(request.form.get('hive_prod_exec', 1)),
-        'impala_vw': int(request.form.get('impala_vw', 1)),
-        'impala_lite_exec': int(request.form.get('impala_lite_exec', 1)),
-        'impala_lite_exec_cpu': int(request.form.get('impala_lite_exec_cpu', 3)),
-        'impala_lite_exec_mem': int(request.form.get('impala_lite_exec_mem', 25)),
-        'impala_lite_coord_qty': int(request.form.get('impala_lite_coord_qty', 2)),
-        'impala_lite_coord_cpu': int(request.form.get('impala_lite_coord_cpu', 1)),
-        'impala_lite_coord_mem': int(request.form.get('impala_lite_coord_mem', 25)),
-        'impala_prod_exec': int(request.form.get('impala_prod_exec', 1)),
-        'impala_prod_exec_cpu': int(request.form.get('impala_prod_exec_cpu', 14)),
-        'impala_prod_exec_mem': int(request.form.get('impala_prod_exec_mem', 128)),
-        'impala_prod_coord_qty': int(request.form.get('impala_prod_coord_qty', 2)),
-        'impala_prod_coord_cpu': int(request.form.get('impala_prod_coord_cpu', 14)),
-        'impala_prod_coord_mem': int(request.form.get('impala_prod_coord_mem', 128)),
-        'data_viz_small': int(request.form.get('data_viz_small', 1)),
-        'data_viz_medium': int(request.form.get('data_viz_medium', 1)),
-        'data_viz_large': int(request.form.get('data_viz_large', 1)),
-        'cde_service': int(request.form.get('cde_service', 1)),
-        'cde_vc': int(request.form.get('cde_vc', 1)),
-        'job_quantity': int(request.form.get('job_quantity', 1)),
-        'job_exec': int(request.form.get('job_exec', 1)),
-        'job_driver_cpu': int(request.form.get('job_driver_cpu', 2)),
-        'job_driver_mem': int(request.form.get('job_driver_mem', 4)),
-        'job_exec_cpu': int(request.form.get('job_exec_cpu', 2)),
-        'job_exec_mem': int(request.form.get('job_exec_mem', 20)),
-        'cml_workspace': int(request.form.get('cml_workspace', 1)),
-        'cml_xsmall_session': int(request.form.get('cml_xsmall_session', 2)),
-        'cml_small_session': int(request.form.get('cml_small_session', 2)),
-        'cml_medium_session': int(request.form.get('cml_medium_session', 3)),
-        'cml_nfs': int(request.form.get('cml_nfs', 100)),
-        'internal_nfs': request.form.get('internal_nfs') == 'on',
-        'backup_workspace': int(request.form.get('backup_workspace', 0)),
-        'model_registry': request.form.get('model_registry') == 'on',
-        'drs_backup': int(request.form.get('drs_backup', 0))
-    }
 
+# Pre-render the static form at startup so GET / is a plain byte send
+index_page()
 
-    # Calculate requirements
-    results = calculate_requirements(inputs)
-    return render_template_string(result_template, inputs=inputs, results=results)
+log.info('app imported in %.3fs', time.perf_counter() - _import_started)
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    watch_workbook()
     # For CML, use host='0.0.0.0' to ensure the app is accessible
     app.run(host='0.0.0.0', port=5000, debug=True)
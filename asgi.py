@@ -0,0 +1,368 @@
+"""ASGI entry point: non-blocking batch and sweep APIs next to the Flask app.
+
+Long batch and sweep calls run on the event loop, which only moves bytes:
+parsing, sizing and formatting of each chunk happen in a process pool
+running at a lower CPU priority, one chunk ahead of the client, so a
+streaming job holds no worker thread and interactive pages are not
+starved while it runs.  Every other route is passed to the Flask app in a
+thread pool, with the request body and the response streamed through it
+block by block, so an export or import never sits whole in memory here.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+POST /api/calculate/batch  NDJSON in, NDJSON out (same format as the Flask route)
+POST /api/sweep            {"axes": ["impala_prod_exec=1..64", ...], "lhs": N, "seed": S} -> CSV
+"""
+import asyncio
+import collections
+import contextvars
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import batch
+import engine
+import metrics
+import sweep
+import workbook
+
+log = logging.getLogger(__name__)
+
+PROCESSES = int(os.environ.get('SIZING_ASGI_PROCESSES', os.cpu_count() or 1))
+THREADS = int(os.environ.get('SIZING_ASGI_THREADS', 8))
+# Sizing processes run this much nicer than the server so interactive requests come first
+NICENESS = int(os.environ.get('SIZING_ASGI_NICE', 5))
+MAX_SWEEP_POINTS = int(os.environ.get('SIZING_MAX_SWEEP_POINTS', 100000000))
+
+
+def _init_worker(path, sheets, niceness):
+    if niceness:
+        try:
+            os.nice(niceness)
+        except (AttributeError, OSError):
+            pass
+    workbook.configure(path, sheets=sheets)
+
+
+def _sweep_chunk(axes, lhs, plan, start, stop):
+    # One chunk of a sweep as CSV text; the Sweep is rebuilt from its specs in the worker
+    grid = sweep.Sweep([sweep.parse_axis(spec) for spec in axes])
+    X = grid.lhs_rows(plan, lhs, start, stop) if lhs else grid.grid_rows(start, stop)
+    return sweep.csv_rows(sweep.size(grid, X))
+
+
+async def _lines(receive):
+    # Request body split into lines as it arrives
+    buffer = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        buffer += message.get('body', b'')
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line
+        if not message.get('more_body'):
+            break
+    if buffer:
+        yield buffer
+
+
+async def _body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _start(send, status, content_type, headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type.encode())] + list(headers)})
+
+
+async def _json(send, status, payload):
+    await _start(send, status, 'application/json')
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode()})
+
+
+def _query(scope, name, default, kind=int):
+    values = parse_qs(scope.get('query_string', b'').decode('latin-1')).get(name)
+    try:
+        return kind(values[0]) if values else default
+    except ValueError:
+        return default
+
+
+class _RequestBody:
+    # wsgi.input of a passed-through request. Read from a pool thread, it
+    # takes the body from the ASGI receive channel one message at a time, as
+    # the Flask app asks for it.
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b''
+        self._done = False
+
+    def _fill(self):
+        # One more message into the buffer; False once the body has ended
+        if self._done:
+            return False
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message['type'] == 'http.disconnect' or not message.get('more_body'):
+            self._done = True
+        self._buffer += message.get('body', b'')
+        return True
+
+    def _take(self, end):
+        data, self._buffer = self._buffer[:end], self._buffer[end:]
+        return data
+
+    def read(self, size=-1):
+        while (size is None or size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        return self._take(len(self._buffer) if size is None or size < 0 else size)
+
+    def readline(self, size=-1):
+        while b'\n' not in self._buffer and (size is None or size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        return self._take(end if size is None or size < 0 else min(end, size))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
+def _environ(scope, body):
+    # body: file-like wsgi.input; it ends with the request, so it is marked
+    # terminated and a chunked upload (no Content-Length) is read as well
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+        else:
+            key = 'HTTP_' + name
+            environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+class SizingASGI:
+    def __init__(self, wsgi_app=None, processes=PROCESSES, threads=THREADS, on_startup=None):
+        self.wsgi_app = wsgi_app
+        self.on_startup = on_startup  # run in the serving process when the server starts
+        self.processes = processes
+        self._threads = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+        self._pool = None
+        self.routes = {
+            ('POST', '/api/calculate/batch'): self.calculate_batch,
+            ('POST', '/api/sweep'): self.sweep,
+        }
+
+    @property
+    def pool(self):
+        # Created on first use, i.e. in the serving process after any server fork
+        if self._pool is None:
+            book = workbook.default()
+            self._pool = ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                             initargs=(book.path, book.sheet_names, NICENESS))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._threads.shutdown(wait=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    if self.on_startup is not None:
+                        self.on_startup()
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    self.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is not None:
+            await self.timed(handler, scope, receive, send)
+        elif self.wsgi_app is not None:
+            await self.wsgi(scope, receive, send)
+        else:
+            await _json(send, 404, {'error': 'not found'})
+
+    async def timed(self, handler, scope, receive, send):
+        # Same request metrics as the Flask routes; the headers are already
+        # gone by the time a stream ends, so there is no Server-Timing here
+        timer = metrics.Timer()
+        status = [500]
+
+        async def send_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await handler(scope, receive, send_status)
+        finally:
+            timer.finish(scope['path'], scope['method'], status[0])
+
+    async def wsgi(self, scope, receive, send):
+        # The Flask app runs in the thread pool: each block of the response is
+        # pulled there and sent as it comes, and the request body is read as
+        # the app asks for it. All of a request's calls share one context, as
+        # stream_with_context needs.
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        started = []
+
+        def call(fn, *args):
+            return loop.run_in_executor(self._threads, context.run, fn, *args)
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        result = await call(self.wsgi_app, _environ(scope, _RequestBody(receive, loop)), start_response)
+        try:
+            blocks = iter(result)
+            block = await call(next, blocks, None)
+            status, headers = started
+            await send({'type': 'http.response.start', 'status': int(status.split(' ', 1)[0]),
+                        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                    for name, value in headers]})
+            while block is not None:
+                if block:
+                    await send({'type': 'http.response.body', 'body': block, 'more_body': True})
+                block = await call(next, blocks, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await call(result.close)
+
+    async def calculate_batch(self, scope, receive, send):
+        # Chunk n is sized in the pool while chunk n+1 is read; results go out in input order
+        chunk_size = max(_query(scope, 'chunk', batch.DEFAULT_CHUNK_SIZE), 1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        total = errors = 0
+        numbered = []
+        pending = None
+        await _start(send, 200, 'application/x-ndjson')
+
+        async def flush():
+            nonlocal errors
+            block, failed = await pending
+            errors += failed
+            await send({'type': 'http.response.body', 'body': block.encode(), 'more_body': True})
+
+        try:
+            line_no = 0
+            async for line in _lines(receive):
+                line_no += 1
+                if not line.strip():
+                    continue
+                numbered.append((line_no, line))
+                if len(numbered) >= chunk_size:
+                    if pending is not None:
+                        await flush()
+                    pending = loop.run_in_executor(self.pool, batch.size_lines, numbered)
+                    total += len(numbered)
+                    numbered = []
+            if numbered:
+                if pending is not None:
+                    await flush()
+                pending = loop.run_in_executor(self.pool, batch.size_lines, numbered)
+                total += len(numbered)
+            if pending is not None:
+                await flush()
+                pending = None
+            trailer = batch.summary(total, errors, loop.time() - start)
+            await send({'type': 'http.response.body', 'body': trailer.encode()})
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def sweep(self, scope, receive, send):
+        try:
+            body = json.loads(await _body(receive) or b'{}')
+            axes = body.get('axes') if isinstance(body, dict) else None
+            if not axes or not isinstance(axes, list) or not all(isinstance(spec, str) for spec in axes):
+                raise ValueError('axes must be a non-empty list such as ["impala_prod_exec=1..64"]')
+            grid = sweep.Sweep([sweep.parse_axis(spec) for spec in axes])
+            lhs = int(body.get('lhs') or 0)
+            chunk_size = max(int(body.get('chunk') or sweep.DEFAULT_CHUNK_SIZE), 1)
+            points = lhs or grid.size
+            if lhs < 0 or points > MAX_SWEEP_POINTS:
+                raise ValueError('sweep must have between 1 and %d points, got %d' % (MAX_SWEEP_POINTS, points))
+            plan = grid.lhs_plan(lhs, body.get('seed')) if lhs else None
+        except (TypeError, ValueError) as exc:
+            await _json(send, 400, {'error': str(exc)})
+            return
+
+        # Up to one chunk per pool process in flight, sent in order
+        loop = asyncio.get_running_loop()
+        await _start(send, 200, 'text/csv')
+        header = ','.join(grid.names + list(engine.OUTPUTS)) + '\n'
+        await send({'type': 'http.response.body', 'body': header.encode(), 'more_body': True})
+        starts = iter(range(0, points, chunk_size))
+        pending = collections.deque()
+        try:
+            while True:
+                while len(pending) < self.processes:
+                    start = next(starts, None)
+                    if start is None:
+                        break
+                    stop = min(start + chunk_size, points)
+                    window = sweep.Sweep.lhs_window(plan, start, stop) if lhs else None
+                    pending.append(loop.run_in_executor(self.pool, _sweep_chunk, axes, lhs, window, start, stop))
+                if not pending:
+                    break
+                block = await pending.popleft()
+                await send({'type': 'http.response.body', 'body': block.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def create_app():
+    import app as flask_app
+
+    # The workbook watcher starts with the server, in the process that serves
+    return SizingASGI(flask_app.app, on_startup=flask_app.watch_workbook)
+
+
+app = create_app()
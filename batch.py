@@ -0,0 +1,103 @@
+"""Streaming NDJSON batch sizing.
+
+Scenarios are read one JSON object per line and sized in chunks through
+engine.calculate_batch().  Everything is a generator: the next chunk of
+input is only read once the results of the previous one have been taken
+by the consumer, so a slow reader throttles the producer and neither side
+ever holds more than one chunk in memory.
+"""
+import json
+import time
+
+import numpy as np
+
+import engine
+import schema
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Result lines are formatted directly; outputs are plain ints or floats
+_RESULT_FORMAT = '{"line": %d, ' + ', '.join('"%s": %%r' % name for name in engine.OUTPUTS) + '%s}'
+
+
+def size_chunk(numbered):
+    # numbered: list of (line number, raw line or record) -> list of (line
+    # number, scenario id, schema.Inputs record or the error, outputs or None),
+    # every valid scenario sized in one engine.calculate_batch() call
+    parsed = [(line_no,) + parse_line(line) for line_no, line in numbered]
+    good = [entry[2] for entry in parsed if not isinstance(entry[2], Exception)]
+    rows = iter(engine.calculate_batch(np.array(good, dtype=np.int64)).tolist() if good else ())
+    return [(line_no, scenario_id, row, None if isinstance(row, Exception) else next(rows))
+            for line_no, scenario_id, row in parsed]
+
+
+def _format(sized):
+    out = []
+    for line_no, scenario_id, row, outputs in sized:
+        extra = ', "id": %s' % json.dumps(scenario_id) if scenario_id is not None else ''
+        if outputs is not None:
+            out.append(_RESULT_FORMAT % ((line_no,) + tuple(outputs) + (extra,)))
+        elif isinstance(row, schema.ValidationError):
+            out.append('{"line": %d, "error": %s, "fields": %s%s}'
+                       % (line_no, json.dumps(str(row)), json.dumps(row.errors), extra))
+        else:
+            out.append('{"line": %d, "error": %s%s}' % (line_no, json.dumps(str(row)), extra))
+    return '\n'.join(out) + '\n'
+
+
+def parse_line(line):
+    # One NDJSON line, or an already decoded record -> (scenario id,
+    # schema.Inputs record or the ValueError it raised).
+    # Fields are validated against schema.py exactly as for the form.
+    scenario_id = None
+    try:
+        values = json.loads(line) if isinstance(line, (str, bytes)) else line
+        if not isinstance(values, dict):
+            raise ValueError('expected a JSON object')
+        scenario_id = values.get('id')
+        return scenario_id, schema.parse_inputs(values)
+    except ValueError as exc:
+        return scenario_id, exc
+
+
+def size_lines(numbered):
+    # numbered: list of (line number, raw line) -> (NDJSON block, error count).
+    # Self-contained so a chunk can be sized in another process.
+    sized = size_chunk(numbered)
+    return _format(sized), sum(entry[3] is None for entry in sized)
+
+
+def summary(total, errors, seconds):
+    return json.dumps({'summary': {
+        'scenarios': total,
+        'errors': errors,
+        'seconds': round(seconds, 6),
+        'scenarios_per_second': round(total / seconds, 1) if seconds > 0 else None,
+    }}) + '\n'
+
+
+def numbered_chunks(lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Non-blank lines as lists of (line number, line), chunk_size at a time;
+    # already decoded records (dicts) pass through as they are
+    numbered = []
+    for line_no, line in enumerate(lines, 1):
+        if isinstance(line, (str, bytes)) and not line.strip():
+            continue
+        numbered.append((line_no, line))
+        if len(numbered) >= chunk_size:
+            yield numbered
+            numbered = []
+    if numbered:
+        yield numbered
+
+
+def stream_ndjson(lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Yields one NDJSON text block per chunk, then a summary trailer line
+    start = time.perf_counter()
+    total = errors = 0
+    for numbered in numbered_chunks(lines, chunk_size):
+        block, failed = size_lines(numbered)
+        total += len(numbered)
+        errors += failed
+        yield block
+    yield summary(total, errors, time.perf_counter() - start)
@@ -0,0 +1,272 @@
+"""Benchmarks for the sizing hot paths.
+
+Each benchmark times one operation (workbook load, a single sizing call,
+form parsing, template rendering, a request through the Flask test client,
+a batch of N scenarios) and reports the median time per operation over
+several repeats.  Results are written as JSON and can be compared against
+a stored baseline, flagging anything slower than the tolerance allows.
+
+    python bench.py --out bench.json
+    python bench.py --compare bench_baseline.json --check
+    python bench.py --save bench_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import workbook
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000, 1000000)
+DEFAULT_TOLERANCE = 0.25
+
+# Every benchmark calibrates its loop to run at least this long per repeat
+_MIN_SECONDS = 0.05
+
+
+def measure(fn, repeat=5, number=None):
+    # -> seconds per call for each repeat; number is calibrated when not given
+    if number is None:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - start >= _MIN_SECONDS or number >= 1 << 20:
+                break
+            number *= 4
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+
+def _result(times, items=1):
+    median = statistics.median(times)
+    return {
+        'seconds': median,
+        'min_seconds': min(times),
+        'per_second': items / median if median else None,
+        'items': items,
+        'repeats': len(times),
+    }
+
+
+def _form(inputs):
+    # calculate() form data: checkboxes are only sent when ticked
+    form = {}
+    for name, value in inputs.items():
+        if isinstance(value, bool):
+            if value:
+                form[name] = 'on'
+        else:
+            form[name] = str(value)
+    return form
+
+
+def bench_import(path, repeat):
+    # Fresh interpreter importing the app, which pre-renders the form; the
+    # workbook itself is loaded from the binary cache on first use
+    code = 'import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)'
+    env = dict(os.environ, SIZING_WORKBOOK=path)
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], cwd=here, env=env, check=True,
+                             capture_output=True, text=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return _result(times)
+
+
+def bench_workbook(path, repeat):
+    sheets = ('CALCULATOR', 'DEV', 'Resources')
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def cold():
+            book = workbook.Workbook(path, sheets=sheets, cache_dir=tempfile.mkdtemp(dir=cache_dir))
+            book.sheet('DEV')
+
+        results['workbook_load_xlsx'] = _result(measure(cold, repeat=repeat, number=1))
+        workbook.Workbook(path, sheets=sheets, cache_dir=cache_dir).sheet('DEV')
+
+        def warm():
+            workbook.Workbook(path, sheets=sheets, cache_dir=cache_dir).sheet('DEV')
+
+        results['workbook_load_cache'] = _result(measure(warm, repeat=repeat))
+    return results
+
+
+def bench_app(repeat):
+    import app
+    import engine
+    import formula
+    import packing
+    import schema
+
+    from werkzeug.datastructures import MultiDict
+
+    results = {}
+    inputs = dict(engine.INPUT_DEFAULTS)
+    form = _form(inputs)
+    multidict = MultiDict(form)
+
+    def uncached():
+        app.result_cache.clear()
+        app.calculate_requirements(inputs)
+
+    results['calculate_requirements'] = _result(measure(uncached, repeat=repeat))
+    app.calculate_requirements(inputs)
+    results['calculate_requirements_cached'] = _result(
+        measure(lambda: app.calculate_requirements(inputs), repeat=repeat))
+    results['parse_form'] = _result(measure(lambda: schema.parse_form(multidict), repeat=repeat))
+
+    req = app.calculate_requirements(inputs)
+    placement = packing.pack(inputs)
+    req['packing'] = placement.summary()
+    req['packing']['per_node'] = placement.per_node()
+    with app.app.app_context():
+        results['render_results'] = _result(measure(
+            lambda: app.render_template('results.html', inputs=inputs, results=req), repeat=repeat))
+        results['render_index'] = _result(measure(app.render_form, repeat=repeat))
+    results['pack'] = _result(measure(lambda: packing.pack(inputs), repeat=repeat))
+
+    # The CALCULATOR formulas: a whole scenario, then a single-field edit of one
+    graph = formula.current()
+    results['formula_calculate'] = _result(measure(lambda: formula.calculate(inputs), repeat=repeat))
+    calc = graph.calculation()
+    calc.set_inputs(inputs)
+    edits = iter(range(1 << 62))
+    results['formula_edit'] = _result(measure(
+        lambda: calc.set_inputs({'impala_prod_exec': 1 + next(edits) % 64}), repeat=repeat))
+
+    client = app.app.test_client()
+    results['http_index'] = _result(measure(lambda: client.get('/'), repeat=repeat))
+
+    def calculate_uncached():
+        app.result_cache.clear()
+        app.page_cache.clear()
+        client.post('/calculate', data=form)
+
+    results['http_calculate'] = _result(measure(calculate_uncached, repeat=repeat))
+    results['http_calculate_cached'] = _result(measure(lambda: client.post('/calculate', data=form), repeat=repeat))
+    return results
+
+
+def bench_batch(sizes, repeat, seed=0):
+    import engine
+
+    rng = np.random.default_rng(seed)
+    defaults = engine.as_matrix(engine.INPUT_DEFAULTS)[0]
+    results = {}
+    for n in sizes:
+        # Scenarios scattered around the form defaults
+        X = (defaults * rng.integers(0, 3, size=(n, len(defaults)))).astype(np.int64)
+        results['batch_%d' % n] = _result(measure(lambda: engine.calculate_batch(X), repeat=repeat), items=n)
+    return results
+
+
+def run(path, sizes=BATCH_SIZES, repeat=5, skip_import=False):
+    results = {}
+    if not skip_import:
+        results['app_import'] = bench_import(path, repeat)
+    results.update(bench_workbook(path, repeat))
+    results.update(bench_app(repeat))
+    results.update(bench_batch(sizes, repeat))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    # -> rows of (name, baseline s, current s, ratio, regressed) for benchmarks in both runs.
+    # The best repeat is compared: it is the least disturbed by other load on the machine.
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        ratio = result['min_seconds'] / before['min_seconds'] if before['min_seconds'] else float('inf')
+        rows.append((name, before['min_seconds'], result['min_seconds'], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def _format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '%.3g %s' % (seconds / scale, unit)
+    return '%.3g ns' % (seconds / 1e-9)
+
+
+def report(current, rows=None, out=sys.stderr):
+    baseline = {name: (before, ratio, regressed) for name, before, _, ratio, regressed in rows or ()}
+    for name, result in current['results'].items():
+        line = '%-30s %10s' % (name, _format_seconds(result['seconds']))
+        if result['items'] > 1:
+            line += '  %12.0f/s' % result['per_second']
+        if name in baseline:
+            before, ratio, regressed = baseline[name]
+            line += '  (baseline best %s, x%.2f%s)' % (_format_seconds(before), ratio, ' REGRESSION' if regressed else '')
+        print(line, file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the sizing hot paths.')
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    parser.add_argument('--out', help='write results as JSON (- for stdout)')
+    parser.add_argument('--save', nargs='?', const=BASELINE, metavar='PATH', help='store results as the baseline')
+    parser.add_argument('--compare', nargs='?', const=BASELINE, metavar='PATH', help='compare against a baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown before a benchmark counts as a regression (default 0.25)')
+    parser.add_argument('--check', action='store_true', help='exit non-zero on any regression')
+    parser.add_argument('--max-batch', type=int, default=BATCH_SIZES[-1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-import', action='store_true', help='skip the subprocess import benchmark')
+    args = parser.parse_args(argv)
+
+    # The app reads its workbook location at import
+    os.environ['SIZING_WORKBOOK'] = args.workbook
+    workbook.configure(args.workbook)
+    sizes = [n for n in BATCH_SIZES if n <= args.max_batch]
+    current = run(args.workbook, sizes=sizes, repeat=args.repeat, skip_import=args.skip_import)
+
+    rows = None
+    if args.compare:
+        with open(args.compare) as fh:
+            rows = compare(current, json.load(fh), args.tolerance)
+    report(current, rows)
+    if args.out:
+        text = json.dumps(current, indent=2)
+        if args.out == '-':
+            print(text)
+        else:
+            with open(args.out, 'w') as fh:
+                fh.write(text + '\n')
+    if args.save:
+        with open(args.save, 'w') as fh:
+            fh.write(json.dumps(current, indent=2) + '\n')
+    if args.check and rows and any(row[-1] for row in rows):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
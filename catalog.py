@@ -0,0 +1,324 @@
+"""Component catalog: the sizing coefficients, read from the workbook.
+
+Every coefficient the engine uses is declared here once, either bound to a
+workbook cell (the ``Resources`` sheet for per-component sizes, a profile
+sheet such as ``DEV`` for the ECS/OCP node baselines and CCU totals), to a
+per-unit form input, or as a fixed value where the workbook has no
+equivalent (per-VW/workspace nodes, the Hive executor and Data Viz sizes
+quoted on the form).  load() reads the bound cells once, validates them and
+freezes the result into a Catalog whose engine.Model arrays are built up
+front; current() keeps one per workbook version.
+
+Every path sizes against the profile's fixed node groups: size() takes its
+totals from engine.calculate_batch() like the batch, sweep and solver tools,
+and adds the CALCULATOR formulas' own Hardware Dimensioning Output alongside
+as a separate estimate.
+"""
+import contextlib
+import logging
+import math
+import threading
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+import engine
+import formula
+import workbook
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = 'DEV'
+
+PROFILES = workbook.PROFILES
+
+# Model outputs plus the per-pod CDW local disk used for node placement
+RESOURCES = engine.OUTPUTS[:6] + ('pod_disk_gb',)
+
+
+class Cell(NamedTuple):
+    ref: str  # 'Resources!B11', or '{profile}!G7' for the selected profile sheet
+    builtin: float  # value used when no workbook is available
+    round_up: bool = False
+
+
+class CatalogError(ValueError):
+    pass
+
+
+# (component, count input, {resource: Cell, per-unit input or fixed value})
+COMPONENTS = (
+    ('Environment', 'environment', {'nodes': 1}),
+    ('Embedded Database', 'embedded_db', {'storage_gb': 1}),
+    ('CDW Data Catalog', 'data_catalog', {'nodes': 1}),
+    ('CDW Hive Virtual Warehouse', 'hive_vw', {'nodes': 1}),
+    ('CDW Hive LITE Executor', 'hive_lite_exec',
+     {'cpu_cores': 2, 'ram_gb': 4, 'pod_disk_gb': Cell('Resources!D17', 100)}),
+    ('CDW Hive PROD Executor', 'hive_prod_exec',
+     {'cpu_cores': 8, 'ram_gb': 32, 'pod_disk_gb': Cell('Resources!D19', 630)}),
+    ('CDW Impala Virtual Warehouse', 'impala_vw', {'nodes': 1}),
+    ('CDW Impala LITE Executor', 'impala_lite_exec',
+     {'cpu_cores': 'impala_lite_exec_cpu', 'ram_gb': 'impala_lite_exec_mem', 'pod_disk_gb': Cell('Resources!D21', 100)}),
+    ('CDW Impala LITE Coordinator', 'impala_lite_coord_qty',
+     {'cpu_cores': 'impala_lite_coord_cpu', 'ram_gb': 'impala_lite_coord_mem', 'pod_disk_gb': Cell('Resources!D22', 100)}),
+    ('CDW Impala PROD Executor', 'impala_prod_exec',
+     {'cpu_cores': 'impala_prod_exec_cpu', 'ram_gb': 'impala_prod_exec_mem', 'pod_disk_gb': Cell('Resources!D24', 600)}),
+    ('CDW Impala PROD Coordinator', 'impala_prod_coord_qty',
+     {'cpu_cores': 'impala_prod_coord_cpu', 'ram_gb': 'impala_prod_coord_mem', 'pod_disk_gb': Cell('Resources!D25', 600)}),
+    ('CDW Data Viz (small)', 'data_viz_small', {'cpu_cores': 2, 'ram_gb': 8}),
+    ('CDW Data Viz (medium)', 'data_viz_medium', {'cpu_cores': 4, 'ram_gb': 16}),
+    ('CDW Data Viz (large)', 'data_viz_large', {'cpu_cores': 6, 'ram_gb': 24}),
+    ('CDE Service', 'cde_service', {'nodes': 1}),
+    ('CDE Virtual Cluster', 'cde_vc', {'nodes': 1}),
+    ('CDE Job Driver', 'job_quantity', {'cpu_cores': 'job_driver_cpu', 'ram_gb': 'job_driver_mem'}),
+    ('CDE Job Executor', 'job_exec', {'cpu_cores': 'job_exec_cpu', 'ram_gb': 'job_exec_mem'}),
+    ('CML Workspace', 'cml_workspace', {'nodes': 1}),
+    ('CML XSmall Session', 'cml_xsmall_session', {'cpu_cores': Cell('Resources!B11', 2), 'ram_gb': Cell('Resources!C11', 4)}),
+    ('CML Small Session', 'cml_small_session', {'cpu_cores': Cell('Resources!B12', 4), 'ram_gb': Cell('Resources!C12', 8)}),
+    ('CML Medium Session', 'cml_medium_session', {'cpu_cores': Cell('Resources!B13', 6), 'ram_gb': Cell('Resources!C13', 16)}),
+    ('CML Backup Workspace', 'backup_workspace', {'nodes': 1}),
+    ('CML Model Registry', 'model_registry', {'nodes': 1}),
+    ('CML Internal NFS', 'internal_nfs', {'nfs_gb': 'cml_nfs'}),
+    ('DRS Control Plane Backup', 'drs_backup', {'nodes': 1}),
+)
+
+# Rows of the per-component breakdown (engine.Model.breakdown), each summing
+# the components listed; the ECS and OCP node baselines follow as two more rows
+GROUPS = {
+    'Environment': ('Environment', 'Embedded Database'),
+    'CDW Data Catalog': ('CDW Data Catalog',),
+    'CDW Hive': ('CDW Hive Virtual Warehouse', 'CDW Hive LITE Executor', 'CDW Hive PROD Executor'),
+    'CDW Impala Virtual Warehouse': ('CDW Impala Virtual Warehouse',),
+    'CDW Impala LITE': ('CDW Impala LITE Executor', 'CDW Impala LITE Coordinator'),
+    'CDW Impala PROD': ('CDW Impala PROD Executor', 'CDW Impala PROD Coordinator'),
+    'CDW Data Viz': ('CDW Data Viz (small)', 'CDW Data Viz (medium)', 'CDW Data Viz (large)'),
+    'CDE': ('CDE Service', 'CDE Virtual Cluster', 'CDE Job Driver', 'CDE Job Executor'),
+    'CML': ('CML Workspace', 'CML XSmall Session', 'CML Small Session', 'CML Medium Session',
+            'CML Backup Workspace', 'CML Model Registry', 'CML Internal NFS'),
+    'DRS': ('DRS Control Plane Backup',),
+}
+
+# ECS Master/Server, ECS Worker/Agent and OCP Worker node groups from the
+# profile's Hardware Dimensioning Output, and its CCU totals
+BASELINES = {
+    'ecs_master': {
+        'nodes': Cell('{profile}!G3', 1),
+        'cpu': Cell('{profile}!I3', 32),
+        'ram': Cell('{profile}!I4', 64),
+        'os_disk': Cell('{profile}!I5', 1000),
+        'longhorn_disk': Cell('{profile}!I6', 235, round_up=True),
+    },
+    'ecs_worker': {
+        'nodes': Cell('{profile}!G7', 14),
+        'cpu': Cell('{profile}!I7', 64),
+        'ram': Cell('{profile}!I8', 256),
+        'os_disk': Cell('{profile}!I9', 1000),
+        'longhorn_disk': Cell('{profile}!I10', 235, round_up=True),
+        'cdw_disk': Cell('{profile}!I11', 630),
+    },
+    'ocp_worker': {
+        'nodes': Cell('{profile}!G15', 30),
+        'cpu': Cell('{profile}!I15', 32),
+        'ram': Cell('{profile}!I16', 128),
+    },
+    'ccu': {
+        'ecs_cpu': Cell('{profile}!G25', 928),
+        'ecs_ram': Cell('{profile}!H25', 3648),
+        'ocp_cpu': Cell('{profile}!G26', 960),
+        'ocp_ram': Cell('{profile}!H26', 3840),
+    },
+}
+
+_INTEGER_FIELDS = ('nodes',)
+
+
+class Component(NamedTuple):
+    name: str
+    count: str
+    coefficients: MappingProxyType  # resource -> number or per-unit input name
+
+
+class Catalog(NamedTuple):
+    profile: str
+    version: Optional[str]  # workbook version it was read from; None for the built-in values
+    components: tuple
+    baselines: MappingProxyType
+    sources: tuple  # (component or node group, field, cell ref, value)
+    model: engine.Model
+
+    def pods(self):
+        # Components that run as pods: (name, count input, cpu, ram, local disk)
+        return [(c.name, c.count, c.coefficients['cpu_cores'], c.coefficients['ram_gb'],
+                 c.coefficients.get('pod_disk_gb', 0))
+                for c in self.components if 'cpu_cores' in c.coefficients]
+
+
+def _reader(profile, sheet):
+    def read(cell):
+        if sheet is None:
+            return cell.builtin
+        name, _, ref = cell.ref.format(profile=profile).partition('!')
+        return sheet(name).cell(ref)
+    return read
+
+
+def build(profile=DEFAULT_PROFILE, sheet=None, version=None):
+    # sheet: callable name -> workbook.Sheet, or None for the built-in values
+    read = _reader(profile, sheet)
+    errors = []
+    sources = []
+
+    absent = set()
+
+    def resolve(owner, field, value, integer=False):
+        if isinstance(value, Cell):
+            ref = value.ref.format(profile=profile)
+            name = ref.partition('!')[0]
+            if name in absent:
+                return 0
+            try:
+                raw = read(value)
+            except KeyError:
+                absent.add(name)
+                errors.append('sheet %r is not in the workbook (needed for %s)' % (name, ref))
+                return 0
+            if isinstance(raw, bool) or not isinstance(raw, (int, float)) or not math.isfinite(raw) or raw < 0:
+                errors.append('%s %s: %s must be a non-negative number, got %r' % (owner, field, ref, raw))
+                return 0
+            number = math.ceil(raw) if value.round_up else raw
+            if integer and number != int(number):
+                errors.append('%s %s: %s must be a whole number, got %r' % (owner, field, ref, raw))
+            sources.append((owner, field, ref, number))
+            value = number
+        elif isinstance(value, str):
+            if value not in engine.INPUT_INDEX:
+                errors.append('%s %s: unknown per-unit input %r' % (owner, field, value))
+            return value
+        return int(value) if float(value).is_integer() else float(value)
+
+    components = []
+    for name, count, coefficients in COMPONENTS:
+        if count not in engine.INPUT_INDEX:
+            errors.append('%s: unknown count input %r' % (name, count))
+        frozen = {}
+        for resource, value in coefficients.items():
+            if resource not in RESOURCES:
+                errors.append('%s: unknown resource %r' % (name, resource))
+            frozen[resource] = resolve(name, resource, value)
+        components.append(Component(name, count, MappingProxyType(frozen)))
+    known = {c.name for c in components}
+    for group, names in GROUPS.items():
+        errors.extend('breakdown row %s: unknown component %r' % (group, name) for name in names if name not in known)
+
+    baselines = {}
+    for group, fields in BASELINES.items():
+        baselines[group] = MappingProxyType({field: resolve(group, field, value, integer=field in _INTEGER_FIELDS)
+                                             for field, value in fields.items()})
+    if errors:
+        raise CatalogError('Invalid sizing catalog (profile %s):\n  %s' % (profile, '\n  '.join(errors)))
+
+    model = engine.Model(
+        [(c.name, c.count, {r: v for r, v in c.coefficients.items() if r in engine.OUTPUT_INDEX}) for c in components],
+        baselines['ecs_master'], baselines['ecs_worker'], baselines['ocp_worker'], baselines['ccu'],
+        groups={name: group for group, names in GROUPS.items() for name in names},
+    )
+    return Catalog(profile, version, tuple(components), MappingProxyType(baselines), tuple(sources), model)
+
+
+class ProfileSet(NamedTuple):
+    version: Optional[str]
+    catalogs: tuple  # one Catalog per available profile, in the requested order
+    stack: Optional[engine.ModelStack]  # their models, evaluated in one pass
+    missing: MappingProxyType  # profile -> why it could not be built
+
+
+BUILTIN = build()
+
+# What is built without a readable workbook; with one, it is kept on the
+# workbook snapshot it was built from
+_without_workbook = {}
+_lock = threading.Lock()
+
+
+def _derived():
+    # -> (snapshot in use or None, the dict that holds what is built from it)
+    snapshot = workbook.snapshot()
+    return snapshot, _without_workbook if snapshot is None else snapshot.derived
+
+
+def current(profile=DEFAULT_PROFILE):
+    # Catalog for the workbook snapshot in use, built once per snapshot.
+    # Without a readable workbook the built-in values are used.
+    snapshot, derived = _derived()
+    key = ('catalog', profile)
+    catalog = derived.get(key)
+    if catalog is not None:
+        return catalog
+    with _lock:
+        catalog = derived.get(key)
+        if catalog is None:
+            if snapshot is None:
+                if profile != DEFAULT_PROFILE:
+                    raise CatalogError('Profile %s needs the workbook' % profile)
+                log.warning('No readable workbook configured; using built-in sizing coefficients')
+                catalog = BUILTIN._replace(profile=profile)
+            else:
+                catalog = build(profile, snapshot.sheet, snapshot.version)
+            derived[key] = catalog
+    return catalog
+
+
+# Reentrant: without a pinned snapshot, building a set can find a new
+# workbook version, whose validation builds its own set
+_sets_lock = threading.RLock()
+
+
+def profile_set(names=PROFILES):
+    # Catalogs of several profiles plus a ModelStack over them, built once per
+    # workbook snapshot. Profiles that cannot be built are reported in
+    # .missing rather than failing the whole set.
+    names = tuple(names)
+    snapshot, derived = _derived()
+    key = ('profiles', names)
+    profiles = derived.get(key)
+    if profiles is not None:
+        return profiles
+    with _sets_lock:
+        profiles = derived.get(key)
+        if profiles is None:
+            catalogs, missing = [], {}
+            # Every profile from the same snapshot
+            with workbook.pinned(snapshot) if snapshot is not None else contextlib.nullcontext():
+                for name in names:
+                    try:
+                        catalogs.append(current(name))
+                    except CatalogError as exc:
+                        missing[name] = str(exc)
+            stack = engine.ModelStack([c.model for c in catalogs]) if catalogs else None
+            profiles = ProfileSet(snapshot and snapshot.version, tuple(catalogs), stack, MappingProxyType(missing))
+            derived[key] = profiles
+    return profiles
+
+
+def size(inputs):
+    # One scenario -> its totals (engine.calculate_batch, as for a batch of
+    # one), per-component breakdown ('components') and CALCULATOR outputs
+    # ('sheet'); without the formulas 'sheet' is None and 'warnings' says why
+    model = current().model
+    totals = engine.calculate_batch(inputs, model)[0]
+    parts = model.breakdown(inputs)[0]
+    warnings = []
+    try:
+        sheet = formula.calculate(inputs)
+    except formula.FormulaError as exc:
+        log.warning('Hardware dimensioning unavailable: %s', exc)
+        sheet = None
+        warnings.append('Hardware dimensioning is unavailable: %s' % exc)
+    else:
+        if isinstance(sheet['ocp_disk_error'], str):
+            warnings.append(sheet['ocp_disk_error'])
+    results = dict(zip(engine.OUTPUTS, totals.tolist()))
+    results['components'] = {group: dict(zip(engine.OUTPUTS, row)) for group, row in zip(model.groups, parts.tolist())}
+    results['warnings'] = warnings
+    results['sheet'] = sheet
+    results['workbook_version'] = workbook.version()
+    return results
@@ -0,0 +1,149 @@
+"""Headless sizing from the command line.
+
+Reads scenarios (the form's field names, plus an optional ``id``) from
+CSV, JSON or NDJSON files or stdin, sizes them chunk by chunk in a pool of
+worker processes and writes one result per scenario, in input order, as
+NDJSON or CSV.  Only the model is imported (no Flask, no templates), and
+the workbook is ``sizing.xlsx`` next to the code unless ``--workbook`` or
+``SIZING_WORKBOOK`` says otherwise; without one the built-in coefficients
+are used.  The throughput is reported on stderr.
+
+    python cli.py scenarios.csv --out results.csv
+    cat scenarios.ndjson | python cli.py --processes 4 > results.ndjson
+"""
+import argparse
+import collections
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import batch
+import catalog
+import export
+import workbook
+
+DEFAULT_CHUNK_SIZE = 5000
+INPUT_FORMATS = ('csv', 'json', 'ndjson')
+OUTPUT_FORMATS = ('ndjson', 'csv')
+_EXTENSIONS = {'.csv': 'csv', '.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+
+def input_format(path, default='ndjson'):
+    return _EXTENSIONS.get(os.path.splitext(path)[1].lower(), default)
+
+
+def read_scenarios(stream, fmt):
+    # -> iterable of NDJSON lines or dicts, one per scenario
+    if fmt == 'ndjson':
+        return stream
+    if fmt == 'csv':
+        # Empty cells are left out so they take the form defaults
+        return ({name: value for name, value in row.items() if name and value not in ('', None)}
+                for row in csv.DictReader(stream))
+    data = json.load(stream)
+    if isinstance(data, dict):
+        data = data['scenarios'] if isinstance(data.get('scenarios'), list) else [data]
+    if not isinstance(data, list):
+        raise ValueError('expected a JSON object, a list of them or {"scenarios": [...]}')
+    return data
+
+
+def size_chunk(numbered, fmt):
+    # One chunk of (position, scenario) -> (result text, error count); runs in a worker
+    if fmt == 'ndjson':
+        return batch.size_lines(numbered)
+    rows = export.batch_rows(numbered)
+    out = io.StringIO()
+    csv.writer(out, lineterminator='\n').writerows(rows)
+    return out.getvalue(), sum(row[-1] is not None for row in rows)
+
+
+def _init_worker(path):
+    # A forked worker already has the workbook and the model main() built;
+    # a spawned one starts empty and loads its own
+    try:
+        if workbook.default().path == path:
+            return
+    except RuntimeError:
+        pass
+    workbook.configure(path)
+
+
+def run(chunks, fmt, processes, path):
+    # Yields (scenario count, result text, error count) per chunk, in input
+    # order. At most two chunks per process are in flight, so a large input
+    # is never read far ahead of the output.
+    if processes <= 1:
+        for numbered in chunks:
+            yield (len(numbered),) + size_chunk(numbered, fmt)
+        return
+    pool = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(path,))
+    pending = collections.deque()
+    try:
+        for numbered in chunks:
+            pending.append((len(numbered), pool.submit(size_chunk, numbered, fmt)))
+            if len(pending) >= 2 * processes:
+                count, future = pending.popleft()
+                yield (count,) + future.result()
+        while pending:
+            count, future = pending.popleft()
+            yield (count,) + future.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Size scenarios from CSV, JSON or NDJSON without the web app.')
+    parser.add_argument('inputs', nargs='*', default=['-'], help='scenario files (default: stdin)')
+    parser.add_argument('--input-format', choices=INPUT_FORMATS,
+                        help='default: from each file extension; NDJSON for stdin')
+    parser.add_argument('--out', default='-', help='output file (default: stdout)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help='default: csv for a .csv --out, else ndjson')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    args = parser.parse_args(argv)
+    workbook.configure(args.workbook)
+    # Built before the pool starts, so forked workers inherit the model
+    catalog.current()
+
+    fmt = args.format or ('csv' if args.out.lower().endswith('.csv') else 'ndjson')
+    streams = []
+    try:
+        scenarios = []
+        for path in args.inputs:
+            stream = sys.stdin if path == '-' else open(path, newline='')
+            if stream is not sys.stdin:
+                streams.append(stream)
+            scenarios.append(read_scenarios(stream, args.input_format or input_format(path)))
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', newline='')
+
+    start = time.perf_counter()
+    total = errors = 0
+    try:
+        if fmt == 'csv':
+            out.write(','.join(export.BATCH_COLUMNS) + '\n')
+        chunks = batch.numbered_chunks(itertools.chain.from_iterable(scenarios), max(args.chunk, 1))
+        for count, text, failed in run(chunks, fmt, max(args.processes, 1), args.workbook):
+            out.write(text)
+            total += count
+            errors += failed
+    finally:
+        for stream in streams:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - start
+    print('%d scenarios (%d errors) in %.2fs: %.0f scenarios/s on %d process(es)'
+          % (total, errors, seconds, total / seconds if seconds else 0, max(args.processes, 1)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
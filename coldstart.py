@@ -0,0 +1,148 @@
+"""Cold-start report and budget check.
+
+Starts fresh interpreters that import the app and send it a first GET /
+and a first POST /calculate through the Flask test client, and reports
+the median of each step: importing app.py, the first response (from
+process launch, so interpreter start-up is included) and the first
+calculation, which is where the model and workbook data are loaded.  One
+extra run under ``python -X importtime`` breaks the import down by
+package.  Heavy libraries (numpy, pandas, openpyxl, pyarrow) are only
+expected once a request needs them; the report lists any that GET /
+pulls in.
+
+With ``--check`` the exit status is 1 when a step is over its budget or
+GET / loads a heavy library.
+
+    python coldstart.py
+    python coldstart.py --check --budget import=0.5 --budget first_response=0.8
+"""
+import argparse
+import collections
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import workbook
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY = ('numpy', 'pandas', 'openpyxl', 'pyarrow')
+
+# Seconds, checked against the median of the runs
+BUDGETS = {
+    'import': 0.6,
+    'first_response': 0.9,
+    'first_calculate': 2.0,
+}
+
+# Runs in the fresh interpreter; argv[1] is the time.time() of the launch
+_PROBE = '''
+import json, sys, time
+launched = float(sys.argv[1])
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+sys.stderr.write('-- app imported --\\n')
+sys.stderr.flush()
+client = app.app.test_client()
+assert client.get('/').status_code == 200
+responded = time.perf_counter()
+first_response = time.time() - launched
+heavy = [name for name in %r if name in sys.modules]
+assert client.post('/calculate', data={}).status_code == 200
+calculated = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'first_response': first_response,
+    'index': responded - imported,
+    'first_calculate': calculated - responded,
+    'heavy_after_index': heavy,
+}))
+''' % (HEAVY,)
+
+
+def _environ(path):
+    # The shared result cache is turned off so every run really is cold
+    return dict(os.environ, SIZING_WORKBOOK=path, SIZING_SHARED_CACHE_SIZE='0')
+
+
+def probe(path, importtime=False):
+    # One fresh interpreter -> its timings (and the -X importtime log on stderr)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', _PROBE, repr(time.time())]
+    out = subprocess.run(command, cwd=HERE, env=_environ(path), capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError('cold-start probe failed:\n%s' % out.stderr[-2000:])
+    return json.loads(out.stdout.strip().splitlines()[-1]), out.stderr
+
+
+def import_breakdown(log, top=15):
+    # -X importtime log -> [(package, seconds)], self time summed per top-level
+    # package over the import of the app (not what the first requests load)
+    totals = collections.Counter()
+    for line in log.partition('-- app imported --')[0].splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():  # not the header
+            totals[name.strip().split('.')[0]] += int(self_us)
+    return [(name, us / 1e6) for name, us in totals.most_common(top)]
+
+
+def run(path, repeat):
+    runs = [probe(path)[0] for _ in range(repeat)]
+    timings = {step: statistics.median(run[step] for run in runs)
+               for step in ('import', 'first_response', 'index', 'first_calculate')}
+    heavy = sorted({name for run in runs for name in run['heavy_after_index']})
+    _, log = probe(path, importtime=True)
+    return timings, heavy, import_breakdown(log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report (and check) the cold-start time of the app.')
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', action='append', default=[], metavar='STEP=SECONDS',
+                        help='override a budget: %s' % ', '.join('%s=%g' % item for item in BUDGETS.items()))
+    parser.add_argument('--check', action='store_true', help='exit non-zero when over budget')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    budgets = dict(BUDGETS)
+    for item in args.budget:
+        step, _, seconds = item.partition('=')
+        if step not in budgets:
+            parser.error('unknown step %r; expected one of %s' % (step, ', '.join(budgets)))
+        try:
+            budgets[step] = float(seconds)
+        except ValueError:
+            parser.error('--budget %s: not a number of seconds' % item)
+
+    try:
+        timings, heavy, breakdown = run(args.workbook, max(args.repeat, 1))
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    over = [step for step, limit in budgets.items() if timings[step] > limit]
+
+    if args.json:
+        print(json.dumps({'seconds': timings, 'budgets': budgets, 'over_budget': over,
+                          'heavy_after_index': heavy, 'imports': dict(breakdown)}, indent=2))
+    else:
+        print('%-18s %10s %10s' % ('step', 'median', 'budget'))
+        for step, seconds in timings.items():
+            limit = budgets.get(step)
+            print('%-18s %9.1fms %10s%s' % (step, seconds * 1e3, '%.0fms' % (limit * 1e3) if limit else '',
+                                            '  OVER' if step in over else ''))
+        print('\nimport time by package (one -X importtime run; self time):')
+        for name, seconds in breakdown:
+            print('  %-24s %8.1fms' % (name, seconds * 1e3))
+        print('\nheavy libraries loaded by GET /: %s' % (', '.join(heavy) or 'none'))
+    if args.check and (over or heavy):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Vectorized sizing model.
+
+The sizing rules are a component-by-resource coefficient table (see
+catalog.py): every component contributes ``count * coefficient`` of each
+resource, where the coefficient is either a constant or another input
+(e.g. executor quantity times executor CPU).  Adding the ECS/OCP node
+baselines gives the totals.
+Evaluating N scenarios is therefore two matrix products over an N x 39
+input matrix.  The same terms, kept apart per component group and node
+baseline, give the per-component breakdown (Model.breakdown), which sums
+to the totals.
+"""
+import numpy as np
+
+import schema
+
+# Form inputs in column order, with the defaults calculate() applies (see schema.py)
+INPUT_DEFAULTS = {field.name: field.default for field in schema.INPUT_FIELDS}
+INPUTS = tuple(INPUT_DEFAULTS)
+INPUT_INDEX = {name: i for i, name in enumerate(INPUTS)}
+
+OUTPUTS = ('nodes', 'cpu_cores', 'ram_gb', 'storage_gb', 'nfs_gb', 'cdw_local_disk_gb', 'ccu_cpu', 'ccu_ram')
+OUTPUT_INDEX = {name: i for i, name in enumerate(OUTPUTS)}
+
+# Counts that only contribute when positive
+CLIPPED_INPUTS = ('backup_workspace', 'drs_backup')
+
+# CCU totals track the workload CPU and RAM
+CCU_OF = {'ccu_cpu': 'cpu_cores', 'ccu_ram': 'ram_gb'}
+
+# Breakdown rows of the node baselines, after the component rows
+BASELINE_GROUPS = ('ECS', 'OCP')
+
+
+def baseline_rows(ecs_master, ecs_worker, ocp_worker, ccu_baseline):
+    # The ECS and OCP rows of the breakdown for the given node groups
+    # ({'nodes', 'cpu', 'ram', ...} per node) and CCU baseline -> 2 x len(OUTPUTS)
+    ecs, ocp = dict.fromkeys(OUTPUTS, 0), dict.fromkeys(OUTPUTS, 0)
+    for group in (ecs_master, ecs_worker):
+        ecs['nodes'] += group['nodes']
+        ecs['cpu_cores'] += group['nodes'] * group['cpu']
+        ecs['ram_gb'] += group['nodes'] * group['ram']
+        ecs['storage_gb'] += group['nodes'] * (group['os_disk'] + group['longhorn_disk'])
+    ecs['cdw_local_disk_gb'] = ecs_worker['nodes'] * ecs_worker['cdw_disk']
+    ocp['nodes'] = ocp_worker['nodes']
+    ocp['cpu_cores'] = ocp_worker['nodes'] * ocp_worker['cpu']
+    ocp['ram_gb'] = ocp_worker['nodes'] * ocp_worker['ram']
+    for baseline, prefix in ((ecs, 'ecs'), (ocp, 'ocp')):
+        for ccu, base in CCU_OF.items():
+            baseline[ccu] = baseline[base] + ccu_baseline['%s_%s' % (prefix, ccu.split('_')[1])]
+    return np.array([[baseline[name] for name in OUTPUTS] for baseline in (ecs, ocp)])
+
+
+class Model:
+    # A component table compiled into the arrays calculate_batch() works on.
+    # components: (component, count input, {resource: constant or per-unit input});
+    # the node groups and CCU baseline ({'ecs_cpu', 'ecs_ram', 'ocp_cpu',
+    # 'ocp_ram'}) come from catalog.py. groups maps a component to the row
+    # it is reported under by breakdown(); by default each is its own row.
+
+    def __init__(self, components, ecs_master, ecs_worker, ocp_worker, ccu_baseline, groups=None):
+        n_in, n_out = len(INPUTS), len(OUTPUTS)
+        self.components = tuple(components)
+        groups = groups or {}
+        names = [groups.get(name, name) for name, _, _ in self.components]
+        self.groups = tuple(dict.fromkeys(names)) + BASELINE_GROUPS
+        group_index = {name: i for i, name in enumerate(self.groups)}
+        self.group_linear = np.zeros((len(self.groups), n_in, n_out))
+        pairs = []
+        for group, (_, count, coefficients) in zip(names, self.components):
+            g = group_index[group]
+            for resource, coefficient in coefficients.items():
+                for target in [resource] + [ccu for ccu, base in CCU_OF.items() if base == resource]:
+                    if isinstance(coefficient, str):
+                        pairs.append((INPUT_INDEX[count], INPUT_INDEX[coefficient], OUTPUT_INDEX[target], g))
+                    else:
+                        self.group_linear[g, INPUT_INDEX[count], OUTPUT_INDEX[target]] += coefficient
+        self.linear = self.group_linear.sum(axis=0)
+        # Per-unit terms: out[:, target] += X[:, count] * X[:, size]
+        self.pair_count = np.array([p[0] for p in pairs], dtype=np.intp)
+        self.pair_size = np.array([p[1] for p in pairs], dtype=np.intp)
+        self.pair_matrix = np.zeros((len(pairs), n_out))
+        self.pair_matrix[np.arange(len(pairs)), [p[2] for p in pairs]] = 1
+        self.pair_groups = np.zeros((len(pairs), len(self.groups), n_out))
+        self.pair_groups[np.arange(len(pairs)), [p[3] for p in pairs], [p[2] for p in pairs]] = 1
+
+        # Node baselines, split into the ECS and OCP rows of the breakdown
+        self.group_baseline = np.zeros((len(self.groups), n_out))
+        self.group_baseline[-len(BASELINE_GROUPS):] = baseline_rows(ecs_master, ecs_worker, ocp_worker, ccu_baseline)
+        self.baseline = self.group_baseline.sum(axis=0)
+        self.clipped = np.array([INPUT_INDEX[name] for name in CLIPPED_INPUTS], dtype=np.intp)
+        # Whole-number coefficients give whole-number results for integer inputs
+        self.integral = all(float(a).is_integer() for a in np.concatenate([self.linear.ravel(), self.baseline]))
+
+        # Rows of the breakdown each input feeds into, for incremental updates
+        used = (self.group_linear != 0).any(axis=2)  # group x input
+        for count, size, _, g in pairs:
+            used[g, count] = used[g, size] = True
+        self.affected = {name: tuple(self.groups[g] for g in np.flatnonzero(used[:, i]))
+                         for i, name in enumerate(INPUTS)}
+
+    def _matrix(self, X):
+        X = as_matrix(X, dtype=np.float64)
+        if len(self.clipped):
+            X[:, self.clipped] = np.maximum(X[:, self.clipped], 0)
+        return X
+
+    def evaluate(self, X):
+        # float64 lets the products run through BLAS; with whole-number
+        # coefficients every term is an integer well below 2**53, so rounding
+        # back to int64 is exact
+        X = self._matrix(X)
+        out = X @ self.linear
+        out += (X.take(self.pair_count, axis=1) * X.take(self.pair_size, axis=1)) @ self.pair_matrix
+        out += self.baseline
+        return np.rint(out).astype(np.int64) if self.integral else out
+
+    def breakdown(self, X, groups=None):
+        # N x G x len(OUTPUTS): the share of each breakdown row (all of
+        # self.groups, or the named ones in that order) in the totals.
+        # Over all rows it sums to evaluate(X).
+        index = slice(None) if groups is None else [self.groups.index(name) for name in groups]
+        X = self._matrix(X)
+        out = np.einsum('ni,gio->ngo', X, self.group_linear[index])
+        terms = X.take(self.pair_count, axis=1) * X.take(self.pair_size, axis=1)
+        out += np.einsum('np,pgo->ngo', terms, self.pair_groups[:, index])
+        out += self.group_baseline[index]
+        return np.rint(out).astype(np.int64) if self.integral else out
+
+    def restrict(self, base, free):
+        # The model with every input except the `free` ones fixed at its value
+        # in base: affine in the free inputs plus the per-unit terms where both
+        # factors are free. Sizing N x len(free) samples then costs a fraction
+        # of evaluate() on the full N x 39 matrix.
+        b = self._matrix(base)[0]
+        free = np.array([INPUT_INDEX[name] for name in free], dtype=np.intp)
+        position = np.full(len(INPUTS), -1, dtype=np.intp)
+        position[free] = np.arange(len(free))
+        fixed = position < 0
+        offset = b[fixed] @ self.linear[fixed] + self.baseline
+        linear = self.linear[free].copy()
+        pairs = []
+        for p, (count, size) in enumerate(zip(self.pair_count, self.pair_size)):
+            if fixed[count] and fixed[size]:
+                offset += b[count] * b[size] * self.pair_matrix[p]
+            elif fixed[size]:
+                linear[position[count]] += b[size] * self.pair_matrix[p]
+            elif fixed[count]:
+                linear[position[size]] += b[count] * self.pair_matrix[p]
+            else:
+                pairs.append(p)
+        clipped = position[self.clipped]
+        return Restricted(linear, offset, position[self.pair_count[pairs]], position[self.pair_size[pairs]],
+                          self.pair_matrix[pairs], clipped[clipped >= 0], self.integral)
+
+
+class Restricted:
+    # Model.restrict(): evaluate(Z) sizes an N x len(free) matrix of the free inputs
+
+    def __init__(self, linear, offset, pair_count, pair_size, pair_matrix, clipped, integral):
+        self.linear = linear
+        self.offset = offset
+        self.pair_count = pair_count
+        self.pair_size = pair_size
+        self.pair_matrix = pair_matrix
+        self.clipped = clipped
+        self.integral = integral
+
+    def evaluate(self, Z):
+        Z = np.array(Z, dtype=np.float64, ndmin=2)
+        if len(self.clipped):
+            Z[:, self.clipped] = np.maximum(Z[:, self.clipped], 0)
+        out = Z @ self.linear
+        if len(self.pair_count):
+            out += (Z.take(self.pair_count, axis=1) * Z.take(self.pair_size, axis=1)) @ self.pair_matrix
+        out += self.offset
+        return np.rint(out).astype(np.int64) if self.integral else out
+
+
+def as_matrix(data, dtype=np.int64):
+    # Accepts an N x 39 array in INPUTS order, a DataFrame, a dict or a list of dicts.
+    # Always returns a fresh array the caller may modify.
+    if isinstance(data, np.ndarray):
+        X = np.array(data, dtype=dtype, ndmin=2)
+        if X.shape[1] != len(INPUTS):
+            raise ValueError('Expected %d input columns, got %d' % (len(INPUTS), X.shape[1]))
+        return X
+    if isinstance(data, dict):
+        data = [data]
+    if hasattr(data, 'columns'):
+        X = np.empty((len(data), len(INPUTS)), dtype=dtype)
+        for i, name in enumerate(INPUTS):
+            X[:, i] = data[name].to_numpy(dtype=dtype) if name in data.columns else INPUT_DEFAULTS[name]
+        return X
+    return np.array([[row.get(name, INPUT_DEFAULTS[name]) for name in INPUTS] for row in data],
+                    dtype=dtype).reshape(-1, len(INPUTS))
+
+
+def calculate_batch(data, model=None):
+    # Size N scenarios at once; returns an N x len(OUTPUTS) array,
+    # or a DataFrame with OUTPUTS columns when given a DataFrame.
+    # The model defaults to the catalog of the configured workbook.
+    if model is None:
+        import catalog
+
+        model = catalog.current().model
+    out = model.evaluate(data)
+    if hasattr(data, 'columns'):
+        import pandas as pd
+
+        return pd.DataFrame(out, columns=OUTPUTS, index=data.index)
+    return out
+
+
+class ModelStack:
+    # Several models evaluated together -> P x N x len(OUTPUTS). Catalog
+    # profiles differ only in their coefficients, so the per-unit terms are
+    # computed once and the linear parts run as one stacked product.
+
+    def __init__(self, models):
+        self.models = tuple(models)
+        first = self.models[0]
+        self.shared = all(np.array_equal(m.pair_count, first.pair_count) and
+                          np.array_equal(m.pair_size, first.pair_size) and
+                          np.array_equal(m.pair_matrix, first.pair_matrix) and
+                          np.array_equal(m.clipped, first.clipped) for m in self.models[1:])
+        self.linear = np.stack([m.linear for m in self.models])
+        self.baseline = np.stack([m.baseline for m in self.models])[:, np.newaxis, :]
+        self.integral = all(m.integral for m in self.models)
+
+    def evaluate(self, X):
+        if not self.shared:
+            return np.stack([m.evaluate(X) for m in self.models])
+        first = self.models[0]
+        X = as_matrix(X, dtype=np.float64)
+        if len(first.clipped):
+            X[:, first.clipped] = np.maximum(X[:, first.clipped], 0)
+        out = X @ self.linear
+        out += (X.take(first.pair_count, axis=1) * X.take(first.pair_size, axis=1)) @ first.pair_matrix
+        out += self.baseline
+        return np.rint(out).astype(np.int64) if self.integral else out
@@ -0,0 +1,422 @@
+"""Streaming CSV, XLSX and Parquet export.
+
+A Table is a name, its columns and an iterable of row chunks (2-D arrays
+or lists of rows).  Chunks are pulled one at a time and written straight
+out, so a table of any length is exported in the memory of one chunk:
+CSV is written as text, Parquet as one row group per chunk, and XLSX with
+openpyxl's write-only mode, which spools each sheet to a temporary file
+(a sheet is rolled over to a new one at Excel's row limit).
+
+stream() runs an export in a background thread that writes into a
+bounded queue and yields its bytes, so an HTTP response starts as soon as
+the first block is ready and a slow client throttles the computation.
+XLSX is the exception: openpyxl only writes the workbook file on close(),
+so its first byte comes after the last row.
+
+    python export.py scenarios.ndjson --out results.xlsx
+    python export.py --scenario '{"impala_prod_exec": 4}' --out sizing.xlsx
+"""
+import argparse
+import contextvars
+import csv
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import batch
+import engine
+import schema
+import workbook
+
+DEFAULT_CHUNK_SIZE = 10000
+XLSX_MAX_ROWS = 1048576
+
+# Bytes handed to the client at a time, and how many blocks may wait for it
+BLOCK_SIZE = 64 * 1024
+QUEUE_DEPTH = 16
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class Table(NamedTuple):
+    name: str
+    columns: tuple
+    chunks: object  # iterable of 2-D arrays or lists of rows
+    types: Optional[tuple] = None  # 'int', 'float' or 'str' per column; Parquet infers them otherwise
+
+
+def csv_rows(table):
+    # One %-format over the whole chunk is ~3x faster than np.savetxt
+    row_format = ','.join(['%r'] * table.shape[1])
+    return ('\n'.join([row_format] * len(table)) + '\n') % tuple(table.ravel().tolist())
+
+
+def _open(target):
+    # -> (binary file, whether the writer owns it); '-' is stdout
+    if isinstance(target, str):
+        return (sys.stdout.buffer, False) if target == '-' else (open(target, 'wb'), True)
+    return target, False
+
+
+class CsvWriter:
+    def __init__(self, target, columns, name=None, types=None):
+        self.fh, self.owned = _open(target)
+        self.fh.write((','.join(columns) + '\n').encode())
+
+    def write(self, table):
+        if isinstance(table, np.ndarray):
+            text = csv_rows(table)
+        else:
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator='\n').writerows(table)
+            text = buffer.getvalue()
+        self.fh.write(text.encode())
+
+    def close(self):
+        if self.owned:
+            self.fh.close()
+        else:
+            self.fh.flush()
+
+
+class XlsxWriter:
+    def __init__(self, target, columns, name='results', types=None):
+        import openpyxl
+
+        self.fh, self.owned = _open(target)
+        self.book = openpyxl.Workbook(write_only=True)
+        self.sheet(name, columns)
+
+    def sheet(self, name, columns):
+        # Starts a new worksheet; later rows go there
+        self.name = name
+        self.columns = list(columns)
+        self.part = 1
+        self._open_sheet(name)
+
+    def _open_sheet(self, title):
+        self.ws = self.book.create_sheet(title[:31])
+        self.ws.freeze_panes = 'A2'
+        self.ws.append(self.columns)
+        self.rows = 1
+
+    def write(self, table):
+        rows = table.tolist() if isinstance(table, np.ndarray) else table
+        ws = self.ws
+        for row in rows:
+            if self.rows >= XLSX_MAX_ROWS:
+                self.part += 1
+                self._open_sheet('%s (%d)' % (self.name[:25], self.part))
+                ws = self.ws
+            ws.append(row)
+            self.rows += 1
+
+    def close(self):
+        self.book.save(self.fh)
+        if self.owned:
+            self.fh.close()
+
+
+class ParquetWriter:
+    def __init__(self, target, columns, name=None, types=None):
+        pyarrow, pq = _pyarrow()
+        self.pa = pyarrow
+        self.pq = pq
+        self.fh, self.owned = _open(target)
+        self.columns = list(columns)
+        kinds = {'int': pyarrow.int64(), 'float': pyarrow.float64(), 'str': pyarrow.string()}
+        self.types = [kinds[kind] for kind in types] if types else [None] * len(self.columns)
+        self.writer = None
+
+    def write(self, table):
+        if isinstance(table, np.ndarray):
+            data = [table[:, i] for i in range(table.shape[1])]
+        else:
+            data = list(zip(*table)) if table else [()] * len(self.columns)
+        arrays = [self.pa.array(values, type=kind) for values, kind in zip(data, self.types)]
+        chunk = self.pa.Table.from_arrays(arrays, names=self.columns)
+        if self.writer is None:
+            # Without declared types the columns follow the first chunk (int64, or float64 for fractions)
+            self.writer = self.pq.ParquetWriter(self.fh, chunk.schema)
+        self.writer.write_table(chunk)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.owned:
+            self.fh.close()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('Parquet output needs pyarrow: pip install pyarrow')
+    return pyarrow, pyarrow.parquet
+
+
+WRITERS = {'csv': CsvWriter, 'xlsx': XlsxWriter, 'parquet': ParquetWriter}
+
+
+def require(fmt):
+    # Raises ValueError for an unknown format, RuntimeError when its library is missing
+    if fmt not in WRITERS:
+        raise ValueError('unknown format %r; expected one of %s' % (fmt, ', '.join(sorted(WRITERS))))
+    if fmt == 'parquet':
+        _pyarrow()
+
+
+def format_for(path, default='csv'):
+    # Output format from a file extension
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    return ext if ext in WRITERS else default
+
+
+def write(target, fmt, tables):
+    # Writes the tables chunk by chunk; XLSX puts each on its own sheet, CSV
+    # and Parquet hold exactly one. Returns the number of rows written.
+    tables = list(tables)
+    if fmt != 'xlsx' and len(tables) != 1:
+        raise ValueError('%s holds one table, got %d' % (fmt, len(tables)))
+    writer = None
+    count = 0
+    try:
+        for table in tables:
+            if writer is None:
+                writer = WRITERS[fmt](target, table.columns, table.name, table.types)
+            else:
+                writer.sheet(table.name, table.columns)
+            for chunk in table.chunks:
+                writer.write(chunk)
+                count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _Pipe:
+    # Write end of a bounded queue of byte blocks: the exporting thread
+    # blocks once QUEUE_DEPTH blocks are waiting and gives up when the reader
+    # has gone. Not seekable, so zipfile writes XLSX parts with data descriptors.
+    def __init__(self, block_size=BLOCK_SIZE, depth=QUEUE_DEPTH):
+        self.queue = queue.Queue(depth)
+        self.block_size = block_size
+        self.buffer = bytearray()
+        self.position = 0
+        self.cancelled = False
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= self.block_size:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=0):
+        raise io.UnsupportedOperation('seek')
+
+    def seekable(self):
+        return False
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def finish(self, error=None):
+        if self.buffer and error is None:
+            self._put(bytes(self.buffer))
+        self.buffer.clear()
+        self._put(error)
+
+    def _put(self, item):
+        while True:
+            if self.cancelled:
+                raise _Cancelled()
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+
+def stream(fmt, tables, block_size=BLOCK_SIZE):
+    # write() in a background thread; yields the output as it is produced.
+    # An error in the thread is raised here, after the bytes before it.
+    pipe = _Pipe(block_size)
+
+    def produce():
+        try:
+            write(pipe, fmt, tables)
+            pipe.finish()
+        except _Cancelled:
+            pass
+        except Exception as exc:
+            try:
+                pipe.finish(exc)
+            except _Cancelled:
+                pass
+
+    # The thread runs in a copy of the caller's context, so it sizes against
+    # the workbook snapshot the request pinned
+    threading.Thread(target=contextvars.copy_context().run, args=(produce,), name='export', daemon=True).start()
+    try:
+        while True:
+            item = pipe.queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        pipe.cancelled = True
+
+
+# Tables of one sized scenario: the totals and Hardware Dimensioning outputs,
+# the per-component breakdown, the per-node placement and the inputs
+
+SCENARIO_TABLES = ('summary', 'components', 'nodes', 'inputs')
+
+
+def _node_chunks(placement, chunk_size=DEFAULT_CHUNK_SIZE):
+    for start in range(0, placement.nodes, chunk_size):
+        stop = min(start + chunk_size, placement.nodes)
+        used = placement.used[start:stop].tolist()
+        utilisation = placement.utilisation[start:stop].round(4).tolist()
+        counts = placement.counts[start:stop].tolist()
+        yield [[start + i + 1] + row for i, row in
+               enumerate(u + r + c for u, r, c in zip(used, utilisation, counts))]
+
+
+def scenario_tables(inputs, results, placement, names=SCENARIO_TABLES):
+    # results: app.calculate_requirements(inputs); placement: packing.pack(inputs, node_shape)
+    import packing
+
+    tables = {}
+    summary = [['totals', name, results[name]] for name in engine.OUTPUTS]
+    if results.get('sheet'):
+        summary += [['hardware', name, value] for name, value in results['sheet'].items()]
+    if results.get('workbook_version'):
+        summary.append(['workbook', 'version', results['workbook_version']])
+    tables['summary'] = Table('summary', ('section', 'output', 'value'), [summary])
+    components = [[group] + [share[name] for name in engine.OUTPUTS] for group, share in results['components'].items()]
+    components.append(['Total'] + [results[name] for name in engine.OUTPUTS])
+    tables['components'] = Table('components', ('component',) + engine.OUTPUTS, [components])
+    tables['nodes'] = Table('nodes', ('node',) + packing.RESOURCES
+                            + tuple(resource + '_utilisation' for resource in packing.RESOURCES)
+                            + tuple(placement.kinds), _node_chunks(placement))
+    tables['inputs'] = Table('inputs', ('input', 'value'),
+                             [[[name, int(value) if isinstance(value, bool) else value]
+                               for name, value in inputs.items()]])
+    return [tables[name] for name in names]
+
+
+def size_scenario(inputs, node_shape=None):
+    # -> (results, placement) for one scenario outside the web app, sized as
+    # app.calculate_requirements sizes it
+    import catalog
+    import packing
+
+    return catalog.size(inputs), packing.pack(inputs, node_shape)
+
+
+# Batch results: one row per NDJSON scenario, inputs then outputs; lines that
+# fail to parse keep their place with only `error` set
+
+BATCH_COLUMNS = ('line', 'id') + engine.INPUTS + engine.OUTPUTS + ('error',)
+BATCH_TYPES = ('int', 'str') + ('int',) * len(engine.INPUTS) + ('float',) * len(engine.OUTPUTS) + ('str',)
+
+
+def batch_rows(numbered):
+    # One chunk of (line number, line) -> BATCH_COLUMNS rows, sized by batch.size_chunk()
+    blank = [None] * (len(engine.INPUTS) + len(engine.OUTPUTS))
+    rows = []
+    for line_no, scenario_id, row, outputs in batch.size_chunk(numbered):
+        scenario_id = None if scenario_id is None else str(scenario_id)
+        if outputs is None:
+            rows.append([line_no, scenario_id] + blank + [str(row)])
+        else:
+            rows.append([line_no, scenario_id] + [int(value) for value in row] + outputs + [None])
+    return rows
+
+
+def batch_table(lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    # NDJSON scenarios -> results Table, read and sized one chunk at a time
+    chunks = (batch_rows(numbered) for numbered in batch.numbered_chunks(lines, chunk_size))
+    return Table('results', BATCH_COLUMNS, chunks, BATCH_TYPES)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export sizing results as CSV, XLSX or Parquet.')
+    parser.add_argument('input', nargs='?', default='-', help='NDJSON scenarios, one per line (default: stdin)')
+    parser.add_argument('--scenario', metavar='JSON',
+                        help='export one scenario (form fields as a JSON object) with its breakdown and per-node table')
+    parser.add_argument('--table', choices=SCENARIO_TABLES,
+                        help='with --scenario and CSV/Parquet: the table to write (default: summary)')
+    parser.add_argument('--out', default='-', help='output file (default: stdout)')
+    parser.add_argument('--format', choices=sorted(WRITERS), help='default: from --out extension, else csv')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    args = parser.parse_args(argv)
+    workbook.configure(args.workbook)
+
+    fmt = args.format or format_for(args.out)
+    try:
+        require(fmt)
+    except (ValueError, RuntimeError) as exc:
+        parser.error(str(exc))
+    if fmt == 'xlsx' and args.out == '-':
+        parser.error('XLSX needs --out FILE')
+
+    start = time.perf_counter()
+    if args.scenario is not None:
+        try:
+            values = json.loads(args.scenario)
+            if not isinstance(values, dict):
+                raise ValueError('expected a JSON object')
+            inputs, node_shape = schema.parse_form(values)
+        except ValueError as exc:
+            parser.error('--scenario: %s' % exc)
+        inputs = inputs._asdict()
+        results, placement = size_scenario(inputs, node_shape._asdict())
+        names = SCENARIO_TABLES if fmt == 'xlsx' and not args.table else (args.table or 'summary',)
+        count = write(args.out, fmt, scenario_tables(inputs, results, placement, names))
+        print('%d rows in %.2fs' % (count, time.perf_counter() - start), file=sys.stderr)
+        return
+
+    lines = sys.stdin if args.input == '-' else open(args.input)
+    try:
+        count = write(args.out, fmt, [batch_table(lines, max(args.chunk, 1))])
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    seconds = time.perf_counter() - start
+    print('%d scenarios in %.2fs (%.0f scenarios/s)' % (count, seconds, count / seconds if seconds else 0),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
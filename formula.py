@@ -0,0 +1,814 @@
+"""Formula engine for the CALCULATOR sheet of sizing.xlsx.
+
+The sizing rules the workbook's authors maintain live in the formulas of
+the hidden CALCULATOR sheet; the cached values pandas and openpyxl return
+only hold the results for whatever was typed into the sheet last.  build()
+parses every formula reachable from that sheet (following references into
+Resources and any other sheet), compiles each into a Python function and
+orders them into a dependency DAG.  A Calculation holds one set of cell
+values: set() changes input cells and re-evaluates only the formulas
+downstream of them, in dependency order.
+
+Excel's rules are kept where this workbook depends on them: blank cells
+are 0, TRUE is 1 in arithmetic, numbers are rounded to 15 significant
+digits before ROUND/ROUNDUP, ROUNDUP without digits rounds to a whole
+number (as Google Sheets allows), and errors such as #DIV/0! propagate to
+every cell that uses them.
+
+    calc = formula.current().calculation()
+    calc.set_inputs({'impala_prod_exec': 4})  # -> ('D16', 'C50', 'C55', 'G7', ...)
+    calc.outputs()['ecs_worker_nodes']        # -> 3
+"""
+import logging
+import math
+import re
+import threading
+
+import workbook
+
+log = logging.getLogger(__name__)
+
+ROOT_SHEET = 'CALCULATOR'
+
+# Form field -> input cell of the CALCULATOR sheet
+INPUT_CELLS = {
+    'environment': 'D2', 'embedded_db': 'D3',
+    'data_catalog': 'D5', 'hive_vw': 'D6', 'hive_lite_exec': 'D7', 'hive_prod_exec': 'D8',
+    'impala_vw': 'D9', 'impala_lite_exec': 'D10', 'impala_lite_exec_cpu': 'D11', 'impala_lite_exec_mem': 'D12',
+    'impala_lite_coord_qty': 'D13', 'impala_lite_coord_cpu': 'D14', 'impala_lite_coord_mem': 'D15',
+    'impala_prod_exec': 'D16', 'impala_prod_exec_cpu': 'D17', 'impala_prod_exec_mem': 'D18',
+    'impala_prod_coord_qty': 'D19', 'impala_prod_coord_cpu': 'D20', 'impala_prod_coord_mem': 'D21',
+    'data_viz_small': 'D22', 'data_viz_medium': 'D23', 'data_viz_large': 'D24',
+    'cde_service': 'D26', 'cde_vc': 'D27', 'job_quantity': 'D28', 'job_exec': 'D29',
+    'job_driver_cpu': 'D30', 'job_driver_mem': 'D31', 'job_exec_cpu': 'D32', 'job_exec_mem': 'D33',
+    'cml_workspace': 'D35', 'cml_xsmall_session': 'D36', 'cml_small_session': 'D37', 'cml_medium_session': 'D38',
+    'cml_nfs': 'D39', 'internal_nfs': 'D40', 'backup_workspace': 'D41', 'model_registry': 'D42',
+    'drs_backup': 'D44',
+}
+# The sheet asks "External NFS?" where the form asks "Use Internal NFS"
+NEGATED_INPUTS = ('internal_nfs',)
+
+# Named results -> CALCULATOR cells (the Hardware Dimensioning Output block and the summary)
+OUTPUT_CELLS = {
+    'ecs_master_nodes': 'G3', 'ecs_master_cpu': 'I3', 'ecs_master_ram': 'I4',
+    'ecs_master_os_disk': 'I5', 'ecs_master_longhorn_disk': 'I6',
+    'ecs_worker_nodes': 'G7', 'ecs_worker_cpu': 'I7', 'ecs_worker_ram': 'I8',
+    'ecs_worker_os_disk': 'I9', 'ecs_worker_longhorn_disk': 'I10', 'ecs_worker_cdw_disk': 'I11',
+    'ecs_external_nfs': 'I12',
+    'ocp_worker_nodes': 'G15', 'ocp_worker_cpu': 'I15', 'ocp_worker_ram': 'I16',
+    'ocp_cdw_100gb_disks': 'I18', 'ocp_cdw_630gb_disks': 'I19', 'ocp_external_nfs': 'I20', 'ocp_ocs': 'I21',
+    'ocp_disk_error': 'F22',
+    'ccu_ecs_cpu': 'G25', 'ccu_ecs_ram': 'H25', 'ccu_ocp_cpu': 'G26', 'ccu_ocp_ram': 'H26',
+    'workload_cpu': 'C55', 'workload_ram': 'D55', 'workload_storage': 'E55', 'backup_storage': 'E54',
+}
+
+
+class FormulaError(ValueError):
+    pass
+
+
+class ExcelError:
+    # An error value such as #DIV/0!, stored in a cell like any other value
+    __slots__ = ('code',)
+
+    def __init__(self, code):
+        self.code = code
+
+    def __repr__(self):
+        return self.code
+
+    __str__ = __repr__
+
+
+DIV0 = ExcelError('#DIV/0!')
+VALUE = ExcelError('#VALUE!')
+NUM = ExcelError('#NUM!')
+NA = ExcelError('#N/A')
+
+
+class _Raised(Exception):
+    # Carries an error value out of a formula
+    def __init__(self, error):
+        self.error = error
+
+
+class _Range(tuple):
+    # Values of a cell range, row by row
+    __slots__ = ()
+
+
+# -- Excel semantics used by the compiled formulas --
+
+def _n(x):
+    # Number value of a scalar operand
+    t = type(x)
+    if t is float or t is int:
+        return x
+    if x is None:
+        return 0
+    if t is bool:
+        return int(x)
+    if t is str:
+        try:
+            return float(x)
+        except ValueError:
+            raise _Raised(VALUE)
+    raise _Raised(x if t is ExcelError else VALUE)
+
+
+def _s(x):
+    # Text value, for &
+    t = type(x)
+    if t is str:
+        return x
+    if x is None:
+        return ''
+    if t is bool:
+        return 'TRUE' if x else 'FALSE'
+    if t is float or t is int:
+        return '%.15g' % x
+    raise _Raised(x if t is ExcelError else VALUE)
+
+
+def _truth(x):
+    t = type(x)
+    if t is bool:
+        return x
+    if t is float or t is int:
+        return x != 0
+    if x is None:
+        return False
+    if t is str and x.upper() in ('TRUE', 'FALSE'):
+        return x.upper() == 'TRUE'
+    raise _Raised(x if t is ExcelError else VALUE)
+
+
+def _rank(x):
+    # Excel orders numbers < text < logicals; text compares case-insensitively
+    t = type(x)
+    if t is float or t is int:
+        return 0, x
+    if t is str:
+        return 1, x.lower()
+    if t is bool:
+        return 2, x
+    raise _Raised(x if t is ExcelError else VALUE)
+
+
+def _cmp(a, b):
+    # -1, 0 or 1; a blank compares as the empty value of the other side's type
+    if a is None:
+        a = False if type(b) is bool else '' if type(b) is str else 0
+    if b is None:
+        b = False if type(a) is bool else '' if type(a) is str else 0
+    a, b = _rank(a), _rank(b)
+    return (a > b) - (a < b)
+
+
+def _div(a, b):
+    b = _n(b)
+    if b == 0:
+        raise _Raised(DIV0)
+    return _n(a) / b
+
+
+def _pow(a, b):
+    try:
+        result = _n(a) ** _n(b)
+    except ZeroDivisionError:
+        raise _Raised(DIV0)
+    if isinstance(result, complex):
+        raise _Raised(NUM)
+    return result
+
+
+def _numbers(args):
+    # SUM/MAX/MIN operands: direct arguments are coerced, while text,
+    # logicals and blanks inside a range are skipped
+    for arg in args:
+        if type(arg) is _Range:
+            for x in arg:
+                t = type(x)
+                if t is float or t is int:
+                    yield x
+                elif t is ExcelError:
+                    raise _Raised(x)
+        else:
+            yield _n(arg)
+
+
+def _round(x, digits, mode):
+    # Excel works to 15 significant digits, so noise below that (0.1*3 is
+    # 0.30000000000000004) must not push a value over a rounding boundary
+    x = _n(x)
+    scale = 10.0 ** int(_n(digits))
+    y = abs(x) * scale + (0.5 if mode == 'half' else 0)
+    nearest = round(y)
+    if abs(y - nearest) <= y * 5e-15:
+        y = nearest
+    y = (math.ceil(y) if mode == 'up' else math.floor(y)) / scale
+    return -y if x < 0 else y
+
+
+def _fn_sum(*args):
+    total = 0
+    for arg in args:
+        if type(arg) is _Range:
+            for x in arg:
+                t = type(x)
+                if t is float or t is int:
+                    total += x
+                elif t is ExcelError:
+                    raise _Raised(x)
+        else:
+            total += _n(arg)
+    return total
+
+
+def _fn_max(*args):
+    return max(_numbers(args), default=0)
+
+
+def _fn_min(*args):
+    return min(_numbers(args), default=0)
+
+
+def _fn_roundup(x, digits=0):
+    return _round(x, digits, 'up')
+
+
+def _fn_rounddown(x, digits=0):
+    return _round(x, digits, 'down')
+
+
+def _fn_round(x, digits=0):
+    return _round(x, digits, 'half')
+
+
+def _fn_abs(x):
+    return abs(_n(x))
+
+
+def _fn_and(*args):
+    return all([_truth(x) for arg in args for x in (arg if type(arg) is _Range else (arg,))])
+
+
+def _fn_or(*args):
+    return any([_truth(x) for arg in args for x in (arg if type(arg) is _Range else (arg,))])
+
+
+def _fn_not(x):
+    return not _truth(x)
+
+
+# Worksheet functions the compiler accepts (IF is compiled inline so only the taken branch runs)
+FUNCTIONS = {
+    'SUM': _fn_sum, 'MAX': _fn_max, 'MIN': _fn_min,
+    'ROUND': _fn_round, 'ROUNDUP': _fn_roundup, 'ROUNDDOWN': _fn_rounddown, 'ABS': _fn_abs,
+    'AND': _fn_and, 'OR': _fn_or, 'NOT': _fn_not,
+}
+
+
+# -- Parsing --
+
+_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<func>[A-Za-z_][\w.]*)\s*(?=\()
+  | (?P<ref>(?:(?:'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?)(?![\w(])
+  | (?P<bool>TRUE|FALSE)(?![\w(])
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<op><=|>=|<>|[-+*/^&=<>%(),])
+''', re.VERBOSE | re.IGNORECASE)
+
+_COMPARISONS = {'=': '==', '<>': '!=', '<': '<', '>': '>', '<=': '<=', '>=': '>='}
+
+
+def _tokens(source):
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        match = _TOKEN.match(source, pos)
+        if match is None:
+            raise FormulaError('unexpected %r at position %d' % (source[pos:pos + 10], pos))
+        pos = match.end()
+        if match.lastgroup != 'space':
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+    tokens.append(('end', ''))
+    return tokens
+
+
+def _cell_key(sheet, ref):
+    row, col = workbook.split_ref(ref)
+    return sheet, row, col
+
+
+def _ref_keys(text, sheet):
+    # 'Resources!$B$5' or 'C47:C53' -> [(sheet, row, col), ...], row by row
+    name, bang, cells = text.rpartition('!')
+    if bang:
+        sheet = name[1:-1].replace("''", "'") if name.startswith("'") else name
+    first, _, last = cells.partition(':')
+    top, left = workbook.split_ref(first)
+    bottom, right = workbook.split_ref(last or first)
+    top, bottom = min(top, bottom), max(top, bottom)
+    left, right = min(left, right), max(left, right)
+    return [(sheet, row, col) for row in range(top, bottom + 1) for col in range(left, right + 1)], bool(last)
+
+
+class _Parser:
+    # Recursive descent over Excel's operator precedence, producing nested tuples:
+    # ('num', x) ('str', s) ('bool', b) ('empty',) ('cell', key) ('range', keys)
+    # ('neg', a) ('pct', a) ('op', op, a, b) ('call', NAME, [args])
+
+    def __init__(self, source, sheet):
+        self.tokens = _tokens(source[1:] if source.startswith('=') else source)
+        self.pos = 0
+        self.sheet = sheet
+
+    def parse(self):
+        node = self.comparison()
+        if self.peek() != ('end', ''):
+            raise FormulaError('unexpected %r' % self.peek()[1])
+        return node
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def binary(self, operators, operand):
+        node = operand()
+        while self.peek()[0] == 'op' and self.peek()[1] in operators:
+            node = ('op', self.take()[1], node, operand())
+        return node
+
+    def comparison(self):
+        return self.binary(_COMPARISONS, self.concat)
+
+    def concat(self):
+        return self.binary(('&',), self.additive)
+
+    def additive(self):
+        return self.binary(('+', '-'), self.term)
+
+    def term(self):
+        return self.binary(('*', '/'), self.power)
+
+    def power(self):
+        return self.binary(('^',), self.unary)
+
+    def unary(self):
+        if self.peek() in (('op', '-'), ('op', '+')):
+            sign = self.take()[1]
+            node = self.unary()
+            return ('neg', node) if sign == '-' else node
+        node = self.primary()
+        while self.peek() == ('op', '%'):
+            self.take()
+            node = ('pct', node)
+        return node
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'number':
+            value = float(text)
+            return ('num', int(value) if value.is_integer() and abs(value) < 2 ** 53 else value)
+        if kind == 'string':
+            return ('str', text[1:-1].replace('""', '"'))
+        if kind == 'bool':
+            return ('bool', text.upper() == 'TRUE')
+        if kind == 'ref':
+            keys, is_range = _ref_keys(text, self.sheet)
+            return ('range', keys) if is_range else ('cell', keys[0])
+        if kind == 'func':
+            name = text.upper()
+            self.take()  # (
+            args = []
+            if self.peek() == ('op', ')'):
+                self.take()
+                return ('call', name, args)
+            while True:
+                args.append(('empty',) if self.peek() in (('op', ','), ('op', ')')) else self.comparison())
+                kind, text = self.take()
+                if text == ')':
+                    return ('call', name, args)
+                if text != ',':
+                    raise FormulaError('expected , or ) in %s()' % name)
+        if (kind, text) == ('op', '('):
+            node = self.comparison()
+            if self.take() != ('op', ')'):
+                raise FormulaError('missing )')
+            return node
+        raise FormulaError('unexpected %r' % (text or 'end of formula'))
+
+
+def parse(source, sheet=ROOT_SHEET):
+    # '=SUM(C47:C53)' -> expression tree; references without a sheet name are on sheet
+    return _Parser(source, sheet).parse()
+
+
+def _references(node):
+    kind = node[0]
+    if kind == 'cell':
+        yield node[1]
+    elif kind == 'range':
+        yield from node[1]
+    elif kind in ('neg', 'pct'):
+        yield from _references(node[1])
+    elif kind == 'op':
+        yield from _references(node[2])
+        yield from _references(node[3])
+    elif kind == 'call':
+        for arg in node[2]:
+            yield from _references(arg)
+
+
+# Functions whose result is always a number, so callers need no _n() around it
+_NUMERIC_FUNCTIONS = ('SUM', 'MAX', 'MIN', 'ROUND', 'ROUNDUP', 'ROUNDDOWN', 'ABS')
+
+
+def _python(node, slot):
+    # Expression tree -> (Python expression over the value list v, result type).
+    # The type is 'num' or 'bool' when known at compile time, which saves the
+    # coercion calls on most operands.
+    kind = node[0]
+    if kind == 'num':
+        return repr(node[1]), 'num'
+    if kind == 'bool':
+        return repr(node[1]), 'bool'
+    if kind == 'str':
+        return repr(node[1]), None
+    if kind == 'empty':
+        return '0', 'num'
+    if kind == 'cell':
+        return 'v[%d]' % slot[node[1]], None
+    if kind == 'range':
+        return '_Range((%s,))' % ', '.join('v[%d]' % slot[key] for key in node[1]), None
+    if kind == 'neg':
+        return '(-%s)' % _number(node[1], slot), 'num'
+    if kind == 'pct':
+        return '(%s / 100)' % _number(node[1], slot), 'num'
+    if kind == 'op':
+        op = node[1]
+        if op in _COMPARISONS:
+            return '(_cmp(%s, %s) %s 0)' % (_python(node[2], slot)[0], _python(node[3], slot)[0],
+                                            _COMPARISONS[op]), 'bool'
+        if op == '&':
+            return '(_s(%s) + _s(%s))' % (_python(node[2], slot)[0], _python(node[3], slot)[0]), None
+        a, b = _number(node[2], slot), _number(node[3], slot)
+        if op == '/':
+            if node[3][0] == 'num' and node[3][1] != 0:
+                return '(%s / %s)' % (a, b), 'num'
+            return '_div(%s, %s)' % (a, b), 'num'
+        if op == '^':
+            return '_pow(%s, %s)' % (a, b), 'num'
+        return '(%s %s %s)' % (a, op, b), 'num'
+    name = node[1]
+    if name == 'IF':
+        args = node[2]
+        if not 2 <= len(args) <= 3:
+            raise FormulaError('IF takes 2 or 3 arguments')
+        test, test_type = _python(args[0], slot)
+        if test_type != 'bool':
+            test = '_truth(%s)' % test
+        then, then_type = _python(args[1], slot)
+        other, other_type = _python(args[2], slot) if len(args) == 3 else ('False', 'bool')
+        return '(%s if %s else %s)' % (then, test, other), then_type if then_type == other_type else None
+    if name not in FUNCTIONS:
+        raise FormulaError('unsupported function %s()' % name)
+    if name in ('SUM', 'MAX', 'MIN') and node[2] and all(arg[0] != 'range' for arg in node[2]):
+        # Plain arguments only: Python's own sum/max/min over the coerced values
+        args = [_number(arg, slot) for arg in node[2]]
+        if len(args) == 1:
+            return args[0], 'num'
+        if name == 'SUM':
+            return '(%s)' % ' + '.join(args), 'num'
+        return '%s(%s)' % (name.lower(), ', '.join(args)), 'num'
+    args = ', '.join(_python(arg, slot)[0] for arg in node[2])
+    return '_fn_%s(%s)' % (name.lower(), args), 'num' if name in _NUMERIC_FUNCTIONS else 'bool'
+
+
+def _number(node, slot):
+    code, kind = _python(node, slot)
+    return code if kind == 'num' else '_n(%s)' % code
+
+
+_NAMESPACE = {'_n': _n, '_s': _s, '_truth': _truth, '_cmp': _cmp, '_div': _div, '_pow': _pow, '_Range': _Range}
+_NAMESPACE.update(('_fn_%s' % name.lower(), fn) for name, fn in FUNCTIONS.items())
+
+
+def _column_letters(col):
+    letters = ''
+    col += 1
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def cell_name(key, sheet=ROOT_SHEET):
+    # (sheet, row, col) -> 'G7' on the root sheet, 'Resources!B5' elsewhere
+    name = '%s%d' % (_column_letters(key[2]), key[1] + 1)
+    if key[0] == sheet:
+        return name
+    return ("'%s'!%s" % (key[0].replace("'", "''"), name)) if re.search(r'\W', key[0]) else '%s!%s' % (key[0], name)
+
+
+def _plain(value):
+    # Output form of a cell value: whole numbers as int, Excel's 15 digits otherwise
+    if type(value) is float:
+        value = float('%.15g' % value)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, ExcelError):
+        return value.code
+    return value
+
+
+class Graph:
+    # The compiled formulas of one workbook version: a value slot per cell,
+    # a function per formula cell, and for every cell the formulas downstream
+    # of it in evaluation order. Immutable once built; Calculations share it.
+
+    def __init__(self, version, keys, constants, formulas, cached):
+        self.version = version
+        self.keys = tuple(keys)
+        self.slot = {key: i for i, key in enumerate(self.keys)}
+        self.names = tuple(cell_name(key) for key in self.keys)
+        self.by_name = {name: i for i, name in enumerate(self.names)}
+        self.cached = cached  # slot -> value Excel last calculated
+
+        # Dependency edges and a topological order (Kahn's algorithm)
+        trees = {key: parse(source, key[0]) for key, source in formulas.items()}
+        users = {}
+        pending = {}
+        for key, tree in trees.items():
+            precedents = set(_references(tree))
+            pending[key] = len(precedents & set(trees))
+            for ref in precedents:
+                users.setdefault(ref, []).append(key)
+        ready = sorted((key for key, count in pending.items() if not count), key=self.slot.get)
+        order = []
+        while ready:
+            key = ready.pop()
+            order.append(key)
+            for user in users.get(key, ()):
+                pending[user] -= 1
+                if not pending[user]:
+                    ready.append(user)
+        if len(order) != len(trees):
+            cycle = sorted(cell_name(key) for key in trees if pending[key])
+            raise FormulaError('circular reference among %s' % ', '.join(cycle))
+
+        # One generated function per formula cell, compiled together
+        lines = []
+        for key in order:
+            lines.append('def f%d(v):' % self.slot[key])
+            lines.append('    return %s  # %s' % (_python(trees[key], self.slot)[0],
+                                                  formulas[key].replace('\n', ' ')))
+        self.source = '\n'.join(lines) + '\n'
+        namespace = dict(_NAMESPACE)
+        exec(compile(self.source, '<formulas %s>' % (version or 'workbook'), 'exec'), namespace)
+        position = {self.slot[key]: i for i, key in enumerate(order)}
+        self.order = tuple((self.slot[key], namespace['f%d' % self.slot[key]]) for key in order)
+
+        # Downstream formulas of every cell, each list in evaluation order;
+        # a formula's users come after it, so walking backwards finds theirs first
+        downstream = {}
+        for key in list(reversed(order)) + [key for key in self.keys if key not in trees]:
+            below = set()
+            for user in users.get(key, ()):
+                below.add(self.slot[user])
+                below |= downstream[self.slot[user]]
+            downstream[self.slot[key]] = below
+        functions = dict(self.order)
+        self.downstream = {i: tuple((j, functions[j]) for j in sorted(below, key=position.get))
+                           for i, below in downstream.items()}
+        self.position = position
+
+        values = [constants.get(key) for key in self.keys]
+        _recalculate(values, self.order)
+        self.values = tuple(values)
+
+        for field, ref in INPUT_CELLS.items():
+            if ref not in self.by_name or self.by_name[ref] in position:
+                raise FormulaError('input %s: %s!%s is not an input cell of the formulas' % (field, ROOT_SHEET, ref))
+        self.inputs = {field: self.by_name[ref] for field, ref in INPUT_CELLS.items()}
+        # Every formula that depends on some input, in evaluation order
+        below = {}
+        for i in self.inputs.values():
+            below.update(self.downstream[i])
+        self.input_order = tuple(sorted(below.items(), key=lambda item: position[item[0]]))
+        self.outputs = {name: self.by_name[ref] for name, ref in OUTPUT_CELLS.items()}
+
+    def calculation(self):
+        return Calculation(self)
+
+    def check(self):
+        # Formula cells whose value differs from what Excel cached for the
+        # sheet's own inputs -> [(cell, excel value, computed value)]
+        mismatches = []
+        for i, _ in self.order:
+            excel, ours = self.cached.get(i), _plain(self.values[i])
+            if isinstance(excel, float):
+                excel = _plain(excel)
+            same = excel == ours or (excel is None and ours in (0, '')) or (
+                isinstance(excel, (int, float)) and isinstance(ours, (int, float)) and
+                not isinstance(excel, bool) and math.isclose(excel, ours, rel_tol=1e-12, abs_tol=1e-9))
+            if not same:
+                mismatches.append((self.names[i], excel, ours))
+        return mismatches
+
+
+def _recalculate(values, functions):
+    for i, fn in functions:
+        try:
+            value = fn(values)
+        except _Raised as exc:
+            value = exc.error
+        except ZeroDivisionError:
+            value = DIV0
+        except (OverflowError, ValueError):
+            value = NUM
+        values[i] = 0 if value is None else value
+
+
+class Calculation:
+    # Cell values for one scenario, starting from the sheet as saved
+
+    __slots__ = ('graph', 'values')
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.values = list(graph.values)
+
+    def copy(self):
+        other = Calculation.__new__(Calculation)
+        other.graph, other.values = self.graph, list(self.values)
+        return other
+
+    def __getitem__(self, ref):
+        # calc['G7'], calc['Resources!B5']
+        return _plain(self.values[self.graph.by_name[ref]])
+
+    def set(self, ref, value):
+        return self._apply({self.graph.by_name[ref]: value})
+
+    def set_inputs(self, inputs):
+        # Form field values (any subset) -> names of the cells whose value changed
+        slots = self.graph.inputs
+        changes = {}
+        for field, value in inputs.items():
+            if field in slots:
+                if field in NEGATED_INPUTS:
+                    value = not value
+                changes[slots[field]] = value
+        return self._apply(changes)
+
+    def _apply(self, changes):
+        graph, values = self.graph, self.values
+        changed = [i for i, value in changes.items() if values[i] != value or type(values[i]) is not type(value)]
+        if not changed:
+            return ()
+        for i in changed:
+            if i in graph.position:
+                raise FormulaError('%s is a formula cell' % graph.names[i])
+        for i in changed:
+            values[i] = changes[i]
+        if len(changed) == 1:
+            functions = graph.downstream[changed[0]]
+        else:
+            below = {}
+            for i in changed:
+                below.update(graph.downstream[i])
+            functions = sorted(below.items(), key=lambda item: graph.position[item[0]])
+        before = [values[i] for i, _ in functions]
+        _recalculate(values, functions)
+        names = graph.names
+        return tuple([names[i] for i in changed] +
+                     [names[i] for (i, _), old in zip(functions, before) if values[i] != old])
+
+    def outputs(self):
+        values = self.values
+        return {name: _plain(values[i]) for name, i in self.graph.outputs.items()}
+
+
+def build(read=workbook.sheet, version=None, root=ROOT_SHEET):
+    # Compiles every formula reachable from the root sheet; read(name) -> workbook.Sheet
+    sheets = {}
+
+    def sheet(name):
+        if name not in sheets:
+            try:
+                sheets[name] = read(name)
+            except KeyError:
+                raise FormulaError('sheet %r is not in the workbook' % name)
+        return sheets[name]
+
+    root_sheet = sheet(root)
+    todo = [(root, row, col) for row, col in root_sheet.formulas]
+    todo += [_cell_key(root, ref) for ref in list(INPUT_CELLS.values()) + list(OUTPUT_CELLS.values())]
+    formulas, constants, cached = {}, {}, {}
+    seen = set()
+    keys = []
+    while todo:
+        key = todo.pop()
+        if key in seen:
+            continue
+        seen.add(key)
+        keys.append(key)
+        name, row, col = key
+        source = sheet(name).formulas.get((row, col))
+        value = sheet(name).at(row, col)
+        if source is None:
+            constants[key] = value
+            continue
+        formulas[key] = source
+        cached[key] = value
+        try:
+            todo.extend(_references(parse(source, name)))
+        except FormulaError as exc:
+            raise FormulaError('%s %s: %s' % (cell_name(key), source, exc))
+    keys.sort()
+    slot = {key: i for i, key in enumerate(keys)}
+    # Whole numbers read from the float grid behave like Excel's; keep them as int
+    constants = {key: int(v) if isinstance(v, float) and v.is_integer() else v for key, v in constants.items()}
+    return Graph(version, keys, constants, formulas, {slot[key]: value for key, value in cached.items()})
+
+
+_lock = threading.Lock()
+
+
+def current():
+    # Graph for the workbook snapshot in use, compiled once per snapshot
+    snapshot = workbook.snapshot()
+    if snapshot is None:
+        raise FormulaError('The %s formulas need the workbook' % ROOT_SHEET)
+    graph = snapshot.derived.get('formulas')
+    if graph is not None:
+        return graph
+    with _lock:
+        graph = snapshot.derived.get('formulas')
+        if graph is None:
+            graph = snapshot.derived['formulas'] = build(snapshot.sheet, snapshot.version)
+            log.info('Compiled %d %s formulas for workbook %s', len(graph.order), ROOT_SHEET, snapshot.version)
+    return graph
+
+
+def calculate(inputs):
+    # Form field values -> OUTPUT_CELLS results, as the workbook computes them.
+    # A whole scenario changes most inputs, so this runs every formula that
+    # depends on one instead of working out which are downstream of the change.
+    calc = current().calculation()
+    values, slots = calc.values, calc.graph.inputs
+    for field, value in inputs.items():
+        if field in slots:
+            values[slots[field]] = (not value) if field in NEGATED_INPUTS else value
+    _recalculate(values, calc.graph.input_order)
+    return calc.outputs()
+
+
+def main(argv=None):
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description='Compile the CALCULATOR formulas and check them against Excel.')
+    parser.add_argument('--workbook', default=workbook.LOCAL_PATH,
+                        help='sizing.xlsx to read (default: the one next to the code)')
+    parser.add_argument('--source', action='store_true', help='print the generated Python')
+    args = parser.parse_args(argv)
+
+    workbook.configure(args.workbook, sheets=(ROOT_SHEET, 'Resources'))
+    start = time.perf_counter()
+    graph = current()
+    compiled = time.perf_counter() - start
+    if args.source:
+        print(graph.source)
+        return 0
+    mismatches = graph.check()
+    for name, excel, ours in mismatches:
+        print('%s: Excel %r, computed %r' % (name, excel, ours))
+
+    calc = graph.calculation()
+    fields = ('impala_prod_exec', 'cml_medium_session', 'environment')
+    n = 20000
+    start = time.perf_counter()
+    for i in range(n):
+        calc.set_inputs({fields[i % 3]: 1 + i % 7})
+    edit = (time.perf_counter() - start) / n
+    print(json.dumps({
+        'formulas': len(graph.order),
+        'cells': len(graph.keys),
+        'compile_seconds': round(compiled, 4),
+        'mismatches': len(mismatches),
+        'single_edit_us': round(edit * 1e6, 2),
+    }, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+# gunicorn settings for the sizing calculator:
+#   gunicorn -c gunicorn.conf.py 'wsgi:create_app()'
+# Every setting can be overridden from the environment.
+import logging
+import multiprocessing
+import os
+
+bind = os.environ.get('SIZING_BIND', '0.0.0.0:5000')
+
+# Requests are short and CPU bound (numpy), so one worker per core; threads
+# cover the time spent reading request bodies and writing responses.
+workers = int(os.environ.get('SIZING_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('SIZING_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Build the app (and load the workbook) once in the master, then fork
+preload_app = True
+
+timeout = int(os.environ.get('SIZING_TIMEOUT', 120))
+keepalive = 5
+max_requests = int(os.environ.get('SIZING_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('SIZING_ACCESS_LOG') or None
+loglevel = os.environ.get('SIZING_LOG_LEVEL', 'info')
+
+
+# The app logs through the standard logging module; gunicorn only configures its own loggers
+logging.basicConfig(level=getattr(logging, loglevel.upper(), logging.INFO))
+
+
+def post_fork(server, worker):
+    # The master's workbook watcher thread does not survive the fork; each
+    # worker runs its own so it picks up a changed sizing.xlsx without a restart
+    import app
+
+    app.watch_workbook()
@@ -0,0 +1,90 @@
+"""Closed-loop HTTP load test for a running calculator.
+
+Each of --concurrency threads keeps one keep-alive connection and sends
+requests back to back for --duration seconds, alternating GET / and
+POST /calculate (varying one input so the result cache is not always hit,
+unless --same).  Prints requests/second and latency percentiles as JSON.
+
+    python loadtest.py http://127.0.0.1:5000 --concurrency 16 --duration 20
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+
+def _worker(url, deadline, requests, latencies, errors, distinct):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    i = 0
+    while time.perf_counter() < deadline:
+        method, path, body = requests[i % len(requests)]
+        if body is not None and distinct:
+            body = body + '&impala_prod_exec=%d' % (1 + i % distinct)
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers if body is not None else {})
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors.append(1)
+    conn.close()
+
+
+def run(url, concurrency=8, duration=10.0, distinct=1000):
+    form = urlencode({'hive_vw': 1, 'cml_medium_session': 10})
+    requests = [('GET', '/', None), ('POST', '/calculate', form)]
+    per_thread = [[] for _ in range(concurrency)]
+    errors = []
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [threading.Thread(target=_worker, args=(url, deadline, requests, latencies, errors, distinct))
+               for latencies in per_thread]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([np.array(values) for values in per_thread]) * 1000
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0, 0, 0)
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 2),
+        'requests': int(len(latencies)),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {'p50': round(p50, 2), 'p90': round(p90, 2), 'p99': round(p99, 2),
+                       'max': round(float(latencies.max()), 2) if len(latencies) else 0},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test a running sizing calculator.')
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--distinct', type=int, default=1000,
+                        help='distinct /calculate inputs to cycle through (default 1000)')
+    parser.add_argument('--same', action='store_true', help='send identical /calculate requests')
+    args = parser.parse_args(argv)
+    result = run(args.url, args.concurrency, args.duration, 0 if args.same else args.distinct)
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
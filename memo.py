@@ -0,0 +1,286 @@
+"""Bounded LRU memoization for sizing results and rendered pages.
+
+Entries are keyed on a canonical hash of the typed inputs, expire after an
+optional TTL and are all dropped when a new workbook data version appears.
+Hit, miss, eviction and invalidation counters are kept so the cache can be
+sized from real traffic.
+
+SharedCache is a second level shared by every worker process on the host:
+an SQLite file in WAL mode, so a scenario sized or a page rendered by one
+worker is not computed again by the others, nor after a restart.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+_UNSET = object()
+log = logging.getLogger(__name__)
+
+
+def input_key(inputs):
+    # Canonical hash of a typed input dict: same values, same key, whatever the key order
+    payload = json.dumps(inputs, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=None, version=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = version  # callable returning the current data version
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = _UNSET
+        self._retired = deque(maxlen=8)
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def _current(self):
+        # The caller's data version, read before the lock is taken: finding
+        # it may load a new workbook, which must not hold up other lookups
+        return None if self.version is None else self.version()
+
+    def _check_version(self, current):
+        # Entries are tagged with the version they were computed for and the
+        # cache is cleared when a new one appears; a request still finishing
+        # on a retired version neither sees newer entries, overwrites them nor
+        # clears them again.
+        if current is None:
+            return None
+        if current != self._version and current not in self._retired:
+            if self._version is not _UNSET:
+                self._data.clear()
+                self.invalidations += 1
+                self._retired.append(self._version)
+            self._version = current
+        return current
+
+    def get(self, key, default=None):
+        current = self._current()
+        with self._lock:
+            version = self._check_version(current)
+            entry = self._data.get(key)
+            if entry is None or entry[2] != version:
+                self.misses += 1
+                return default
+            value, expires, _ = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        current = self._current()
+        with self._lock:
+            version = self._check_version(current)
+            if version is not None and version != self._version:
+                return
+            self._data[key] = (value, expires, version)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    used REAL NOT NULL,
+    expires REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+"""
+
+
+class SharedCache:
+    # Cross-process cache of JSON-serializable values in an SQLite file.
+    # Each write is one atomic statement, so readers in other processes see
+    # the old entry or the new one, never part of it.  Entries carry the data
+    # version they were computed for, and one from another version is a miss.
+    # Past maxsize the least recently used entries (and any of an old
+    # version) are deleted; to keep reads cheap an entry's last use is only
+    # refreshed once every `touch` seconds.  The cache never fails a request:
+    # a lookup that cannot get at the file is a miss and a store is skipped.
+    # `path` may be a callable, resolved when a connection is opened, so the
+    # file can follow a workbook configured after the cache was created.
+
+    def __init__(self, path, maxsize=20000, ttl=None, version=None, touch=60.0, timeout=0.05):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = version  # callable returning the current data version
+        self.touch = touch
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._version = _UNSET
+        self._retired = deque(maxlen=8)
+        self._puts = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = self.errors = 0
+
+    @property
+    def filename(self):
+        return self.path() if callable(self.path) else self.path
+
+    @property
+    def db(self):
+        # One connection per thread and process: a connection must not be used
+        # across fork(), so a worker forked from a preloaded master opens its own
+        local = self._local
+        path = self.filename
+        if getattr(local, 'pid', None) != os.getpid() or local.path != path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            db = sqlite3.connect(path, timeout=self.timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            # Losing the last writes in a power cut only costs a recomputation
+            db.execute('PRAGMA synchronous=OFF')
+            db.executescript(_SHARED_SCHEMA)
+            local.db, local.pid, local.path = db, os.getpid(), path
+        return local.db
+
+    def _current(self):
+        # -> the caller's data version; self._version is the newest one seen
+        current = '' if self.version is None else str(self.version())
+        with self._lock:
+            if current != self._version and current not in self._retired:
+                if self._version is not _UNSET:
+                    self.invalidations += 1
+                    self._retired.append(self._version)
+                self._version = current
+        return current
+
+    def _count(self, counter, n=1):
+        # Counters are shared by the request threads of the process
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, key, default=None):
+        if self.maxsize <= 0:
+            return default
+        version = self._current()
+        try:
+            db = self.db
+            row = db.execute('SELECT version, value, used, expires FROM entries WHERE key = ?', (key,)).fetchone()
+            now = time.time()
+            if row is None or row[0] != version:
+                self._count('misses')
+                return default
+            if row[3] is not None and row[3] < now:
+                db.execute('DELETE FROM entries WHERE key = ? AND expires = ?', (key, row[3]))
+                self._count('expirations')
+                self._count('misses')
+                return default
+            if now - row[2] > self.touch:
+                db.execute('UPDATE entries SET used = ? WHERE key = ?', (now, key))
+        except (sqlite3.Error, OSError) as exc:
+            self._failed(exc)
+            self._count('misses')
+            return default
+        self._count('hits')
+        return json.loads(row[1])
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        version = self._current()
+        if version != self._version:
+            # Computed on a retired version: keep the current version's entry
+            return
+        now = time.time()
+        try:
+            self.db.execute('INSERT OR REPLACE INTO entries (key, version, value, used, expires) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            (key, version, json.dumps(value, separators=(',', ':')), now,
+                             now + self.ttl if self.ttl else None))
+        except (sqlite3.Error, OSError) as exc:
+            self._failed(exc)
+            return
+        # Trim every maxsize/16 stores rather than counting on each one
+        with self._lock:
+            self._puts += 1
+            due = self._puts >= max(self.maxsize // 16, 1)
+            if due:
+                self._puts = 0
+        if due:
+            self.trim()
+
+    def trim(self):
+        # Drop entries of older versions, then the least recently used past maxsize
+        try:
+            db = self.db
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                self._current()
+                dropped = db.execute('DELETE FROM entries WHERE version != ?', (self._version,)).rowcount
+                excess = db.execute('SELECT count(*) FROM entries').fetchone()[0] - self.maxsize
+                if excess > 0:
+                    dropped += db.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entries '
+                                          'ORDER BY used LIMIT ?)', (excess,)).rowcount
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        except (sqlite3.Error, OSError) as exc:
+            self._failed(exc)
+            return
+        self._count('evictions', dropped)
+
+    def clear(self):
+        try:
+            self.db.execute('DELETE FROM entries')
+        except (sqlite3.Error, OSError) as exc:
+            self._failed(exc)
+
+    def _failed(self, exc):
+        self._count('errors')
+        log.debug('Shared cache %s unavailable: %s', self.filename, exc)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        try:
+            size = self.db.execute('SELECT count(*) FROM entries').fetchone()[0]
+        except (sqlite3.Error, OSError):
+            size = None
+        return {
+            'size': size,
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'errors': self.errors,
+        }
@@ -0,0 +1,148 @@
+"""Request metrics in the Prometheus text format.
+
+A few fixed-bucket histograms and counters, kept in plain lists under one
+lock each, plus gauges read from callbacks at scrape time (cache and
+workbook stats).  Recording a request costs a bisect and a few additions,
+so it is always on.  Values are per process: with several gunicorn
+workers each one reports its own.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds; fine at the low end, where almost every request falls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+                             for name, value in zip(names, values))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s histogram' % self.name]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append('%s_bucket%s %d' % (self.name, _labels(self.labels + ('le',), labels + (le,)), cumulative))
+            lines.append('%s_sum%s %s' % (self.name, _labels(self.labels, labels), _number(values[-1])))
+            lines.append('%s_count%s %d' % (self.name, _labels(self.labels, labels), cumulative))
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s counter' % self.name]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append('%s%s %s' % (self.name, _labels(self.labels, labels), _number(value)))
+        return lines
+
+
+class Collector:
+    # Metrics computed at scrape time: fn() -> iterable of (label values, value)
+    def __init__(self, name, help, kind='gauge', labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.fn = fn
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s %s' % (self.name, self.kind)]
+        for labels, value in self.fn():
+            if value is not None:
+                lines.append('%s%s %s' % (self.name, _labels(self.labels, labels), _number(value)))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'sizing_request_duration_seconds', 'Time to produce a response, by route.', ('route', 'method', 'status')))
+PHASE_SECONDS = REGISTRY.register(Histogram(
+    'sizing_request_phase_seconds', 'Time spent in each phase of a request.', ('route', 'phase')))
+REQUESTS = REGISTRY.register(Counter(
+    'sizing_requests_total', 'Requests served, by route and status.', ('route', 'method', 'status')))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Timer:
+    # Phase timings of one request: lap(name) charges the time since the previous lap to name
+    __slots__ = ('start', 'last', 'phases')
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def finish(self, route, method, status):
+        # Records the request and returns its Server-Timing header value
+        total = time.perf_counter() - self.start
+        REQUEST_SECONDS.observe(total, route, method, status)
+        REQUESTS.inc(1, route, method, status)
+        parts = []
+        for name, seconds in self.phases:
+            PHASE_SECONDS.observe(seconds, route, name)
+            parts.append('%s;dur=%.3f' % (name, seconds * 1000))
+        parts.append('total;dur=%.3f' % (total * 1000))
+        return ', '.join(parts)
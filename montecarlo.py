@@ -0,0 +1,218 @@
+"""Monte Carlo sizing for uncertain inputs.
+
+Any count can be given as a distribution instead of a point value:
+``triangular(low, mode, high)``, ``normal(mean, sd)`` or
+``discrete(v1, v2, ...)`` with optional ``value:weight`` pairs.  Samples
+are rounded to whole numbers, kept within the schema limits and drawn
+chunk by chunk from a seeded generator (chunk i uses the stream
+[seed, i]), so a seed and chunk size always give the same result.
+The engine model is restricted to the sampled inputs, with every other
+input folded into constants, and the sized outputs are tallied as
+value counts, so percentiles are exact and memory does not grow with the
+sample count.
+
+    python montecarlo.py 'cml_medium_session=triangular(2,5,12)' 'job_exec=normal(10,3)' \\
+        'impala_prod_exec=discrete(2:0.5,4:0.3,8:0.2)' --samples 1000000 --seed 1
+"""
+import argparse
+import json
+import os
+import re
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+import engine
+import schema
+import sweep
+import workbook
+
+DEFAULT_SAMPLES = 100000
+DEFAULT_CHUNK_SIZE = 100000
+MAX_SAMPLES = int(os.environ.get('SIZING_MAX_SAMPLES', 10000000))
+PERCENTILES = (50, 90, 99)
+REPORTED = ('nodes', 'cpu_cores', 'ram_gb', 'storage_gb')
+
+KINDS = ('triangular', 'normal', 'discrete')
+_SPEC = re.compile(r'^\s*(\w+)\s*\((.*)\)\s*$')
+
+
+class Distribution(NamedTuple):
+    name: str  # input it applies to
+    kind: str  # one of KINDS
+    params: tuple  # (low, mode, high), (mean, sd) or (values, probabilities)
+    spec: str
+
+    def sample(self, rng, n):
+        # -> n whole-number draws within the input's schema limits
+        if self.kind == 'discrete':
+            values, p = self.params
+            return rng.choice(values, size=n, p=p)
+        if self.kind == 'triangular':
+            draws = rng.triangular(*self.params, size=n)
+        else:
+            draws = rng.normal(*self.params, size=n)
+        field = schema.FIELDS[self.name]
+        low = field.min if field.min is not None else 0
+        high = field.max if field.max is not None else schema.MAX_VALUE
+        return np.clip(np.rint(draws), low, high).astype(np.int64)
+
+
+def parse_distribution(spec):
+    # 'name=kind(args)' -> Distribution; raises ValueError with the reason
+    name, sep, expr = spec.partition('=')
+    name = name.strip()
+    if not sep or name not in engine.INPUT_INDEX:
+        raise ValueError('Unknown input: %r' % spec)
+    match = _SPEC.match(expr)
+    if not match or match.group(1) not in KINDS:
+        raise ValueError('%s: expected %s, got %r' % (name, ', '.join(kind + '(...)' for kind in KINDS), expr))
+    kind, args = match.group(1), [arg.strip() for arg in match.group(2).split(',') if arg.strip()]
+    checkbox = isinstance(engine.INPUT_DEFAULTS[name], bool)
+    if kind == 'discrete':
+        values, weights = [], []
+        field = schema.FIELDS[name]
+        for arg in args:
+            value, _, weight = arg.partition(':')
+            try:
+                values.append(sweep.parse_value(name, value))
+                weights.append(float(weight) if weight else 1.0)
+            except ValueError:
+                raise ValueError('%s: discrete() takes values or value:weight pairs, got %r' % (name, arg))
+            if not checkbox and not (field.min or 0) <= values[-1] <= field.max:
+                raise ValueError('%s: %d is outside %d..%d' % (name, values[-1], field.min or 0, field.max))
+        if not values:
+            raise ValueError('%s: discrete() needs at least one value' % name)
+        weights = np.array(weights)
+        if not np.isfinite(weights).all() or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError('%s: weights must be finite, non-negative and not all zero' % name)
+        params = (np.array(values, dtype=np.int64), weights / weights.sum())
+    elif checkbox:
+        raise ValueError('%s is on/off; use discrete(on:p, off:q)' % name)
+    else:
+        try:
+            numbers = tuple(float(arg) for arg in args)
+        except ValueError:
+            raise ValueError('%s: %s() takes numbers, got %r' % (name, kind, expr))
+        if not np.isfinite(numbers).all():
+            raise ValueError('%s: %s() takes finite numbers, got %r' % (name, kind, expr))
+        if kind == 'triangular':
+            if len(numbers) != 3 or not numbers[0] <= numbers[1] <= numbers[2] or numbers[0] == numbers[2]:
+                raise ValueError('%s: triangular(low, mode, high) needs low <= mode <= high, low < high' % name)
+        elif len(numbers) != 2 or numbers[1] < 0:
+            raise ValueError('%s: normal(mean, sd) needs a non-negative sd' % name)
+        params = numbers
+    return Distribution(name, kind, params, expr.strip())
+
+
+class _Tally:
+    # Value counts of one output: percentiles are exact and the memory is
+    # bounded by the number of distinct values, not the number of samples
+    def __init__(self):
+        self.values = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def add(self, column):
+        values, counts = np.unique(column, return_counts=True)
+        if len(self.values):
+            values, index = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+            counts = np.bincount(index, weights=np.concatenate([self.counts, counts])).astype(np.int64)
+        self.values, self.counts = values, counts
+
+    def summary(self, percentiles=PERCENTILES):
+        # Percentiles by the inverse CDF: the smallest value with at least q% of samples at or below it
+        total = self.counts.sum()
+        cumulative = np.cumsum(self.counts)
+        result = {}
+        for q in percentiles:
+            i = min(int(np.searchsorted(cumulative, q / 100 * total)), len(self.values) - 1)
+            result['p%g' % q] = _plain(self.values[i])
+        result['mean'] = round(float((self.values * self.counts).sum() / total), 3)
+        result['min'] = _plain(self.values[0])
+        result['max'] = _plain(self.values[-1])
+        return result
+
+
+def _plain(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def simulate(distributions, inputs=None, samples=DEFAULT_SAMPLES, seed=None, outputs=REPORTED,
+             percentiles=PERCENTILES, chunk_size=DEFAULT_CHUNK_SIZE, model=None):
+    # distributions: Distribution per sampled input; inputs: point values of
+    # the rest (form defaults otherwise). -> percentiles per output.
+    if not distributions:
+        raise ValueError('at least one input needs a distribution')
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError('samples must be between 1 and %d, got %d' % (MAX_SAMPLES, samples))
+    names = [d.name for d in distributions]
+    if len(set(names)) != len(names):
+        raise ValueError('an input has more than one distribution')
+    if not all(0 < q <= 100 for q in percentiles):
+        raise ValueError('percentiles must be between 0 and 100')
+    unknown = [name for name in outputs if name not in engine.OUTPUT_INDEX]
+    if unknown:
+        raise ValueError('Unknown outputs: %s' % ', '.join(unknown))
+    if model is None:
+        import catalog
+
+        model = catalog.current().model
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy)
+
+    start = time.perf_counter()
+    restricted = model.restrict(dict(engine.INPUT_DEFAULTS, **(inputs or {})), names)
+    columns = [engine.OUTPUT_INDEX[name] for name in outputs]
+    tallies = [_Tally() for _ in outputs]
+    for chunk, first in enumerate(range(0, samples, chunk_size)):
+        n = min(chunk_size, samples - first)
+        rng = np.random.default_rng([seed, chunk])
+        Z = np.column_stack([d.sample(rng, n) for d in distributions])
+        out = restricted.evaluate(Z)
+        for tally, column in zip(tallies, columns):
+            tally.add(out[:, column])
+    return {
+        'samples': samples,
+        'seed': seed,
+        'seconds': round(time.perf_counter() - start, 3),
+        'distributions': {d.name: d.spec for d in distributions},
+        'outputs': {name: tally.summary(percentiles) for name, tally in zip(outputs, tallies)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Percentiles of the sizing outputs under uncertain inputs.')
+    parser.add_argument('distributions', nargs='+',
+                        help="e.g. 'job_exec=normal(10,3)' 'cml_medium_session=triangular(2,5,12)' "
+                             "'impala_prod_exec=discrete(2:0.5,4:0.3,8:0.2)'")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--percentiles', default=','.join(map(str, PERCENTILES)), help='default: 50,90,99')
+    parser.add_argument('--outputs', default=','.join(REPORTED), help='default: %s' % ','.join(REPORTED))
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='point value of another input (default: form defaults)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    args = parser.parse_args(argv)
+    workbook.configure(args.workbook)
+
+    try:
+        distributions = [parse_distribution(spec) for spec in args.distributions]
+        inputs = {}
+        for item in args.set:
+            name, _, value = item.partition('=')
+            if name not in engine.INPUT_INDEX:
+                raise ValueError('Unknown input: %r' % name)
+            inputs[name] = sweep.parse_value(name, value)
+        percentiles = [float(q) for q in args.percentiles.split(',')]
+        result = simulate(distributions, inputs, args.samples, args.seed, args.outputs.split(','),
+                          percentiles, max(args.chunk, 1))
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
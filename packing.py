@@ -0,0 +1,120 @@
+"""Pod placement onto nodes of a fixed shape.
+
+The workload inputs are expanded into pods (executors, coordinators,
+drivers, sessions, Data Viz instances) and packed onto nodes of
+max_cpu_per_node / max_ram_per_node / max_storage_per_node with
+multi-dimensional first-fit decreasing.  Pods of one kind are identical,
+so each kind is placed across all open nodes in one vectorized step
+(identical items under first fit fill nodes strictly in order), which
+keeps 50k+ pods well under a second.
+"""
+import numpy as np
+
+import schema
+
+NODE_DEFAULTS = {field.name: field.default for field in schema.NODE_FIELDS}
+RESOURCES = ('cpu', 'ram_gb', 'storage_gb')
+
+
+def expand_pods(inputs, pods=None):
+    # -> list of (kind, count, size array) for kinds with a positive count.
+    # pods: (kind, count input, cpu, ram, local disk) with cpu/ram a constant
+    # or a per-unit input; defaults to the pod components of the catalog.
+    if pods is None:
+        import catalog
+
+        pods = catalog.current().pods()
+    kinds = []
+    for kind, count, cpu, ram, disk in pods:
+        n = int(inputs[count])
+        if n <= 0:
+            continue
+        size = [inputs[v] if isinstance(v, str) else v for v in (cpu, ram, disk)]
+        kinds.append((kind, n, np.array(size, dtype=np.float64)))
+    return kinds
+
+
+class Packing:
+    def __init__(self, capacity, used, counts, kinds, unplaced):
+        self.capacity = capacity
+        self.used = used  # nodes x RESOURCES
+        self.counts = counts  # nodes x kinds, pods of each kind per node
+        self.kinds = kinds
+        self.unplaced = unplaced  # {kind: count} of pods larger than a node
+
+    @property
+    def nodes(self):
+        return len(self.used)
+
+    @property
+    def utilisation(self):
+        return self.used / self.capacity
+
+    def summary(self):
+        util = self.utilisation if self.nodes else np.zeros((1, len(RESOURCES)))
+        return {
+            'nodes': self.nodes,
+            'pods': int(self.counts.sum()),
+            'node_shape': dict(zip(RESOURCES, self.capacity.tolist())),
+            'mean_utilisation': dict(zip(RESOURCES, util.mean(axis=0).round(3).tolist())),
+            'max_utilisation': dict(zip(RESOURCES, util.max(axis=0).round(3).tolist())),
+            'unplaced': self.unplaced,
+        }
+
+    def per_node(self):
+        # One dict per node: utilisation per resource and pods by kind
+        rows = []
+        for used, counts in zip(self.utilisation.round(3).tolist(), self.counts.tolist()):
+            row = dict(zip(RESOURCES, used))
+            row['pods'] = {kind: n for kind, n in zip(self.kinds, counts) if n}
+            rows.append(row)
+        return rows
+
+
+def _fits(free, size, limit):
+    # How many pods of `size` fit into each row of `free`, capped at `limit`
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fits = np.where(size > 0, np.floor(free / size), np.inf).min(axis=-1)
+    return np.minimum(fits, limit).astype(np.int64)
+
+
+def pack(inputs, node_shape=None, pods=None):
+    # First-fit decreasing over kinds ordered by their largest share of a node
+    shape = dict(NODE_DEFAULTS, **(node_shape or {}))
+    capacity = np.array([shape['max_cpu_per_node'], shape['max_ram_per_node'], shape['max_storage_per_node']],
+                        dtype=np.float64)
+    if (capacity <= 0).any():
+        raise ValueError('Node shape must be positive: %r' % shape)
+    kinds = expand_pods(inputs, pods)
+    kinds.sort(key=lambda k: (k[2] / capacity).max(), reverse=True)
+
+    free = np.empty((0, 3))
+    columns = []
+    unplaced = {}
+    for kind, remaining, size in kinds:
+        per_fresh_node = int(_fits(capacity, size, remaining))
+        if per_fresh_node < 1:
+            unplaced[kind] = remaining
+            columns.append(np.zeros(len(free), dtype=np.int64))
+            continue
+        placed = np.zeros(len(free), dtype=np.int64)
+        if len(free):
+            # How many of this pod each open node can still take, then fill in node order
+            fits = _fits(free, size, remaining)
+            before = np.cumsum(fits) - fits
+            placed = np.clip(remaining - before, 0, fits)
+            free -= placed[:, np.newaxis] * size
+            remaining -= int(placed.sum())
+        if remaining:
+            # Open new nodes, all full except possibly the last
+            new = -(-remaining // per_fresh_node)
+            fill = np.full(new, per_fresh_node, dtype=np.int64)
+            fill[-1] = remaining - per_fresh_node * (new - 1)
+            free = np.vstack([free, capacity - fill[:, np.newaxis] * size])
+            placed = np.concatenate([placed, fill])
+            for i, column in enumerate(columns):
+                columns[i] = np.concatenate([column, np.zeros(new, dtype=np.int64)])
+        columns.append(placed)
+
+    counts = np.column_stack(columns) if columns else np.zeros((len(free), 0), dtype=np.int64)
+    return Packing(capacity, capacity - free, counts, [k[0] for k in kinds], unplaced)
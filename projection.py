@@ -0,0 +1,288 @@
+"""Capacity projection: sizing month by month under workload growth.
+
+Growth is given per input (``impala_prod_exec``) or per breakdown row of
+catalog.GROUPS (``CML`` grows every CML count) as
+
+    compound(30%)      30% a year, compounded monthly
+    step(2, 6)         2 more every 6 months
+    step(50%, 12)      50% more every 12 months
+
+For each scenario the inputs of months 0..horizon are generated at once,
+rounded to whole counts, and all months of a chunk of scenarios are sized
+in one engine.calculate_batch() pass.  Each month is checked against the
+hardware budget (nodes, CPU cores, RAM, storage, NFS); the time series
+streams out chunk by chunk as an export.Table, and a second table gives
+the first month each resource goes over budget.
+
+    python projection.py scenarios.ndjson --growth CML=compound(40%) --months 36 --nodes 80 --out projection.csv
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+import batch
+import engine
+import export
+import packing
+import schema
+import workbook
+
+DEFAULT_MONTHS = 36
+MAX_MONTHS = 240
+DEFAULT_CHUNK_SIZE = 500  # scenarios sized per pass
+
+# Budgeted resource, the model outputs that use it and the node field giving its per-node size
+RESOURCES = (
+    ('nodes', ('nodes',), None),
+    ('cpu_cores', ('cpu_cores',), 'max_cpu_per_node'),
+    ('ram_gb', ('ram_gb',), 'max_ram_per_node'),
+    ('storage_gb', ('storage_gb', 'cdw_local_disk_gb'), 'max_storage_per_node'),
+    ('nfs_gb', ('nfs_gb',), None),
+)
+RESOURCE_NAMES = tuple(name for name, _, _ in RESOURCES)
+
+_SPEC = re.compile(r'^\s*(compound|step)\s*\((.*)\)\s*$')
+
+
+class Growth(NamedTuple):
+    rate: float = 0.0  # compound growth per year (0.3 = 30%)
+    step: float = 0.0  # added every `every` months
+    step_rate: float = 0.0  # relative growth every `every` months
+    every: int = 1
+    spec: str = ''
+
+
+def parse_growth(expr):
+    # 'compound(30%)', 'step(2, 6)' or 'step(50%, 12)' -> Growth
+    match = _SPEC.match(expr)
+    if not match:
+        raise ValueError('expected compound(R%%), step(N, months) or step(R%%, months), got %r' % expr)
+    kind, args = match.group(1), [arg.strip() for arg in match.group(2).split(',')]
+    try:
+        amount = float(args[0].rstrip('%')) / (100 if args[0].endswith('%') else 1)
+        if kind == 'compound':
+            if len(args) != 1 or not args[0].endswith('%') or amount <= -1:
+                raise ValueError()
+            return Growth(rate=amount, spec=expr.strip())
+        every = int(args[1])
+        if len(args) != 2 or every < 1:
+            raise ValueError()
+    except (ValueError, IndexError):
+        raise ValueError('expected compound(R%%), step(N, months) or step(R%%, months), got %r' % expr)
+    if args[0].endswith('%'):
+        return Growth(step_rate=amount, every=every, spec=expr.strip())
+    return Growth(step=amount, every=every, spec=expr.strip())
+
+
+def growth_targets(name, cat=None):
+    # Count inputs a growth applies to: the input itself or every count of a breakdown row
+    import catalog
+
+    if name in engine.INPUT_INDEX:
+        if isinstance(engine.INPUT_DEFAULTS[name], bool):
+            raise ValueError('%s is on/off and cannot grow' % name)
+        return (name,)
+    if name in catalog.GROUPS:
+        cat = cat or catalog.current()
+        names = set(catalog.GROUPS[name])
+        return tuple(dict.fromkeys(c.count for c in cat.components
+                                   if c.name in names and not isinstance(engine.INPUT_DEFAULTS[c.count], bool)))
+    raise ValueError('Unknown input or component: %r' % name)
+
+
+def growth_matrix(growth, cat=None):
+    # {input or component: spec or Growth} -> 4 x len(INPUTS) array of
+    # (rate, step, step_rate, every); a later entry overrides an earlier one
+    G = np.zeros((4, len(engine.INPUTS)))
+    G[3] = 1
+    for name, spec in growth.items():
+        g = spec if isinstance(spec, Growth) else parse_growth(spec)
+        for target in growth_targets(name, cat):
+            G[:, engine.INPUT_INDEX[target]] = g[:4]
+    return G
+
+
+def grow(X, G, months):
+    # X: S x len(INPUTS) month-0 inputs, G: S x 4 x len(INPUTS) growth
+    # -> S x (months + 1) x len(INPUTS) whole-number inputs per month
+    m = np.arange(months + 1, dtype=np.float64)[np.newaxis, :, np.newaxis]
+    rate, step, step_rate, every = (G[:, i, np.newaxis, :] for i in range(4))
+    steps = np.floor(m / every)
+    grown = X[:, np.newaxis, :] * (1 + rate) ** (m / 12) * (1 + step_rate) ** steps + step * steps
+    # Half-up rounding; an input without growth keeps its value exactly
+    grown = np.clip(np.floor(grown + 0.5), 0, schema.MAX_VALUE)
+    return grown.astype(np.int64)
+
+
+def budget_vector(budget=None, nodes=None, node_shape=None):
+    # Budget per resource: explicit values, or N nodes of the node shape; None = unlimited
+    shape = dict(packing.NODE_DEFAULTS, **(node_shape or {}))
+    limits = []
+    for name, _, field in RESOURCES:
+        value = (budget or {}).get(name)
+        if value is None and nodes is not None and (field or name == 'nodes'):
+            value = nodes * (shape[field] if field else 1)
+        limits.append(np.inf if value is None else float(value))
+    return np.array(limits)
+
+
+def _usage(out):
+    # ... x len(OUTPUTS) -> ... x len(RESOURCES)
+    select = np.zeros((len(engine.OUTPUTS), len(RESOURCES)), dtype=np.int64)
+    for j, (_, outputs, _) in enumerate(RESOURCES):
+        for name in outputs:
+            select[engine.OUTPUT_INDEX[name], j] = 1
+    return out @ select
+
+
+def project(X, G, months, limits, model=None):
+    # -> (S x (months + 1) x len(OUTPUTS) outputs, S x len(RESOURCES) first month
+    # over budget, -1 where the budget holds for the whole horizon)
+    S = len(X)
+    out = engine.calculate_batch(grow(X, G, months).reshape(-1, len(engine.INPUTS)), model)
+    out = out.reshape(S, months + 1, len(engine.OUTPUTS))
+    over = _usage(out) > limits
+    first = np.where(over.any(axis=1), over.argmax(axis=1), -1)
+    return out, first
+
+
+SERIES_COLUMNS = ('scenario', 'month') + engine.OUTPUTS + tuple('over_' + name for name in RESOURCE_NAMES)
+CROSSING_COLUMNS = ('scenario', 'id') + tuple(name + '_month' for name in RESOURCE_NAMES) + ('error',)
+
+
+def _scenario(line, growth):
+    # One NDJSON line or dict -> (id, inputs, its own growth, or None to use the shared one)
+    values = json.loads(line) if isinstance(line, (str, bytes)) else line
+    if not isinstance(values, dict):
+        raise ValueError('expected a JSON object')
+    own = values.get('growth') or {}
+    if not isinstance(own, dict):
+        raise ValueError('growth must be an object such as {"CML": "compound(30%)"}')
+    scenario_id = values.get('id')
+    return (None if scenario_id is None else str(scenario_id), schema.parse_inputs(values),
+            dict(growth, **own) if own else None)
+
+
+class _Crossings:
+    # Chunks of the crossings table: the rows collected so far, in line order.
+    # Read afresh on every pass, so the table can be written more than once
+    # (into the XLSX with the series and to --crossings).
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter([sorted(self.rows, key=lambda row: row[0])])
+
+
+def tables(lines, growth=None, months=DEFAULT_MONTHS, limits=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # NDJSON lines or dicts -> [time series Table, crossings Table]; the crossings
+    # table is filled as the series is consumed, so it must be written second
+    import catalog
+
+    if not 1 <= months <= MAX_MONTHS:
+        raise ValueError('months must be between 1 and %d, got %d' % (MAX_MONTHS, months))
+    growth = dict(growth or {})
+    cat = catalog.current()
+    shared = growth_matrix(growth, cat)
+    limits = budget_vector() if limits is None else limits
+    crossings = []
+
+    def series():
+        for numbered in batch.numbered_chunks(lines, chunk_size):
+            rows, G, keys = [], [], []
+            for line_no, line in numbered:
+                scenario_id = None
+                try:
+                    scenario_id, inputs, own = _scenario(line, growth)
+                    G.append(shared if own is None else growth_matrix(own, cat))
+                except ValueError as exc:
+                    crossings.append([line_no, scenario_id] + [None] * len(RESOURCES) + [str(exc)])
+                    continue
+                rows.append(inputs)
+                keys.append((line_no, scenario_id))
+            if not rows:
+                continue
+            out, first = project(np.array(rows, dtype=np.int64), np.array(G), months, limits, cat.model)
+            for (line_no, scenario_id), months_over in zip(keys, first.tolist()):
+                crossings.append([line_no, scenario_id] + [m if m >= 0 else None for m in months_over] + [None])
+            S = len(rows)
+            month = np.arange(months + 1)
+            over = (_usage(out) > limits).astype(np.int64)
+            yield np.concatenate([
+                np.repeat([[line_no] for line_no, _ in keys], months + 1, axis=0),
+                np.tile(month, S)[:, np.newaxis],
+                out.reshape(-1, len(engine.OUTPUTS)),
+                over.reshape(-1, len(RESOURCES)),
+            ], axis=1)
+
+    return [export.Table('projection', SERIES_COLUMNS, series()),
+            export.Table('crossings', CROSSING_COLUMNS, _Crossings(crossings),
+                         ('int', 'str') + ('int',) * len(RESOURCES) + ('str',))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Project sizing month by month under workload growth.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='NDJSON scenarios (form fields, optional "id" and "growth"); default: stdin')
+    parser.add_argument('--growth', action='append', default=[], metavar='NAME=SPEC',
+                        help='growth of an input or component for every scenario, e.g. CML=compound(40%%) '
+                             'impala_prod_exec=step(2,6)')
+    parser.add_argument('--months', type=int, default=DEFAULT_MONTHS)
+    parser.add_argument('--nodes', type=int, help='budget of N nodes of the node shape below')
+    parser.add_argument('--cpu', type=int, default=packing.NODE_DEFAULTS['max_cpu_per_node'])
+    parser.add_argument('--ram', type=int, default=packing.NODE_DEFAULTS['max_ram_per_node'])
+    parser.add_argument('--storage', type=int, default=packing.NODE_DEFAULTS['max_storage_per_node'])
+    parser.add_argument('--budget', action='append', default=[], metavar='RESOURCE=N',
+                        help='explicit budget of %s' % ', '.join(RESOURCE_NAMES))
+    parser.add_argument('--out', default='-', help='time series output (default: stdout)')
+    parser.add_argument('--format', choices=sorted(export.WRITERS), help='default: from --out extension, else csv')
+    parser.add_argument('--crossings', metavar='FILE', help='also write the first month over budget per scenario '
+                                                           '(XLSX output has it as a second sheet)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    args = parser.parse_args(argv)
+    workbook.configure(args.workbook)
+
+    fmt = args.format or export.format_for(args.out)
+    try:
+        export.require(fmt)
+        if fmt == 'xlsx' and args.out == '-':
+            raise ValueError('XLSX needs --out FILE')
+        growth = {}
+        for item in args.growth:
+            name, _, spec = item.partition('=')
+            growth_targets(name)
+            growth[name] = parse_growth(spec)
+        budget = {}
+        for item in args.budget:
+            name, _, value = item.partition('=')
+            if name not in RESOURCE_NAMES:
+                raise ValueError('Unknown budget resource: %r' % name)
+            budget[name] = float(value)
+        shape = {'max_cpu_per_node': args.cpu, 'max_ram_per_node': args.ram, 'max_storage_per_node': args.storage}
+        lines = sys.stdin if args.input == '-' else open(args.input)
+        series, crossings = tables(lines, growth, args.months, budget_vector(budget, args.nodes, shape),
+                                   max(args.chunk, 1))
+    except (ValueError, RuntimeError) as exc:
+        parser.error(str(exc))
+
+    start = time.perf_counter()
+    try:
+        count = export.write(args.out, fmt, [series, crossings] if fmt == 'xlsx' else [series])
+        if args.crossings:
+            export.write(args.crossings, export.format_for(args.crossings), [crossings])
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    seconds = time.perf_counter() - start
+    print('%d rows in %.2fs (%.0f rows/s)' % (count, seconds, count / seconds if seconds else 0), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Declarative schema of the calculator inputs.
+
+Every input is declared once here with its type, default, bounds, unit and
+form label.  The schema renders the input form (templates/index.html),
+fixes the column order of the engine (engine.INPUTS) and is compiled into
+straight-line parser functions that turn a form, JSON object or batch line
+into a typed, slotted record, collecting an error per invalid field.
+
+    schema.parse_inputs({'hive_vw': '2'}).hive_vw  -> 2
+    schema.parse_inputs({'cml_nfs': 10})           -> ValidationError({'cml_nfs': 'must be at least 100'})
+"""
+from typing import NamedTuple, Optional
+
+# Upper bound for every number unless a field sets its own; keeps count x size
+# products far inside the range float64 and int64 hold exactly
+MAX_VALUE = 1000000
+
+
+class Field(NamedTuple):
+    name: str
+    type: type  # int or bool (checkbox)
+    default: object  # value used when the input is absent or blank
+    min: Optional[int] = None
+    max: Optional[int] = MAX_VALUE
+    unit: str = ''
+    label: str = ''
+    style: str = ''  # form CSS class: 'green' (fixed by the platform) or 'yellow' (workload)
+    value: object = None  # initial form value when it differs from the default
+
+    @property
+    def checkbox(self):
+        return self.type is bool
+
+    @property
+    def form_value(self):
+        return self.default if self.value is None else self.value
+
+
+class Section(NamedTuple):
+    title: str
+    fields: tuple
+    heading: str = 'h2'
+
+
+class ValidationError(ValueError):
+    # errors: {field name: message}
+
+    def __init__(self, errors):
+        super().__init__('; '.join('%s: %s' % item for item in errors.items()))
+        self.errors = errors
+
+    def __reduce__(self):
+        return ValidationError, (self.errors,)
+
+
+def _count(name, default, label, style='yellow', min=1, value=None):
+    return Field(name, int, default, min=min, unit='count', label=label, style=style, value=value)
+
+
+def _cores(name, default, label, style='yellow', min=1):
+    return Field(name, int, default, min=min, unit='cores', label=label, style=style)
+
+
+def _gb(name, default, label, style='yellow', min=1):
+    return Field(name, int, default, min=min, unit='GB', label=label, style=style)
+
+
+SECTIONS = (
+    Section('Environment Inputs', (
+        _count('environment', 1, 'Environment (Min: 1)', style='green'),
+        _gb('embedded_db', 200, 'Embedded Database (GB, Recommend: 200)', min=0),
+    )),
+    Section('CDW Inputs', (
+        _count('data_catalog', 1, 'Data Catalog (Min: 1)', style='green'),
+        _count('hive_vw', 1, 'Hive Virtual Warehouse (Min: 1)'),
+        _count('hive_lite_exec', 1, 'Hive LITE Executor (Min: 1)'),
+        _count('hive_prod_exec', 1, 'Hive PROD Executor (Min: 1)'),
+        _count('impala_vw', 1, 'Impala Virtual Warehouse (Min: 1)', style='green'),
+        _count('impala_lite_exec', 1, 'Impala LITE Executor (Min: 1)'),
+        _cores('impala_lite_exec_cpu', 3, 'Impala LITE Executor CPU cores (Default: 3)'),
+        _gb('impala_lite_exec_mem', 25, 'Impala LITE Executor Mem (GB, Default: 25)', min=25),
+        _count('impala_lite_coord_qty', 2, 'Impala LITE Coordinator Quantity (Default: 2)'),
+        _cores('impala_lite_coord_cpu', 1, 'Impala LITE Coordinator CPU cores (Default: 1)'),
+        _gb('impala_lite_coord_mem', 25, 'Impala LITE Coordinator Mem (GB, Default: 25)', min=25),
+    )),
+    Section('Impala PROD Executor Inputs', (
+        _count('impala_prod_exec', 1, 'Impala PROD Executor (Min: 1)'),
+        _cores('impala_prod_exec_cpu', 14, 'Impala PROD Executor CPU cores (Default: 14)'),
+        _gb('impala_prod_exec_mem', 128, 'Impala PROD Executor Mem (GB, Default: 128)', min=128),
+    )),
+    Section('Impala PROD Coordinator Inputs', (
+        _count('impala_prod_coord_qty', 2, 'Impala PROD Coordinator (Quantity, Default: 2)'),
+        _cores('impala_prod_coord_cpu', 14, 'Impala PROD Coordinator CPU cores (Default: 14)'),
+        _gb('impala_prod_coord_mem', 128, 'Impala PROD Coordinator Mem (GB, Default: 128)', min=128),
+    )),
+    Section('Data Viz Inputs', (
+        _count('data_viz_small', 1, 'Data Viz (small) 2 CPU, 8GB (Min: 1)', style='green'),
+        _count('data_viz_medium', 1, 'Data Viz (medium) 4 CPU, 16GB (Min: 1)', style='green'),
+        _count('data_viz_large', 1, 'Data Viz (large) 6 CPU, 24GB (Min: 1)', style='green'),
+    )),
+    Section('CDE Inputs', (
+        _count('cde_service', 1, 'CDE Service (Min: 1)', style='green'),
+        _count('cde_vc', 1, 'Virtual Cluster (Min: 1)', style='green'),
+        _count('job_quantity', 1, 'Quantity of Job(s) (Min: 1)', style='green', value=7),
+        _count('job_exec', 1, 'Quantity of Executor(s) (Min: 1)', style='green', value=2),
+        _cores('job_driver_cpu', 2, 'Job Driver CPU (Min: 1)', style='green'),
+        _gb('job_driver_mem', 4, 'Job Driver Mem (GB, Min: 1)', style='green'),
+        _cores('job_exec_cpu', 2, 'Job Executor CPU (Min: 1)', style='green'),
+        _gb('job_exec_mem', 20, 'Job Executor Mem (GB, Min: 1)', style='green'),
+    )),
+    Section('CML Inputs', (
+        _count('cml_workspace', 1, 'Workspace (Min: 1)', style='green'),
+        _count('cml_xsmall_session', 2, 'XSmall Session (2 CPU, 4 GB, Min: 1)'),
+        _count('cml_small_session', 2, 'Small Session (4 CPU, 8 GB, Min: 1)'),
+        _count('cml_medium_session', 3, 'Medium Session (6 CPU, 16 GB, Min: 1)'),
+        _gb('cml_nfs', 100, 'NFS (GB, Min: 100)', min=100),
+        Field('internal_nfs', bool, False, label='Use Internal NFS'),
+        _count('backup_workspace', 0, 'Backup Workspace (Quantity, Min: 0)', min=0),
+        Field('model_registry', bool, False, label='Model Registry (Tick to use)'),
+    )),
+    Section('DRS Backup', (
+        _count('drs_backup', 0, 'Number of Control Plane Backup(s) (Min: 0)', min=0),
+    )),
+    Section('Hardware Specifications', (
+        _cores('max_cpu_per_node', 32, 'Max CPU per Node', style=''),
+        _gb('max_ram_per_node', 128, 'Max RAM (GB) per Node', style=''),
+        _gb('max_storage_per_node', 2000, 'Max Storage (GB) per Node', style=''),
+    ), heading='h3'),
+)
+
+FIELDS = {field.name: field for section in SECTIONS for field in section.fields}
+
+# Hardware Specifications describe the node shape; everything else is an engine input
+NODE_FIELDS = SECTIONS[-1].fields
+INPUT_FIELDS = tuple(field for section in SECTIONS[:-1] for field in section.fields)
+
+# Slotted, typed records produced by the parsers (tuples, so a record is also an engine input row)
+Inputs = NamedTuple('Inputs', [(field.name, field.type) for field in INPUT_FIELDS])
+NodeShape = NamedTuple('NodeShape', [(field.name, field.type) for field in NODE_FIELDS])
+
+_MISSING = object()
+
+# Accepted checkbox / JSON spellings of a boolean
+_BOOLS = {True: True, False: False, 'on': True, 'off': False, 'true': True, 'false': False,
+          'True': True, 'False': False, 'yes': True, 'no': False, '1': True, '0': False, '': False}
+
+
+def _to_int(value):
+    # Slow path for anything that is neither an int nor a string: whole floats, numpy integers
+    if isinstance(value, bool):
+        raise TypeError('boolean')
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError('fraction')
+        return int(value)
+    return int(value.__index__())
+
+
+def _compile(name, fields, record):
+    # Generates one straight-line function: a get, a type check and the bound
+    # checks per field, with no loop or per-field dispatch at run time
+    lines = ['def %s(values):' % name, '    errors = None', '    get = values.get']
+    for i, field in enumerate(fields):
+        v, x = 'v%d' % i, 'x%d' % i
+        lines.append('    %s = get(%r, _MISSING)' % (v, field.name))
+        fail = "        errors = errors or {}; errors[%r] = '%%s'; %s = %r" % (field.name, x, field.default)
+        if field.type is bool:
+            lines += [
+                '    if %s is _MISSING:' % v,
+                '        %s = %r' % (x, field.default),
+                '    else:',
+                '        try:',
+                '            %s = _BOOLS[%s]' % (x, v),
+                '        except (KeyError, TypeError):',
+                '    ' + fail % 'must be on or off',
+            ]
+            continue
+        lines += [
+            '    if type(%s) is int:' % v,
+            '        %s = %s' % (x, v),
+            '    elif type(%s) is str:' % v,
+            '        try:',
+            '            %s = int(%s)' % (x, v),
+            '        except ValueError:',
+            '            if %s.strip():' % v,
+            '        ' + fail % 'must be a whole number',
+            '            else:',
+            '                %s = %r' % (x, field.default),
+            '    elif %s is _MISSING:' % v,
+            '        %s = %r' % (x, field.default),
+            '    else:',
+            '        try:',
+            '            %s = _to_int(%s)' % (x, v),
+            '        except (TypeError, ValueError, AttributeError):',
+            '    ' + fail % 'must be a whole number',
+        ]
+        if field.min is not None:
+            lines += ['    if %s < %d:' % (x, field.min), fail % ('must be at least %d' % field.min)]
+        if field.max is not None:
+            lines += ['    if %s > %d:' % (x, field.max), fail % ('must be at most %d' % field.max)]
+    lines += [
+        '    if errors:',
+        '        raise ValidationError(errors)',
+        '    return _new(_record, (%s,))' % ', '.join('x%d' % i for i in range(len(fields))),
+    ]
+    source = '\n'.join(lines) + '\n'
+    namespace = {'_MISSING': _MISSING, '_BOOLS': _BOOLS, '_to_int': _to_int, 'ValidationError': ValidationError,
+                 '_new': tuple.__new__, '_record': record}
+    exec(compile(source, '<schema %s>' % name, 'exec'), namespace)
+    parser = namespace[name]
+    parser.source = source
+    return parser
+
+
+# parse_inputs(values) -> Inputs and parse_node_shape(values) -> NodeShape, where
+# values is any mapping (form, JSON object); unknown keys are ignored
+parse_inputs = _compile('parse_inputs', INPUT_FIELDS, Inputs)
+parse_node_shape = _compile('parse_node_shape', NODE_FIELDS, NodeShape)
+
+
+def parse_form(values):
+    # -> (Inputs, NodeShape), with the errors of both reported together
+    errors = {}
+    inputs = shape = None
+    try:
+        inputs = parse_inputs(values)
+    except ValidationError as exc:
+        errors.update(exc.errors)
+    try:
+        shape = parse_node_shape(values)
+    except ValidationError as exc:
+        errors.update(exc.errors)
+    if errors:
+        raise ValidationError(errors)
+    return inputs, shape
@@ -0,0 +1,156 @@
+"""Inverse sizing: the largest workload that fits a fixed hardware budget.
+
+The budget is N nodes of the max_*_per_node shape.  With every other input
+fixed, the engine model is affine in each component count, so resource use
+is ``usage(k) = base + A @ k`` and the largest feasible count of a single
+component is an exact floor division per constraint.  For several
+components the Pareto set is enumerated over all but the last component,
+whose maximum again has a closed form.
+
+    python solver.py --nodes 80 impala_prod_exec job_exec
+"""
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+import engine
+import packing
+import workbook
+
+# Budgeted quantity, the model outputs that consume it and the node field giving its per-node size
+CONSTRAINTS = (
+    ('nodes', ('nodes',), None),
+    ('cpu_cores', ('cpu_cores',), 'max_cpu_per_node'),
+    ('ram_gb', ('ram_gb',), 'max_ram_per_node'),
+    ('storage_gb', ('storage_gb', 'cdw_local_disk_gb'), 'max_storage_per_node'),
+)
+
+MAX_GRID = 5000000
+
+
+class Infeasible(ValueError):
+    pass
+
+
+def _system(inputs, components, nodes, node_shape):
+    # -> (A, b): component j adds A[j] of each constraint, b is what the budget leaves after the rest
+    for name in components:
+        if name not in engine.INPUT_INDEX or isinstance(engine.INPUT_DEFAULTS[name], bool):
+            raise ValueError('Not a countable input: %r' % name)
+    shape = dict(packing.NODE_DEFAULTS, **(node_shape or {}))
+    base = dict(engine.INPUT_DEFAULTS, **inputs)
+    base.update(dict.fromkeys(components, 0))
+    rows = [base] + [dict(base, **{name: 1}) for name in components]
+    out = engine.calculate_batch(rows)
+    select = np.zeros((len(engine.OUTPUTS), len(CONSTRAINTS)), dtype=np.int64)
+    for j, (_, outputs, _) in enumerate(CONSTRAINTS):
+        for name in outputs:
+            select[engine.OUTPUT_INDEX[name], j] = 1
+    usage = out @ select
+    budget = np.array([nodes * (shape[field] if field else 1) for _, _, field in CONSTRAINTS], dtype=np.int64)
+    b = budget - usage[0]
+    if (b < 0).any():
+        over = [CONSTRAINTS[j][0] for j in np.flatnonzero(b < 0)]
+        raise Infeasible('The rest of the workload already exceeds the budget on %s' % ', '.join(over))
+    return usage[1:] - usage[0], b
+
+
+def _max_last(A_last, remaining):
+    # Largest k with k * A_last <= remaining, per row of remaining; -1 where infeasible, inf if unbounded
+    positive = A_last > 0
+    with np.errstate(divide='ignore'):
+        bound = np.where(positive, remaining // np.where(positive, A_last, 1), np.iinfo(np.int64).max)
+    k = bound.min(axis=-1)
+    return np.where((remaining < 0).any(axis=-1), -1, k)
+
+
+def max_count(inputs, component, nodes, node_shape=None):
+    # Largest count of one component that fits, and the constraint that binds it
+    A, b = _system(inputs, [component], nodes, node_shape)
+    slope = A[0]
+    if not (slope > 0).any():
+        return None, None
+    bounds = np.where(slope > 0, b // np.where(slope > 0, slope, 1), np.iinfo(np.int64).max)
+    j = int(bounds.argmin())
+    return int(bounds[j]), CONSTRAINTS[j][0]
+
+
+def pareto(inputs, components, nodes, node_shape=None):
+    # All Pareto-maximal count vectors for the given components
+    A, b = _system(inputs, components, nodes, node_shape)
+    if len(components) == 1:
+        k, _ = max_count(inputs, components[0], nodes, node_shape)
+        return [{components[0]: k}]
+    maxima = []
+    for j, name in enumerate(components[:-1]):
+        slope = A[j]
+        if not (slope > 0).any():
+            raise ValueError('%s is unbounded by this budget' % name)
+        maxima.append(int(np.where(slope > 0, b // np.where(slope > 0, slope, 1), np.iinfo(np.int64).max).min()))
+    if not (A[-1] > 0).any():
+        raise ValueError('%s is unbounded by this budget' % components[-1])
+    if math.prod(m + 1 for m in maxima) > MAX_GRID:
+        raise ValueError('Pareto grid too large (%s); solve fewer components at once'
+                         % ' x '.join(str(m + 1) for m in maxima))
+
+    # Best count of the last component for every combination of the others
+    grid = np.meshgrid(*[np.arange(m + 1, dtype=np.int64) for m in maxima], indexing='ij')
+    K = np.stack([g.ravel() for g in grid], axis=1)
+    best = _max_last(A[-1], b - K @ A[:-1]).reshape(grid[0].shape)
+
+    # A point is Pareto-optimal iff raising any other component by one lowers the best last count
+    optimal = best >= 0
+    for axis in range(best.ndim):
+        nxt = np.full(best.shape, -1, dtype=np.int64)
+        src = [slice(None)] * best.ndim
+        dst = [slice(None)] * best.ndim
+        src[axis], dst[axis] = slice(1, None), slice(None, -1)
+        nxt[tuple(dst)] = best[tuple(src)]
+        optimal &= nxt < best
+    points = np.argwhere(optimal)
+    return [dict(zip(components, [int(v) for v in point] + [int(best[tuple(point)])])) for point in points]
+
+
+def solve(inputs, components, nodes, node_shape=None):
+    # Per-component maxima (each alone, the others at zero) plus the joint Pareto set
+    result = {'nodes': nodes, 'maxima': {}}
+    alone = dict(inputs, **dict.fromkeys(components, 0))
+    for name in components:
+        k, binding = max_count(alone, name, nodes, node_shape)
+        result['maxima'][name] = {'max': k, 'binding': binding}
+    if len(components) > 1:
+        result['pareto'] = pareto(inputs, components, nodes, node_shape)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Largest workload that fits N nodes of a fixed shape.')
+    parser.add_argument('components', nargs='+', help='count inputs to maximise, e.g. impala_prod_exec job_exec')
+    parser.add_argument('--nodes', type=int, required=True)
+    parser.add_argument('--cpu', type=int, default=packing.NODE_DEFAULTS['max_cpu_per_node'])
+    parser.add_argument('--ram', type=int, default=packing.NODE_DEFAULTS['max_ram_per_node'])
+    parser.add_argument('--storage', type=int, default=packing.NODE_DEFAULTS['max_storage_per_node'])
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='override another input (default: form defaults)')
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    args = parser.parse_args(argv)
+    workbook.configure(args.workbook)
+
+    inputs = {}
+    for item in args.set:
+        name, _, value = item.partition('=')
+        if name not in engine.INPUT_INDEX:
+            parser.error('Unknown input: %r' % name)
+        inputs[name] = int(value)
+    shape = {'max_cpu_per_node': args.cpu, 'max_ram_per_node': args.ram, 'max_storage_per_node': args.storage}
+    try:
+        print(json.dumps(solve(inputs, args.components, args.nodes, shape), indent=2))
+    except ValueError as exc:
+        parser.error(str(exc))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""Saved sizing runs in an embedded SQLite database.
+
+A run is the typed inputs, the results, the workbook version they were
+computed with, a timestamp and an optional customer and tag.  Runs are
+keyed on the canonical input hash (memo.input_key), so saving the same
+inputs again for the same workbook, customer and tag returns the existing
+run.  The database is in WAL mode, so readers never wait for a writer, and
+is indexed by customer, tag and date.  Listing pages with a keyset cursor
+rather than OFFSET, and bulk export and import stream NDJSON in batches,
+so all of them stay fast with hundreds of thousands of runs.
+
+    python store.py list --customer acme
+    python store.py export > runs.ndjson
+    python store.py import runs.ndjson
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import schema
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios.sqlite3')
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+IMPORT_CHUNK_SIZE = 10000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    workbook_version TEXT NOT NULL DEFAULT '',
+    customer TEXT NOT NULL DEFAULT '',
+    tag TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    inputs TEXT NOT NULL,
+    results TEXT NOT NULL,
+    UNIQUE (input_hash, workbook_version, customer, tag)
+);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+CREATE INDEX IF NOT EXISTS runs_customer ON runs (customer, created);
+CREATE INDEX IF NOT EXISTS runs_tag ON runs (tag, created);
+'''
+
+_COLUMNS = 'id, input_hash, workbook_version, customer, tag, created, inputs, results'
+
+
+class StoreError(ValueError):
+    pass
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def _iso(created):
+    return datetime.datetime.fromtimestamp(created, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _timestamp(value):
+    # ISO date or datetime (UTC unless it says otherwise), or epoch seconds -> epoch seconds
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        raise StoreError('expected an ISO date or time, got %r' % (value,))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def _record(row):
+    run_id, input_hash, version, customer, tag, created, inputs, results = row
+    return {'id': run_id, 'input_hash': input_hash, 'workbook_version': version or None, 'customer': customer,
+            'tag': tag, 'created': _iso(created), 'inputs': json.loads(inputs), 'results': json.loads(results)}
+
+
+def _record_line(row):
+    # _record() as an NDJSON line, with the stored JSON spliced in unparsed
+    run_id, input_hash, version, customer, tag, created, inputs, results = row
+    return ('{"id": %d, "input_hash": "%s", "workbook_version": %s, "customer": %s, "tag": %s, "created": "%s", '
+            '"inputs": %s, "results": %s}\n' % (run_id, input_hash, json.dumps(version or None), json.dumps(customer),
+                                                json.dumps(tag), _iso(created), inputs, results))
+
+
+# Canonical inputs JSON, formatted straight from a schema.Inputs record: the
+# same text (and so the same hash) as memo.input_key() gives for its dict
+_INPUT_ORDER = sorted(range(len(schema.INPUT_FIELDS)), key=lambda i: schema.INPUT_FIELDS[i].name)
+_INPUT_JSON = '{' + ','.join('"%s":%%s' % schema.INPUT_FIELDS[i].name for i in _INPUT_ORDER) + '}'
+_JSON_BOOL = {True: 'true', False: 'false'}
+
+
+def canonical(inputs):
+    # Form fields -> (typed schema.Inputs record, its canonical JSON, its input hash)
+    record = schema.parse_inputs(inputs)
+    text = _INPUT_JSON % tuple(_JSON_BOOL[v] if v is True or v is False else v for v in map(record.__getitem__,
+                                                                                           _INPUT_ORDER))
+    return record, text, hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class Store:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @property
+    def db(self):
+        # One connection per thread; the schema is created by the first
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('PRAGMA foreign_keys=ON')
+            with self._lock:
+                if not self._ready:
+                    db.executescript(_SCHEMA)
+                    self._ready = True
+            self._local.db = db
+        return db
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def save(self, inputs, results, customer='', tag='', version=None, created=None):
+        # -> (run id, whether it was new); an identical run is returned, not repeated
+        _, text, input_hash = canonical(inputs)
+        key = (input_hash, version or '', customer or '', tag or '')
+        db = self.db
+        cursor = db.execute('INSERT OR IGNORE INTO runs (input_hash, workbook_version, customer, tag, created, '
+                            'inputs, results) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            key + (time.time() if created is None else created, text, _dumps(results)))
+        if cursor.rowcount:
+            return cursor.lastrowid, True
+        row = db.execute('SELECT id FROM runs WHERE input_hash = ? AND workbook_version = ? AND customer = ? '
+                         'AND tag = ?', key).fetchone()
+        return row[0], False
+
+    def get(self, run_id):
+        row = self.db.execute('SELECT %s FROM runs WHERE id = ?' % _COLUMNS, (run_id,)).fetchone()
+        return _record(row) if row else None
+
+    def _where(self, customer=None, tag=None, since=None, until=None, input_hash=None):
+        clauses, params = [], []
+        for column, value in (('customer', customer), ('tag', tag), ('input_hash', input_hash)):
+            if value is not None:
+                clauses.append('%s = ?' % column)
+                params.append(value)
+        if since is not None:
+            clauses.append('created >= ?')
+            params.append(_timestamp(since))
+        if until is not None:
+            clauses.append('created < ?')
+            params.append(_timestamp(until))
+        return clauses, params
+
+    def page(self, limit=PAGE_SIZE, cursor=None, **filters):
+        # Newest first. -> {'runs': [...], 'next': cursor of the following page or None}
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise StoreError('limit must be between 1 and %d' % MAX_PAGE_SIZE)
+        clauses, params = self._where(**filters)
+        if cursor:
+            try:
+                created, _, run_id = cursor.partition(':')
+                position = (float(created), int(run_id))
+            except ValueError:
+                raise StoreError('invalid cursor %r' % cursor)
+            clauses.append('(created, id) < (?, ?)')
+            params.extend(position)
+        sql = 'SELECT %s FROM runs%s ORDER BY created DESC, id DESC LIMIT ?' % (
+            _COLUMNS, ' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        rows = self.db.execute(sql, params + [limit + 1]).fetchall()
+        following = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            following = '%r:%d' % (rows[-1][5], rows[-1][0])
+        return {'runs': [_record(row) for row in rows], 'next': following}
+
+    def count(self, **filters):
+        clauses, params = self._where(**filters)
+        sql = 'SELECT COUNT(*) FROM runs' + (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        return self.db.execute(sql, params).fetchone()[0]
+
+    def export_ndjson(self, batch_size=IMPORT_CHUNK_SIZE, **filters):
+        # Every matching run as NDJSON blocks, oldest first, fetched in batches.
+        # The filters are checked here; the rows are read on a connection of
+        # the generator's own, so a long export does not hold the thread's one.
+        clauses, params = self._where(**filters)
+        sql = 'SELECT %s FROM runs%s ORDER BY created, id' % (_COLUMNS, ' WHERE ' + ' AND '.join(clauses)
+                                                                if clauses else '')
+        self.db  # make sure the schema exists
+        return self._export(sql, params, batch_size)
+
+    def _export(self, sql, params, batch_size):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            cursor = db.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield ''.join(map(_record_line, rows))
+        finally:
+            db.close()
+
+    def import_ndjson(self, lines, size=None, chunk_size=IMPORT_CHUNK_SIZE):
+        # Exported lines back in, one transaction per chunk. A line needs
+        # "inputs" (or form fields at the top level) and may carry "results",
+        # "customer", "tag", "workbook_version" and "created"; lines without
+        # results are sized with size(list of schema.Inputs) -> list of results.
+        imported = duplicates = 0
+        errors = []
+        db = self.db
+        numbered = []
+
+        def flush():
+            nonlocal imported, duplicates
+            records = []
+            for line_no, line in numbered:
+                try:
+                    records.append((line_no,) + self._parse(line))
+                except (ValueError, TypeError) as exc:
+                    errors.append({'line': line_no, 'error': str(exc)})
+            missing = [i for i, record in enumerate(records) if record[2] is None]
+            if missing:
+                if size is None:
+                    for i in missing:
+                        errors.append({'line': records[i][0], 'error': 'no results'})
+                    records = [record for record in records if record[2] is not None]
+                else:
+                    for i, results in zip(missing, size([records[i][1][0] for i in missing])):
+                        records[i] = records[i][:2] + (results,) + records[i][3:]
+            now = time.time()
+            rows = [(input_hash, version or '', customer, tag, now if created is None else created, text,
+                     _dumps(results))
+                    for _, (_, text, input_hash), results, customer, tag, version, created in records]
+            db.execute('BEGIN')
+            try:
+                before = db.total_changes
+                db.executemany('INSERT OR IGNORE INTO runs (input_hash, workbook_version, customer, tag, created, '
+                               'inputs, results) VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                added = db.total_changes - before
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            imported += added
+            duplicates += len(rows) - added
+
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            numbered.append((line_no, line))
+            if len(numbered) >= chunk_size:
+                flush()
+                numbered = []
+        if numbered:
+            flush()
+        return {'imported': imported, 'duplicates': duplicates, 'errors': errors}
+
+    @staticmethod
+    def _parse(line):
+        # -> (canonical() of the inputs, results or None, customer, tag, workbook version, created)
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError('expected a JSON object')
+        inputs = record.get('inputs', record)
+        if not isinstance(inputs, dict):
+            raise ValueError('inputs must be an object')
+        results = record.get('results')
+        if results is not None and not isinstance(results, dict):
+            raise ValueError('results must be an object')
+        customer, tag = record.get('customer') or '', record.get('tag') or ''
+        if not isinstance(customer, str) or not isinstance(tag, str):
+            raise ValueError('customer and tag must be strings')
+        return (canonical(inputs), results, customer, tag, record.get('workbook_version'),
+                _timestamp(record.get('created')))
+
+
+def size_totals(inputs_list):
+    # Totals for a batch of inputs, as stored for imported lines without
+    # results: engine.calculate_batch(), as app.calculate_requirements sizes one
+    import numpy as np
+
+    import engine
+
+    out = engine.calculate_batch(np.array(inputs_list, dtype=np.int64))
+    return [dict(zip(engine.OUTPUTS, row)) for row in out.tolist()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Saved sizing runs.')
+    parser.add_argument('--db', default=os.environ.get('SIZING_STORE', DEFAULT_PATH))
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('list', 'export'):
+        command = commands.add_parser(name)
+        command.add_argument('--customer')
+        command.add_argument('--tag')
+        command.add_argument('--since', help='ISO date or time')
+        command.add_argument('--until', help='ISO date or time')
+    commands.choices['list'].add_argument('--limit', type=int, default=PAGE_SIZE)
+    commands.choices['list'].add_argument('--cursor')
+    importer = commands.add_parser('import')
+    importer.add_argument('input', nargs='?', default='-', help='NDJSON (default: stdin)')
+    importer.add_argument('--workbook', help='workbook to size lines without results against')
+    args = parser.parse_args(argv)
+
+    store = Store(args.db)
+    try:
+        if args.command == 'import':
+            import workbook
+
+            workbook.configure(args.workbook or os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+            lines = sys.stdin if args.input == '-' else open(args.input)
+            start = time.perf_counter()
+            try:
+                summary = store.import_ndjson(lines, size=size_totals)
+            finally:
+                if lines is not sys.stdin:
+                    lines.close()
+            seconds = time.perf_counter() - start
+            print(json.dumps(dict(summary, errors=summary['errors'][:20], error_count=len(summary['errors']),
+                                  seconds=round(seconds, 3))))
+            return
+        filters = {'customer': args.customer, 'tag': args.tag, 'since': args.since, 'until': args.until}
+        if args.command == 'export':
+            for block in store.export_ndjson(**filters):
+                sys.stdout.write(block)
+            return
+        page = store.page(args.limit, args.cursor, **filters)
+        for run in page['runs']:
+            print('%6d  %s  %-16s %-16s nodes=%s cpu=%s ram=%s' % (
+                run['id'], run['created'][:19], run['customer'], run['tag'], run['results'].get('nodes'),
+                run['results'].get('cpu_cores'), run['results'].get('ram_gb')))
+        if page['next']:
+            print('next: --cursor %s' % page['next'])
+    except StoreError as exc:
+        parser.error(str(exc))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Parameter sweeps over the calculate() inputs.
+
+A sweep is a set of axes such as ``impala_prod_exec=1..64``,
+``cml_medium_session=10..500:10`` or ``internal_nfs=[on,off]``; every other
+input keeps its form default.  Grid points are generated by index in
+chunks (full Cartesian product or a Latin-hypercube sample of it), sized
+with engine.calculate_batch() and written out chunk by chunk, so memory
+stays bounded by the chunk size however large the sweep is.
+
+    python sweep.py impala_prod_exec=1..64 internal_nfs=[on,off] --out sweep.csv
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+import engine
+import export
+import schema
+import workbook
+
+DEFAULT_CHUNK_SIZE = 100000
+
+_TRUE = ('on', 'true', '1', 'yes')
+_FALSE = ('off', 'false', '0', 'no')
+
+
+def parse_value(name, text):
+    text = text.strip()
+    if isinstance(engine.INPUT_DEFAULTS[name], bool):
+        if text.lower() in _TRUE:
+            return 1
+        if text.lower() in _FALSE:
+            return 0
+        raise ValueError('%s: expected on/off, got %r' % (name, text))
+    return int(text)
+
+
+def parse_axis(spec):
+    # 'name=1..64', 'name=10..500:10', 'name=[a,b,c]' or 'name=5' -> (name, values array)
+    name, sep, expr = spec.partition('=')
+    name = name.strip()
+    if not sep or name not in engine.INPUT_INDEX:
+        raise ValueError('Unknown sweep input: %r' % spec)
+    expr = expr.strip()
+    if expr.startswith('[') and expr.endswith(']'):
+        values = [parse_value(name, item) for item in expr[1:-1].split(',') if item.strip()]
+    elif '..' in expr:
+        bounds, _, step = expr.partition(':')
+        low, _, high = bounds.partition('..')
+        low, high, step = int(low), int(high), int(step or 1)
+        if step <= 0 or high < low:
+            raise ValueError('%s: empty range %r' % (name, expr))
+        values = range(low, high + 1, step)
+    else:
+        values = [parse_value(name, expr)]
+    values = np.array(values, dtype=np.int64)
+    if not len(values):
+        raise ValueError('%s: no values' % name)
+    # Checked as the form checks them (schema.ValidationError is a
+    # ValueError); the schema bounds are intervals, so the smallest and
+    # largest value stand for the whole axis
+    for value in {int(values.min()), int(values.max())}:
+        schema.parse_inputs({name: value})
+    return name, values
+
+
+class Sweep:
+    # Axes over engine.INPUTS; every other input stays at its default
+
+    def __init__(self, axes, base=None):
+        self.names = [name for name, _ in axes]
+        self.values = [values for _, values in axes]
+        self.columns = np.array([engine.INPUT_INDEX[name] for name in self.names], dtype=np.intp)
+        self.shape = tuple(len(values) for values in self.values)
+        self.size = math.prod(self.shape)
+        self.base = engine.as_matrix(dict(engine.INPUT_DEFAULTS, **(base or {})))[0]
+
+    def _rows(self, digits):
+        # digits: one index array per axis -> N x len(INPUTS) input matrix
+        X = np.repeat(self.base[np.newaxis, :], len(digits[0]), axis=0)
+        for column, values, index in zip(self.columns, self.values, digits):
+            X[:, column] = values[index]
+        return X
+
+    def grid_rows(self, start, stop):
+        # Points start..stop-1 of the full Cartesian product in row-major order
+        index = np.arange(start, stop, dtype=np.int64)
+        return self._rows(np.unravel_index(index, self.shape))
+
+    def grid(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Full Cartesian product, chunk_size points at a time
+        for start in range(0, self.size, chunk_size):
+            yield self.grid_rows(start, min(start + chunk_size, self.size))
+
+    def lhs_plan(self, samples, seed=None):
+        # Each axis is cut into `samples` equal strata and every stratum is used
+        # exactly once, in an independent random order per axis. The plan also
+        # fixes the entropy of the jitter within each stratum; the last item is
+        # the first sample the permutations start at (see lhs_window()).
+        rng = np.random.default_rng(seed)
+        perms = [rng.permutation(samples) for _ in self.values]
+        return perms, int(rng.integers(1 << 62)), 0
+
+    @staticmethod
+    def lhs_window(plan, start, stop):
+        # The part of a plan that samples start..stop-1 use, to hand a chunk to
+        # another process without the whole permutations
+        perms, entropy, offset = plan
+        return [perm[start - offset:stop - offset] for perm in perms], entropy, start
+
+    def lhs_rows(self, plan, samples, start, stop):
+        # Samples start..stop-1 of a Latin-hypercube plan; chunks can be drawn in any order
+        perms, entropy, offset = plan
+        rng = np.random.default_rng([entropy, start])
+        digits = []
+        for perm, values in zip(perms, self.values):
+            u = (perm[start - offset:stop - offset] + rng.random(stop - start)) / samples
+            digits.append(np.minimum((u * len(values)).astype(np.int64), len(values) - 1))
+        return self._rows(digits)
+
+    def latin_hypercube(self, samples, seed=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        plan = self.lhs_plan(samples, seed)
+        for start in range(0, samples, chunk_size):
+            yield self.lhs_rows(plan, samples, start, min(start + chunk_size, samples))
+
+
+# Writers take (path, columns) and write one chunk at a time
+csv_rows = export.csv_rows
+WRITERS = export.WRITERS
+
+
+def size(sweep, X):
+    # -> [swept inputs | outputs] table for one chunk of input rows
+    return np.hstack([X[:, sweep.columns], engine.calculate_batch(X)])
+
+
+def run(sweep, chunks, writer):
+    # Size every chunk and hand it to the writer; returns the point count
+    count = 0
+    for X in chunks:
+        writer.write(size(sweep, X))
+        count += len(X)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Size a grid of calculate() inputs.')
+    parser.add_argument('axes', nargs='+', help="e.g. impala_prod_exec=1..64 cml_medium_session=10..500:10 "
+                                               "internal_nfs=[on,off]")
+    parser.add_argument('--out', default='-', help='output file (default: stdout)')
+    parser.add_argument('--format', choices=sorted(WRITERS), help='default: from --out extension, else csv')
+    parser.add_argument('--lhs', type=int, metavar='N', help='Latin-hypercube sample of N points instead of the full grid')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workbook', default=os.environ.get('SIZING_WORKBOOK', workbook.LOCAL_PATH))
+    args = parser.parse_args(argv)
+    workbook.configure(args.workbook)
+
+    try:
+        sweep = Sweep([parse_axis(spec) for spec in args.axes])
+    except ValueError as exc:
+        parser.error(str(exc))
+    fmt = args.format or export.format_for(args.out)
+    if fmt == 'xlsx' and args.out == '-':
+        parser.error('XLSX needs --out FILE')
+    if args.lhs:
+        chunks = sweep.latin_hypercube(args.lhs, seed=args.seed, chunk_size=args.chunk)
+    else:
+        chunks = sweep.grid(chunk_size=args.chunk)
+
+    start = time.perf_counter()
+    try:
+        writer = WRITERS[fmt](args.out, sweep.names + list(engine.OUTPUTS), 'sweep')
+    except RuntimeError as exc:
+        parser.error(str(exc))
+    try:
+        count = run(sweep, chunks, writer)
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+    print('%d points in %.2fs (%.0f points/s)' % (count, seconds, count / seconds if seconds else 0),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOK = os.path.join(ROOT, 'sizing.xlsx')
+
+# The modules live next to app.py; the app reads its settings at import
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SIZING_WORKBOOK', WORKBOOK)
+os.environ.setdefault('SIZING_WATCH_INTERVAL', '0')
+os.environ.setdefault('SIZING_SHARED_CACHE_SIZE', '0')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--slow', action='store_true', help='also run the tests marked slow (the cold-start budgets)')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: starts fresh interpreters; runs only with --slow')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--slow'):
+        return
+    skip = pytest.mark.skip(reason='slow; run with --slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='session')
+def book():
+    # sizing.xlsx as the configured workbook, as the app configures it
+    import formula
+    import workbook
+
+    current = workbook._default
+    if current is None or current.path != WORKBOOK:
+        workbook.configure(WORKBOOK, sheets=(formula.ROOT_SHEET,) + workbook.PROFILES + ('Resources',))
+    return workbook.default()
+
+
+@pytest.fixture(scope='session')
+def client(book):
+    import app
+
+    return app.app.test_client()
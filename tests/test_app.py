@@ -0,0 +1,70 @@
+import pytest
+
+import app
+import engine
+import memo
+from test_engine import BASELINE
+
+
+def test_calculate_page(client):
+    response = client.post('/calculate', data={'impala_prod_exec': '4'})
+    assert response.status_code == 200
+    assert b'Hardware Dimensioning Output' in response.data
+    assert b'fixed node baselines of the DEV profile sheet' in response.data
+
+
+@pytest.mark.parametrize('changes', [
+    {},
+    {'impala_prod_exec': 4, 'cml_medium_session': 10, 'internal_nfs': True, 'drs_backup': 1},
+    {'hive_vw': 3, 'job_quantity': 7, 'job_exec': 2, 'data_viz_large': 2, 'cml_nfs': 500},
+    {'impala_vw': 2, 'impala_lite_exec': 5, 'cde_vc': 3, 'cml_xsmall_session': 20, 'model_registry': True},
+])
+def test_one_scenario_matches_a_batch_of_one(book, changes):
+    inputs = dict(engine.INPUT_DEFAULTS, **changes)
+    results = app.calculate_requirements(inputs)
+    row = engine.calculate_batch([inputs])[0]
+    assert {name: results[name] for name in engine.OUTPUTS} == dict(zip(engine.OUTPUTS, row.tolist()))
+
+
+@pytest.mark.parametrize('changes, expected', BASELINE)
+def test_calculate_requirements_matches_original_totals(book, changes, expected):
+    results = app.calculate_requirements(dict(engine.INPUT_DEFAULTS, **changes))
+    assert {name: results[name] for name in engine.OUTPUTS} == expected
+
+
+def test_invalid_input_is_reported_on_the_form(client):
+    response = client.post('/calculate', data={'cml_nfs': '10'})
+    assert response.status_code == 400
+    assert b'must be at least 100' in response.data
+
+
+def test_delta_chain_matches_full_calculation(book):
+    base = dict(engine.INPUT_DEFAULTS)
+    rows = dict(app.calculate_delta(base)['components'])
+    for field, value in (('impala_prod_exec', 4), ('cml_medium_session', 30), ('job_exec', 50)):
+        delta = app.calculate_delta(base, field, value)
+        base = dict(base, **{field: value})
+        rows.update(delta['components'])
+        full = app.calculate_requirements(base)
+        assert delta['totals'] == {name: full[name] for name in engine.OUTPUTS}
+        assert rows == full['components']
+
+
+def test_delta_totals_are_the_batch_totals(book):
+    base = dict(engine.INPUT_DEFAULTS)
+    for field, value in (('hive_vw', 3), ('internal_nfs', True), ('cml_nfs', 500), ('drs_backup', 2)):
+        delta = app.calculate_delta(base, field, value)
+        base = dict(base, **{field: value})
+        row = dict(zip(engine.OUTPUTS, engine.calculate_batch([base])[0].tolist()))
+        assert delta['totals'] == row
+        components = app.calculate_delta(base)['components'].values()
+        assert {name: sum(part[name] for part in components) for name in engine.OUTPUTS} == row
+
+
+def test_unreachable_shared_cache_is_a_miss(tmp_path):
+    cache = memo.SharedCache(str(tmp_path / 'file' / 'shared.sqlite3'))
+    (tmp_path / 'file').write_text('')  # a file where the directory should be
+    cache.put('key', {'value': 1})
+    assert cache.get('key', 'missing') == 'missing'
+    assert cache.stats()['size'] is None
+    assert cache.stats()['errors'] == 2
@@ -0,0 +1,105 @@
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+import asgi
+
+
+@pytest.fixture(scope='module')
+def server(book):
+    import app
+
+    server = asgi.SizingASGI(app.app, processes=1, threads=2)
+    yield server
+    server.close()
+
+
+def _request(server, method, path, parts=(), query=b''):
+    # Runs one request through the ASGI app. parts: request body messages.
+    # Returns (status, body, log), log holding for each response body message
+    # the number of request messages read by then.
+    incoming = [{'type': 'http.request', 'body': part, 'more_body': i < len(parts) - 1}
+                for i, part in enumerate(parts)] or [{'type': 'http.request', 'body': b''}]
+    read = []
+    status = []
+    body = []
+    log = []
+
+    async def receive():
+        if incoming:
+            read.append(incoming.pop(0))
+            return read[-1]
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        else:
+            log.append(len(read))
+            body.append(message.get('body', b''))
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': []}
+    asyncio.run(server(scope, receive, send))
+    return status[0], b''.join(body), log
+
+
+def test_batch_reads_no_further_ahead_than_it_sends(server):
+    lines = [json.dumps({'id': i, 'impala_prod_exec': i + 1}).encode() + b'\n' for i in range(12)]
+    status, body, log = _request(server, 'POST', '/api/calculate/batch', lines, query=b'chunk=1')
+    assert status == 200
+    records = [json.loads(line) for line in body.decode().splitlines()]
+    assert [record['id'] for record in records[:-1]] == list(range(12))
+    assert records[-1]['summary']['scenarios'] == 12
+    # One chunk is sized while the next is read, so by the time block n goes
+    # out at most n + 2 request messages have been taken from the client
+    for sent, read in enumerate(log, 1):
+        assert read <= sent + 2
+
+
+def test_sweep_streams_one_block_per_chunk(server):
+    query = json.dumps({'axes': ['impala_prod_exec=1..64', 'job_exec=1..1000'], 'lhs': 50, 'seed': 1,
+                        'chunk': 20}).encode()
+    status, body, log = _request(server, 'POST', '/api/sweep', [query])
+    assert status == 200
+    rows = list(csv.reader(io.StringIO(body.decode())))
+    assert rows[0][:2] == ['impala_prod_exec', 'job_exec'] and len(rows) == 51
+    assert len(log) == 1 + 3 + 1  # header, three chunks, end of body
+
+
+def test_sweep_rejects_values_the_form_would(server):
+    status, body, _ = _request(server, 'POST', '/api/sweep', [b'{"axes": ["cml_nfs=10..500"]}'])
+    assert status == 400
+    assert 'cml_nfs' in json.loads(body)['error']
+
+
+def test_passthrough_reads_the_body_as_the_app_asks(book):
+    # A WSGI app answering each request line as it reads it: the body must
+    # arrive message by message and every block go out before the next read
+    def echo(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        for line in environ['wsgi.input']:
+            yield line.upper()
+
+    server = asgi.SizingASGI(echo, threads=1)
+    try:
+        status, body, log = _request(server, 'POST', '/echo', [b'a\n', b'b\nc\n', b'd'])
+    finally:
+        server.close()
+    assert (status, body) == (200, b'A\nB\nC\nD')
+    assert log == [1, 2, 2, 3, 3]  # four lines, then the end of the body
+
+
+def test_passthrough_matches_flask(server, client):
+    lines = [json.dumps({'id': i, 'hive_vw': i + 1}) + '\n' for i in range(5)]
+    expected = client.post('/api/export/batch?format=csv&chunk=2', data=''.join(lines)).data
+    status, body, _ = _request(server, 'POST', '/api/export/batch', [line.encode() for line in lines],
+                               query=b'format=csv&chunk=2')
+    assert (status, body) == (200, expected)
+
+
+def test_passthrough_serves_the_form(server):
+    status, body, _ = _request(server, 'GET', '/')
+    assert status == 200 and b'<form' in body
@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+
+import engine
+from conftest import ROOT, WORKBOOK
+
+
+def _cli(*args, stdin=''):
+    result = subprocess.run([sys.executable, 'cli.py', '--workbook', WORKBOOK] + list(args), cwd=ROOT,
+                            input=stdin, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_files_are_sized_in_input_order(tmp_path):
+    (tmp_path / 'a.csv').write_text('id,hive_vw,impala_prod_exec\nx,2,4\ny,,9\nz,0,1\n')
+    (tmp_path / 'b.json').write_text(json.dumps({'scenarios': [{'id': 'w', 'cml_medium_session': 30}]}))
+    out = _cli(str(tmp_path / 'a.csv'), str(tmp_path / 'b.json'), '--format', 'csv', '--chunk', '1',
+               '--processes', '2')
+    rows = list(csv.DictReader(io.StringIO(out)))
+    assert [row['id'] for row in rows] == ['x', 'y', 'z', 'w']
+    assert 'hive_vw' in rows[2]['error'] and not rows[2]['nodes']
+    expected = engine.calculate_batch([dict(engine.INPUT_DEFAULTS, hive_vw=2, impala_prod_exec=4),
+                                       dict(engine.INPUT_DEFAULTS, impala_prod_exec=9),
+                                       dict(engine.INPUT_DEFAULTS, cml_medium_session=30)])
+    for row, totals in zip([rows[0], rows[1], rows[3]], expected.tolist()):
+        assert [float(row[name]) for name in engine.OUTPUTS] == totals
+
+
+def test_stdin_ndjson_matches_the_batch_api(client):
+    lines = ''.join(json.dumps({'id': i, 'job_exec': i + 1}) + '\n' for i in range(4))
+    out = [json.loads(line) for line in _cli(stdin=lines).splitlines()]
+    api = [json.loads(line) for line in client.post('/api/calculate/batch', data=lines).data.splitlines()]
+    assert out == api[:-1]
+
+
+def test_cli_does_not_import_the_web_app():
+    result = subprocess.run([sys.executable, '-c', 'import cli, sys; print(sorted({"flask", "jinja2", "app"} & '
+                             'set(sys.modules)))'], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,12 @@
+import pytest
+
+import coldstart
+from conftest import WORKBOOK
+
+
+@pytest.mark.slow
+def test_cold_start_is_within_budget():
+    timings, heavy, _ = coldstart.run(WORKBOOK, repeat=3)
+    over = {step: round(timings[step], 3) for step, limit in coldstart.BUDGETS.items() if timings[step] > limit}
+    assert over == {}
+    assert heavy == []
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import catalog
+import engine
+
+# Totals of the original hard-coded calculate_requirements (before the engine
+# and the catalog), for the defaults and two scenarios
+BASELINE = [
+    ({}, {'nodes': 52, 'cpu_cores': 1991, 'ram_gb': 8127, 'storage_gb': 18725, 'nfs_gb': 0,
+          'cdw_local_disk_gb': 8820, 'ccu_cpu': 3879, 'ccu_ram': 15615}),
+    ({'impala_prod_exec': 4, 'cml_medium_session': 10, 'backup_workspace': 2, 'model_registry': True,
+      'internal_nfs': True, 'drs_backup': 1},
+     {'nodes': 56, 'cpu_cores': 2075, 'ram_gb': 8623, 'storage_gb': 18725, 'nfs_gb': 100,
+      'cdw_local_disk_gb': 8820, 'ccu_cpu': 3963, 'ccu_ram': 16111}),
+    ({'hive_vw': 3, 'job_quantity': 7, 'job_exec': 2, 'impala_lite_exec': 5, 'data_viz_large': 2, 'cml_nfs': 500},
+     {'nodes': 54, 'cpu_cores': 2023, 'ram_gb': 8295, 'storage_gb': 18725, 'nfs_gb': 0,
+      'cdw_local_disk_gb': 8820, 'ccu_cpu': 3911, 'ccu_ram': 15783}),
+]
+
+
+def _inputs(changes):
+    return dict(engine.INPUT_DEFAULTS, **changes)
+
+
+@pytest.mark.parametrize('changes, expected', BASELINE)
+def test_builtin_model_matches_original_totals(changes, expected):
+    out = catalog.BUILTIN.model.evaluate(_inputs(changes))[0]
+    assert dict(zip(engine.OUTPUTS, out.tolist())) == expected
+
+
+@pytest.mark.parametrize('changes, expected', BASELINE)
+def test_workbook_catalog_matches_original_totals(book, changes, expected):
+    out = engine.calculate_batch(_inputs(changes), catalog.current().model)[0]
+    assert dict(zip(engine.OUTPUTS, out.tolist())) == expected
+
+
+def test_batch_matches_one_at_a_time():
+    model = catalog.BUILTIN.model
+    rows = [_inputs(changes) for changes, _ in BASELINE]
+    assert engine.calculate_batch(rows, model).tolist() == [model.evaluate(row)[0].tolist() for row in rows]
+
+
+def test_breakdown_sums_to_totals():
+    model = catalog.BUILTIN.model
+    X = engine.as_matrix([_inputs(changes) for changes, _ in BASELINE])
+    assert np.array_equal(model.breakdown(X).sum(axis=1), model.evaluate(X))
+    assert model.groups[-2:] == engine.BASELINE_GROUPS
@@ -0,0 +1,38 @@
+import csv
+import io
+import json
+
+import engine
+
+SCENARIOS = [
+    {},
+    {'hive_vw': 3, 'job_quantity': 7, 'cml_nfs': 500},
+    {'impala_prod_exec': 4, 'internal_nfs': True, 'drs_backup': 1},
+]
+
+
+def _csv(response):
+    assert response.status_code == 200
+    return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+
+def test_summary_and_batch_rows_have_the_same_totals(book, client):
+    body = ''.join(json.dumps(dict(changes, id=str(i))) + '\n' for i, changes in enumerate(SCENARIOS))
+    rows = _csv(client.post('/api/export/batch?format=csv', data=body))
+    assert [row['id'] for row in rows] == ['0', '1', '2']
+    for changes, row in zip(SCENARIOS, rows):
+        form = {name: str(value).lower() if isinstance(value, bool) else str(value) for name, value in changes.items()}
+        summary = _csv(client.post('/export/csv?table=summary', data=form))
+        totals = {line['output']: float(line['value']) for line in summary if line['section'] == 'totals'}
+        assert totals == {name: float(row[name]) for name in engine.OUTPUTS}
+
+
+def test_unparseable_line_keeps_its_place(client):
+    rows = _csv(client.post('/api/export/batch?format=csv', data='{"hive_vw": 2}\nnot json\n{}\n'))
+    assert [row['line'] for row in rows] == ['1', '2', '3']
+    assert rows[1]['error'] and not rows[1]['nodes']
+    assert not rows[0]['error'] and not rows[2]['error']
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.post('/export/pdf').status_code == 400
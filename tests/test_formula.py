@@ -0,0 +1,27 @@
+import pytest
+
+import engine
+import formula
+
+
+@pytest.fixture(scope='module')
+def graph(book):
+    return formula.current()
+
+
+def test_compiled_formulas_match_the_values_excel_saved(graph):
+    assert graph.check() == []
+
+
+@pytest.mark.parametrize('changes', [
+    {},
+    {'impala_prod_exec': 4},
+    {'cml_medium_session': 30, 'internal_nfs': True},
+    {'job_exec': 50, 'hive_vw': 2},
+])
+def test_incremental_update_matches_a_full_calculation(graph, changes):
+    calc = graph.calculation()
+    calc.set_inputs(engine.INPUT_DEFAULTS)
+    calc.set_inputs(changes)
+    assert calc.outputs() == formula.calculate(dict(engine.INPUT_DEFAULTS, **changes))
+
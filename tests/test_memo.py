@@ -0,0 +1,83 @@
+import threading
+
+import memo
+
+
+class _Version:
+    # Data version the caches see, switched by the test
+    def __init__(self):
+        self.value = 'v1'
+
+    def __call__(self):
+        return self.value
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = memo.LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_is_cleared_for_a_new_version():
+    version = _Version()
+    cache = memo.LRUCache(version=version)
+    cache.put('key', 'old')
+    version.value = 'v2'
+    assert cache.get('key') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_lru_put_from_a_retired_version_keeps_the_current_entry():
+    version = _Version()
+    cache = memo.LRUCache(version=version)
+    cache.put('key', 'old')
+    version.value = 'v2'
+    cache.put('key', 'new')
+    version.value = 'v1'  # a request still finishing on the old workbook
+    cache.put('key', 'stale')
+    assert cache.get('key') is None
+    version.value = 'v2'
+    assert cache.get('key') == 'new'
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_shared_cache_is_seen_by_another_instance(tmp_path):
+    path = str(tmp_path / 'shared.sqlite3')
+    memo.SharedCache(path).put('key', {'nodes': 52})
+    other = memo.SharedCache(path)
+    assert other.get('key') == {'nodes': 52}
+    assert other.stats()['hits'] == 1
+
+
+def test_shared_cache_put_from_a_retired_version_keeps_the_current_entry(tmp_path):
+    version = _Version()
+    cache = memo.SharedCache(str(tmp_path / 'shared.sqlite3'), version=version)
+    cache.put('key', 'old')
+    version.value = 'v2'
+    assert cache.get('key') is None
+    cache.put('key', 'new')
+    version.value = 'v1'
+    cache.put('key', 'stale')
+    version.value = 'v2'
+    assert cache.get('key') == 'new'
+
+
+def test_shared_cache_counts_every_lookup_across_threads(tmp_path):
+    cache = memo.SharedCache(str(tmp_path / 'shared.sqlite3'), timeout=5)
+    cache.put('hit', 1)
+
+    def lookups():
+        for i in range(200):
+            cache.get('hit' if i % 2 else 'miss')
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['errors']) == (800, 800, 0)
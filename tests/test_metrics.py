@@ -0,0 +1,38 @@
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram('h_seconds', 'Help.', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, '/x')
+    assert histogram.render() == [
+        '# HELP h_seconds Help.',
+        '# TYPE h_seconds histogram',
+        'h_seconds_bucket{route="/x",le="0.1"} 1',
+        'h_seconds_bucket{route="/x",le="1.0"} 3',
+        'h_seconds_bucket{route="/x",le="+Inf"} 4',
+        'h_seconds_sum{route="/x"} 4.05',
+        'h_seconds_count{route="/x"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter('c_total', 'Help.', ('path',))
+    counter.inc(2, 'a"b\\c')
+    assert counter.render()[-1] == 'c_total{path="a\\"b\\\\c"} 2'
+
+
+def test_calculate_is_timed_and_counted(client):
+    before = client.get('/metrics').get_data(as_text=True)
+    response = client.post('/calculate', data={'hive_vw': '2'})
+    phases = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+    assert phases[0] == 'parse' and phases[-1] == 'total'
+    after = client.get('/metrics').get_data(as_text=True)
+    line = 'sizing_requests_total{route="/calculate",method="POST",status="200"} '
+
+    def count(text):
+        return next((int(row[len(line):]) for row in text.splitlines() if row.startswith(line)), 0)
+
+    assert count(after) == count(before) + 1
+    assert 'sizing_request_phase_seconds_count{route="/calculate",phase="compute"}' in after
+    assert 'sizing_workbook_info{' in after
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import engine
+import montecarlo
+
+
+def test_percentiles_are_those_of_the_sized_samples(book):
+    distributions = [montecarlo.parse_distribution('job_exec=normal(10,3)'),
+                     montecarlo.parse_distribution('impala_prod_exec=discrete(2:0.5,4:0.3,8:0.2)')]
+    result = montecarlo.simulate(distributions, {'hive_vw': 2}, 5000, seed=7, chunk_size=1000)
+    # The same draws, sized row by row with the full model
+    X = np.repeat(engine.as_matrix(dict(engine.INPUT_DEFAULTS, hive_vw=2)), 5000, axis=0)
+    for chunk, first in enumerate(range(0, 5000, 1000)):
+        rng = np.random.default_rng([7, chunk])
+        for d in distributions:
+            X[first:first + 1000, engine.INPUT_INDEX[d.name]] = d.sample(rng, 1000)
+    nodes = np.sort(engine.calculate_batch(X)[:, engine.OUTPUT_INDEX['nodes']])
+    for q in montecarlo.PERCENTILES:
+        assert result['outputs']['nodes']['p%d' % q] == nodes[int(np.ceil(q / 100 * 5000)) - 1]
+    assert result['outputs']['nodes']['max'] == nodes[-1]
+
+
+def test_samples_stay_within_the_form_limits():
+    d = montecarlo.parse_distribution('cml_nfs=normal(100,500)')
+    assert d.sample(np.random.default_rng(1), 10000).min() == 100
+
+
+@pytest.mark.parametrize('spec', [
+    'job_exec=normal(nan,3)',
+    'job_exec=normal(10,inf)',
+    'job_exec=triangular(1,nan,5)',
+    'job_exec=triangular(1,2,inf)',
+    'job_exec=discrete(2:nan,4:1)',
+    'job_exec=discrete(2:inf,4:1)',
+    'internal_nfs=normal(1,0)',
+])
+def test_invalid_distributions_are_rejected(spec):
+    with pytest.raises(ValueError):
+        montecarlo.parse_distribution(spec)
+
+
+@pytest.mark.parametrize('distribution', ['normal(NaN, 3)', 'triangular(1, nan, 5)', {'mode': float('nan')}])
+def test_api_rejects_non_finite_parameters(client, distribution):
+    response = client.post('/api/montecarlo', json={'distributions': {'job_exec': distribution}, 'samples': 100})
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import engine
+import packing
+
+SHAPE = {'max_cpu_per_node': 16, 'max_ram_per_node': 64, 'max_storage_per_node': 100}
+PODS = (
+    ('big', 'big_count', 6, 20, 10),
+    ('small', 'small_count', 'small_cpu', 4, 5),
+    ('disk', 'disk_count', 1, 1, 60),
+    ('huge', 'huge_count', 32, 8, 0),
+)
+
+
+def _first_fit_decreasing(inputs, shape, pods):
+    # One pod at a time, as the packing is defined; the reference for the vectorized pack()
+    capacity = np.array([shape['max_cpu_per_node'], shape['max_ram_per_node'], shape['max_storage_per_node']], float)
+    kinds = sorted(packing.expand_pods(inputs, pods), key=lambda k: (k[2] / capacity).max(), reverse=True)
+    free = []
+    counts = []
+    for kind, n, size in kinds:
+        if (size > capacity).any():
+            continue
+        for _ in range(n):
+            for node, left in enumerate(free):
+                if (size <= left).all():
+                    break
+            else:
+                node = len(free)
+                free.append(capacity.copy())
+                counts.append({})
+            free[node] -= size
+            counts[node][kind] = counts[node].get(kind, 0) + 1
+    return counts
+
+
+@pytest.mark.parametrize('counts', [
+    {'big_count': 5, 'small_count': 9, 'disk_count': 3, 'huge_count': 0, 'small_cpu': 3},
+    {'big_count': 0, 'small_count': 40, 'disk_count': 7, 'huge_count': 2, 'small_cpu': 5},
+    {'big_count': 17, 'small_count': 1, 'disk_count': 0, 'huge_count': 0, 'small_cpu': 1},
+])
+def test_pack_matches_one_pod_at_a_time(counts):
+    placement = packing.pack(counts, SHAPE, PODS)
+    assert [row['pods'] for row in placement.per_node()] == _first_fit_decreasing(counts, SHAPE, PODS)
+    assert (placement.used <= placement.capacity).all()
+    assert placement.unplaced == ({'huge': counts['huge_count']} if counts['huge_count'] else {})
+
+
+def test_pack_places_every_pod_of_the_defaults(book):
+    inputs = dict(engine.INPUT_DEFAULTS, impala_prod_exec=20, cml_medium_session=30)
+    placement = packing.pack(inputs)
+    expected = sum(n for _, n, _ in packing.expand_pods(inputs))
+    summary = placement.summary()
+    assert summary['pods'] == expected and summary['unplaced'] == {}
+    assert 0 < summary['max_utilisation']['cpu'] <= 1
+
+
+def test_pack_rejects_an_empty_node_shape():
+    with pytest.raises(ValueError):
+        packing.pack({'big_count': 1}, dict(SHAPE, max_cpu_per_node=0), PODS[:1])
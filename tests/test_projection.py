@@ -0,0 +1,54 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+import engine
+import projection
+
+
+def _grown(growth, months):
+    X = engine.as_matrix(dict(engine.INPUT_DEFAULTS, impala_prod_exec=10))
+    G = projection.growth_matrix({'impala_prod_exec': growth})[np.newaxis]
+    return projection.grow(X, G, months)[0, :, engine.INPUT_INDEX['impala_prod_exec']].tolist()
+
+
+@pytest.mark.parametrize('growth, expected', [
+    ('step(2, 6)', [10] * 6 + [12] * 6 + [14]),
+    ('step(50%, 6)', [10] * 6 + [15] * 6 + [23]),  # 22.5 rounds half up
+    ('compound(100%)', [int(np.floor(10 * 2 ** (m / 12) + 0.5)) for m in range(13)]),
+])
+def test_growth_follows_its_spec(book, growth, expected):
+    assert _grown(growth, 12) == expected
+
+
+def test_a_component_grows_all_its_counts(book):
+    G = projection.growth_matrix({'CML': 'compound(40%)'})
+    grown = {name for name in engine.INPUTS if G[0, engine.INPUT_INDEX[name]]}
+    assert 'cml_medium_session' in grown and 'impala_prod_exec' not in grown
+
+
+@pytest.mark.parametrize('spec', ['compound(30)', 'step(2, 0)', 'linear(5%)', 'compound(-100%)'])
+def test_bad_growth_is_rejected(spec):
+    with pytest.raises(ValueError):
+        projection.parse_growth(spec)
+
+
+def test_series_and_crossings(book, client):
+    body = {'scenarios': [{'id': 'bank', 'impala_prod_exec': 4}, {'id': 'bad', 'hive_vw': 0}],
+            'growth': {'impala_prod_exec': 'step(10, 3)'}, 'months': 24, 'budget': {'cpu_cores': 2300}}
+    series = list(csv.DictReader(io.StringIO(
+        client.post('/api/projection?format=csv', json=body).get_data(as_text=True))))
+    assert [int(row['month']) for row in series] == list(range(25))
+    # Each month is the scenario with its grown count, sized directly
+    for row in series:
+        count = 4 + 10 * (int(row['month']) // 3)
+        out = engine.calculate_batch([dict(engine.INPUT_DEFAULTS, impala_prod_exec=count)])[0]
+        assert float(row['cpu_cores']) == out[engine.OUTPUT_INDEX['cpu_cores']]
+    first = next(int(row['month']) for row in series if row['over_cpu_cores'] == '1')
+    crossings = list(csv.DictReader(io.StringIO(
+        client.post('/api/projection?format=csv&table=crossings', json=body).get_data(as_text=True))))
+    assert crossings[0]['id'] == 'bank' and int(crossings[0]['cpu_cores_month']) == first
+    assert crossings[0]['nodes_month'] == ''
+    assert 'hive_vw' in crossings[1]['error']
@@ -0,0 +1,94 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import workbook
+from conftest import ROOT, WORKBOOK
+
+
+@pytest.fixture
+def book(tmp_path):
+    # A copy of sizing.xlsx with a cache of its own; touching it makes a new version
+    path = str(tmp_path / 'sizing.xlsx')
+    shutil.copy(WORKBOOK, path)
+    book = workbook.Workbook(path, sheets=('Resources',), cache_dir=str(tmp_path / 'cache'))
+    book.snapshot()
+    yield book
+    book.stop()
+
+
+def _touch(book):
+    stat = os.stat(book.path)
+    os.utime(book.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_importing_the_app_starts_no_watcher():
+    code = 'import threading, app; print([t.name for t in threading.enumerate()])'
+    env = dict(os.environ, SIZING_WATCH_INTERVAL='2')
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert 'workbook-watcher' not in result.stdout
+
+
+def test_concurrent_requests_read_a_changed_file_once(book):
+    old = book.snapshot()
+    reads = []
+    read = book._read
+
+    def slow_read(names):
+        reads.append(names)
+        time.sleep(0.2)
+        return read(names)
+
+    book._read = slow_read
+    _touch(book)
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(book.snapshot())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(reads) == 1
+    assert {snapshot.version for snapshot in seen} <= {old.version, book.snapshot().version}
+    assert book.snapshot().version != old.version and book.reloads == 1
+
+
+def test_a_rejected_file_keeps_the_current_version(book):
+    old = book.snapshot()
+
+    def reject(snapshot):
+        raise ValueError('bad coefficient')
+
+    book.validate = reject
+    _touch(book)
+    assert book.snapshot() is old
+    assert book.rejected == 1 and 'bad coefficient' in book.last_error
+    book.validate = None
+    assert book.snapshot() is old  # not retried until the file changes again
+    _touch(book)
+    assert book.snapshot() is not old
+
+
+def test_a_pinned_request_finishes_on_its_version(book):
+    old = book.snapshot()
+    with workbook.pinned(None):
+        assert book.snapshot() is old
+        _touch(book)
+        assert book.snapshot() is old
+    assert book.snapshot().version != old.version
+
+
+def test_the_watcher_swaps_in_a_changed_file(book):
+    old = book.snapshot()
+    book.watch(0.05)
+    _touch(book)
+    deadline = time.monotonic() + 10
+    while book._snapshot is old and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert book._snapshot is not old and book.stats()['watching']
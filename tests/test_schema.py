@@ -0,0 +1,35 @@
+import pytest
+
+import engine
+import schema
+
+
+def test_blank_and_missing_fields_take_the_defaults():
+    inputs = schema.parse_inputs({'hive_vw': '', 'cml_nfs': ''})
+    assert inputs._asdict() == engine.INPUT_DEFAULTS
+
+
+def test_values_are_typed():
+    inputs = schema.parse_inputs({'hive_vw': '2', 'model_registry': 'on', 'internal_nfs': 'off'})
+    assert (inputs.hive_vw, inputs.model_registry, inputs.internal_nfs) == (2, True, False)
+
+
+@pytest.mark.parametrize('field, value', [
+    ('impala_prod_exec_mem', 127),
+    ('cml_nfs', 99),
+    ('hive_vw', 0),
+    ('backup_workspace', -1),
+    ('impala_prod_exec', schema.MAX_VALUE + 1),
+    ('hive_vw', 'two'),
+    ('hive_vw', '1.5'),
+])
+def test_out_of_range_or_malformed_values_are_rejected(field, value):
+    with pytest.raises(schema.ValidationError) as raised:
+        schema.parse_inputs({field: value})
+    assert list(raised.value.errors) == [field]
+
+
+def test_errors_of_every_field_are_reported_together():
+    with pytest.raises(schema.ValidationError) as raised:
+        schema.parse_form({'cml_nfs': 10, 'impala_prod_exec_mem': 64, 'max_cpu_per_node': 0})
+    assert set(raised.value.errors) == {'cml_nfs', 'impala_prod_exec_mem', 'max_cpu_per_node'}
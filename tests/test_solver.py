@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import engine
+import packing
+import solver
+
+NODES = 80
+
+
+def _fits(counts, nodes=NODES):
+    # Brute force: size the scenario and check every budgeted quantity
+    out = engine.calculate_batch([dict(engine.INPUT_DEFAULTS, **counts)])[0]
+    for _, outputs, field in solver.CONSTRAINTS:
+        used = sum(out[engine.OUTPUT_INDEX[name]] for name in outputs)
+        if used > nodes * (packing.NODE_DEFAULTS[field] if field else 1):
+            return False
+    return True
+
+
+@pytest.mark.parametrize('component', ['impala_prod_exec', 'job_exec', 'cml_medium_session'])
+def test_max_count_is_the_largest_that_fits(book, component):
+    k, binding = solver.max_count({}, component, NODES)
+    assert binding in [name for name, _, _ in solver.CONSTRAINTS]
+    assert _fits({component: k})
+    assert not _fits({component: k + 1})
+
+
+def test_pareto_points_fit_and_cannot_grow(book):
+    components = ['impala_prod_exec', 'job_exec']
+    points = solver.pareto({}, components, NODES)
+    assert len(points) > 1
+    for point in points:
+        assert _fits(point)
+        for name in components:
+            assert not _fits(dict(point, **{name: point[name] + 1}))
+    firsts = [point['impala_prod_exec'] for point in points]
+    assert firsts == sorted(firsts)
+    assert np.all(np.diff([point['job_exec'] for point in points]) < 0)
+
+
+def test_a_budget_the_rest_already_exceeds_is_infeasible(book):
+    with pytest.raises(solver.Infeasible):
+        solver.solve({}, ['impala_prod_exec'], 10)
+
+
+def test_solve_endpoint_rejects_an_unknown_component(client):
+    response = client.post('/api/solve', json={'nodes': NODES, 'components': ['internal_nfs']})
+    assert response.status_code == 400
@@ -0,0 +1,39 @@
+import json
+import os
+
+import pytest
+
+import app
+import engine
+import store
+from conftest import ROOT
+
+
+@pytest.fixture
+def runs(tmp_path, monkeypatch):
+    runs = store.Store(str(tmp_path / 'scenarios.sqlite3'))
+    monkeypatch.setattr(app, 'scenario_store', runs)
+    return runs
+
+
+def test_default_path_is_next_to_the_code():
+    assert store.DEFAULT_PATH == os.path.join(ROOT, 'scenarios.sqlite3')
+
+
+def test_imported_and_saved_runs_have_the_same_totals(book, client, runs):
+    changes = {'hive_vw': 3, 'cml_nfs': 500, 'internal_nfs': True}
+    saved = client.post('/api/scenarios', json=dict(changes, customer='acme'))
+    assert saved.status_code == 201
+    line = json.dumps({'inputs': changes, 'customer': 'acme', 'tag': 'imported'}) + '\n'
+    assert client.post('/api/scenarios/import', data=line).get_json() == {'imported': 1, 'duplicates': 0,
+                                                                         'errors': []}
+    imported = runs.page(10, tag='imported')['runs'][0]
+    assert imported['results'] == {name: saved.get_json()['results'][name] for name in engine.OUTPUTS}
+
+
+def test_saving_the_same_run_again_returns_it(client, runs):
+    first = client.post('/api/scenarios', json={'hive_vw': 2, 'tag': 't'})
+    second = client.post('/api/scenarios', json={'hive_vw': 2, 'tag': 't'})
+    assert (first.status_code, second.status_code) == (201, 200)
+    assert second.get_json()['id'] == first.get_json()['id']
+    assert client.get('/api/scenarios?tag=t').get_json()['runs'][0]['id'] == first.get_json()['id']
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import engine
+import sweep
+
+AXES = ['impala_prod_exec=1..64', 'job_exec=1..1000', 'cml_medium_session=10..500:10']
+
+
+@pytest.fixture
+def grid():
+    return sweep.Sweep([sweep.parse_axis(spec) for spec in AXES])
+
+
+def test_latin_hypercube_uses_every_stratum_once():
+    # With as many samples as values, each value is one stratum
+    grid = sweep.Sweep([sweep.parse_axis('hive_vw=1..50'), sweep.parse_axis('job_exec=101..150')])
+    X = np.vstack(list(grid.latin_hypercube(50, seed=3, chunk_size=7)))
+    assert sorted(X[:, grid.columns[0]]) == list(range(1, 51))
+    assert sorted(X[:, grid.columns[1]]) == list(range(101, 151))
+
+
+def test_latin_hypercube_axes_are_independent_permutations(grid):
+    perms, _, _ = grid.lhs_plan(1000, seed=1)
+    for perm in perms:
+        assert sorted(perm) == list(range(1000))
+    # A rank-1 lattice would make every axis an affine function of the sample number
+    steps = {int(d) for d in np.diff(perms[0]) % 1000}
+    assert len(steps) > 1
+    assert not np.array_equal(perms[0], perms[1])
+
+
+def test_latin_hypercube_chunks_can_be_drawn_from_a_window(grid):
+    chunks = list(grid.latin_hypercube(100, seed=5, chunk_size=30))
+    plan = grid.lhs_plan(100, seed=5)
+    for start in (60, 0, 90, 30):
+        stop = min(start + 30, 100)
+        window = sweep.Sweep.lhs_window(plan, start, stop)
+        assert np.array_equal(grid.lhs_rows(window, 100, start, stop), chunks[start // 30])
+
+
+def test_grid_covers_the_cartesian_product():
+    grid = sweep.Sweep([sweep.parse_axis('hive_vw=1..3'), sweep.parse_axis('internal_nfs=[on,off]')])
+    X = np.vstack(list(grid.grid(chunk_size=4)))
+    assert X[:, grid.columns].tolist() == [[1, 1], [1, 0], [2, 1], [2, 0], [3, 1], [3, 0]]
+    assert np.array_equal(sweep.size(grid, X)[:, 2:], engine.calculate_batch(X))
+
+
+@pytest.mark.parametrize('spec, message', [
+    ('cml_nfs=10..500', 'cml_nfs: must be at least 100'),
+    ('hive_vw=0..4', 'hive_vw: must be at least 1'),
+    ('job_exec=[1,2000000]', 'job_exec: must be at most'),
+    ('no_such_input=1..2', 'Unknown sweep input'),
+])
+def test_axes_the_form_would_reject_are_errors(spec, message):
+    with pytest.raises(ValueError, match=message):
+        sweep.parse_axis(spec)
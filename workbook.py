@@ -0,0 +1,550 @@
+"""Lazy, disk-cached access to the sheets of sizing.xlsx.
+
+Parsing the workbook with openpyxl takes far longer than anything the app
+does with it, so the sheets are converted once into a small binary cache
+(one float64 .npy grid per sheet plus a JSON manifest for text cells and
+formulas) keyed by the workbook's content hash and mtime.  Later starts
+memory-map the grids instead of re-parsing, and nothing is read until a
+sheet is first used.
+
+The data is held as immutable snapshots, one per file version.  A watcher
+thread can re-read a changed file in the background, validate it and swap
+the new snapshot in with a single reference assignment, while requests
+that started on the old one finish on it.
+"""
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+CACHE_DIRNAME = '.sizing_cache'
+
+# Workbook shipped next to the code; command-line tools use it unless told otherwise
+LOCAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sizing.xlsx')
+
+# Profile sheets of sizing.xlsx; all share the DEV layout
+PROFILES = ('DEV', 'PROD', 'CML_DEV', 'CML_PROD', 'DEV - 50%', 'PROD-50%')
+
+
+def _column_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index - 1
+
+
+def split_ref(ref):
+    # 'B5' -> (row 4, col 1), zero based
+    ref = ref.replace('$', '')
+    for i, ch in enumerate(ref):
+        if ch.isdigit():
+            return int(ref[i:]) - 1, _column_index(ref[:i])
+    raise ValueError('Invalid cell reference: %r' % ref)
+
+
+class Sheet:
+    # One worksheet: numeric cells in a (possibly memory-mapped) float grid,
+    # text and boolean cells in a small dict keyed by (row, col).  values and
+    # text hold what Excel last calculated; formulas maps (row, col) to the
+    # source of every formula cell ('=SUM(C47:C53)') for formula.py.
+    __slots__ = ('name', 'values', 'text', 'formulas')
+
+    def __init__(self, name, values, text, formulas=None):
+        self.name = name
+        self.values = values
+        self.text = text
+        self.formulas = formulas or {}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def cell(self, ref):
+        row, col = split_ref(ref)
+        return self.at(row, col)
+
+    def at(self, row, col):
+        if (row, col) in self.text:
+            return self.text[(row, col)]
+        if row >= self.values.shape[0] or col >= self.values.shape[1]:
+            return None
+        value = float(self.values[row, col])
+        return None if math.isnan(value) else value
+
+    def to_frame(self):
+        # Same layout as pd.read_excel(path, sheet_name=name): first row is the header
+        import numpy as np
+        import pandas as pd
+
+        grid = self.values.astype(object)
+        grid[np.isnan(self.values)] = None
+        for (row, col), value in self.text.items():
+            grid[row, col] = value
+        if not len(grid):
+            return pd.DataFrame()
+        header = [value if value is not None else 'Unnamed: %d' % i for i, value in enumerate(grid[0])]
+        return pd.DataFrame(grid[1:], columns=header)
+
+
+def _file_key(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(chunk)
+    return '%s-%d' % (digest.hexdigest()[:16], os.stat(path).st_mtime_ns)
+
+
+def _parse_formulas(path, names):
+    # Second pass without data_only: formula cells come back as their source text
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        formulas = {}
+        for name in names:
+            found = formulas[name] = {}
+            for r, row in enumerate(wb[name].iter_rows(values_only=True)):
+                for c, value in enumerate(row):
+                    value = getattr(value, 'text', value)  # array formulas
+                    if isinstance(value, str) and value.startswith('=') and len(value) > 1:
+                        found[(r, c)] = value
+        return formulas
+    finally:
+        wb.close()
+
+
+def _parse_sheets(path, names):
+    import numpy as np
+    import openpyxl
+
+    formulas = _parse_formulas(path, names)
+    wb = openpyxl.load_workbook(path, data_only=True, read_only=True)
+    try:
+        sheets = {}
+        for name in names:
+            ws = wb[name]
+            rows = list(ws.iter_rows(values_only=True))
+            # read_only mode reports formatted-but-empty trailing rows and columns
+            while rows and all(value is None for value in rows[-1]):
+                rows.pop()
+            width = max((max((c + 1 for c, v in enumerate(row) if v is not None), default=0)
+                         for row in rows), default=0)
+            values = np.full((len(rows), width), np.nan)
+            text = {}
+            for r, row in enumerate(rows):
+                for c, value in enumerate(row[:width]):
+                    if value is None:
+                        continue
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        text[(r, c)] = value if isinstance(value, bool) else str(value)
+                    else:
+                        values[r, c] = value
+            sheets[name] = Sheet(name, values, text, formulas[name])
+        return sheets
+    finally:
+        wb.close()
+
+
+def _write_cache(cache_dir, key, sheets):
+    import numpy as np
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir)
+    os.chmod(tmp, 0o755)
+    manifest = {'version': CACHE_VERSION, 'sheets': {}}
+    for i, (name, sheet) in enumerate(sheets.items()):
+        filename = '%d.npy' % i
+        np.save(os.path.join(tmp, filename), sheet.values)
+        manifest['sheets'][name] = {
+            'file': filename,
+            'text': [[r, c, value] for (r, c), value in sheet.text.items()],
+            'formulas': [[r, c, source] for (r, c), source in sheet.formulas.items()],
+        }
+    with open(os.path.join(tmp, 'manifest.json'), 'w') as fh:
+        json.dump(manifest, fh)
+    target = os.path.join(cache_dir, key)
+    if os.path.isdir(target):
+        # Existing cache holds fewer sheets; move it aside so readers never see a partial dir
+        stale = tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir)
+        os.rename(target, os.path.join(stale, key))
+        shutil.rmtree(stale, ignore_errors=True)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Another process finished the same conversion first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return target
+
+
+def _prune_cache(cache_dir, key):
+    # Drop the caches of other versions of the workbook once version `key`
+    # is in use; until then the one in use stays for the next start
+    try:
+        entries = os.listdir(cache_dir)
+    except OSError:
+        return
+    for entry in entries:
+        path = os.path.join(cache_dir, entry)
+        if entry != key and not entry.startswith('.tmp-') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _read_cache(target, names):
+    import numpy as np
+
+    manifest_path = os.path.join(target, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as fh:
+        manifest = json.load(fh)
+    if manifest.get('version') != CACHE_VERSION or not set(names) <= set(manifest['sheets']):
+        return None
+    sheets = {}
+    for name, entry in manifest['sheets'].items():
+        values = np.load(os.path.join(target, entry['file']), mmap_mode='r')
+        text = {(r, c): value for r, c, value in entry['text']}
+        formulas = {(r, c): source for r, c, source in entry['formulas']}
+        sheets[name] = Sheet(name, values, text, formulas)
+    return sheets
+
+
+class Snapshot:
+    # One version of the workbook's data.  A reload builds a new snapshot and
+    # swaps it in, and a request keeps the one it started with (see pin()).
+    # The data of a version never changes, but the snapshot fills in lazily:
+    # sheets the workbook was not configured with are added to `sheets` from
+    # the same version on first use (as a new dict, under the workbook lock),
+    # and `derived` collects what is built from this version (catalogs,
+    # compiled formulas), so it is built once and dropped with the snapshot.
+    __slots__ = ('book', 'version', 'sheets', 'derived', 'source', 'load_seconds', 'loaded_at')
+
+    def __init__(self, book, version, sheets, source, load_seconds):
+        self.book = book
+        self.version = version
+        self.sheets = sheets
+        self.derived = {}
+        self.source = source
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+
+    def sheet(self, name):
+        sheets = self.sheets
+        if name not in sheets:
+            sheets = self.book._add_sheet(self, name)
+        return sheets[name]
+
+
+class Workbook:
+    # Lazily loaded, reloadable set of sheets from one workbook file.
+    # Without a watcher the file is stat()ed whenever the current snapshot is
+    # asked for and reloaded in place when it changes; with one (watch()) the
+    # request path only reads the snapshot reference and reloading happens in
+    # the watcher's thread.
+
+    def __init__(self, path, sheets=(), cache_dir=None):
+        self.path = path
+        self.sheet_names = tuple(sheets)
+        self.cache_dir = cache_dir or os.environ.get('SIZING_CACHE_DIR') or \
+            os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+        self.validate = None  # callable(snapshot) raising on a workbook that must not be used
+        self.reloads = self.rejected = 0
+        self.last_error = None
+        self._snapshot = None
+        self._lock = threading.RLock()  # validate() may add sheets while a reload holds it
+        self._stamp = None
+        self._watcher = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self, names):
+        # -> Snapshot of the file as it is now, through the binary cache
+        start = time.perf_counter()
+        key = _file_key(self.path)
+        target = os.path.join(self.cache_dir, key)
+        sheets = None
+        try:
+            sheets = _read_cache(target, names)
+        except (OSError, ValueError) as exc:
+            log.warning('Ignoring unreadable workbook cache %s: %s', target, exc)
+        if sheets is not None:
+            source = 'cache'
+        else:
+            sheets = _parse_sheets(self.path, names)
+            source = 'xlsx'
+            try:
+                target = _write_cache(self.cache_dir, key, sheets)
+                sheets = _read_cache(target, names) or sheets
+            except OSError as exc:
+                log.warning('Could not write workbook cache to %s: %s', self.cache_dir, exc)
+        snapshot = Snapshot(self, key, sheets, source, time.perf_counter() - start)
+        log.info('Loaded %s version %s from %s in %.3fs (%d bytes cached)', self.path, key, source,
+                 snapshot.load_seconds, sum(sheet.values.nbytes for sheet in sheets.values()))
+        return snapshot
+
+    def _add_sheet(self, snapshot, name):
+        # A sheet outside the configured set, read from the snapshot's own version
+        with self._lock:
+            if name in snapshot.sheets:
+                return snapshot.sheets
+            names = list(snapshot.sheets) + [name]
+            added = self._read(names)
+            if added.version != snapshot.version:
+                raise KeyError('%s changed since version %s was loaded; sheet %r is not in it'
+                               % (self.path, snapshot.version, name))
+            # Only sheets the workbook has are remembered; a bad name raised KeyError above
+            self.sheet_names = tuple(dict.fromkeys(self.sheet_names + (name,)))
+            snapshot.sheets = {**snapshot.sheets, name: added.sheets[name]}
+            return snapshot.sheets
+
+    def reload(self, stamp=None):
+        # Read and validate the file; swap it in if it is a new version.
+        # -> the current snapshot. A file that fails to load or validate
+        # leaves the current snapshot in place (the first load raises).
+        with self._lock:
+            current = self._snapshot
+            if current is not None and stamp is not None and stamp == self._stamp:
+                # Another request read this change while we waited for the lock
+                return current
+            stamp = stamp or self._stat()
+            try:
+                snapshot = self._read(self.sheet_names if current is None else tuple(current.sheets))
+                if current is not None and snapshot.version == current.version:
+                    self._stamp = stamp
+                    return current
+                if self.validate is not None:
+                    self.validate(snapshot)
+            except Exception as exc:
+                self._stamp = stamp  # not retried until the file changes again
+                if current is None:
+                    raise
+                self.rejected += 1
+                self.last_error = '%s: %s' % (type(exc).__name__, exc)
+                log.error('Keeping workbook version %s; %s could not be used: %s', current.version, self.path,
+                          self.last_error)
+                return current
+            self._stamp = stamp
+            self._snapshot = snapshot
+            _prune_cache(self.cache_dir, snapshot.version)
+            if current is not None:
+                self.reloads += 1
+                self.last_error = None
+                log.info('Switched %s from version %s to %s', self.path, current.version, snapshot.version)
+            return snapshot
+
+    def snapshot(self):
+        # The snapshot this request pinned, else the current one; None when
+        # the file cannot be read and nothing was loaded before
+        pinned = _pinned.get()
+        if pinned is not None:
+            snapshot = pinned[0]
+            if snapshot is None:
+                snapshot = pinned[0] = self._latest()
+            if snapshot is None or snapshot.book is self:
+                return snapshot
+        return self._latest()
+
+    def _latest(self):
+        snapshot = self._snapshot
+        if snapshot is not None and self._watcher is not None:
+            return snapshot
+        stamp = self._stat()
+        if stamp is None:
+            return snapshot
+        if snapshot is None:
+            return self.reload(stamp)
+        if stamp != self._stamp:
+            # One request reads the changed file; the others go on with the
+            # current snapshot rather than queue behind it
+            if not self._lock.acquire(blocking=False):
+                return snapshot
+            try:
+                snapshot = self.reload(stamp)
+            finally:
+                self._lock.release()
+        return snapshot
+
+    def sheet(self, name):
+        snapshot = self.snapshot()
+        if snapshot is None:
+            raise FileNotFoundError('Cannot read workbook %s' % self.path)
+        return snapshot.sheet(name)
+
+    def version(self):
+        # Content key of the data in use (the pinned or current snapshot)
+        snapshot = self.snapshot()
+        return snapshot.version if snapshot is not None else None
+
+    def watch(self, interval=2.0, validate=None):
+        # Reload in a background thread, polling the file every interval
+        # seconds; a change is only read once the file has stopped changing
+        # for one interval, so a save in progress is never parsed.
+        if validate is not None:
+            self.validate = validate
+        if self._watcher is None:
+            self._watcher = _Watcher(self, interval)
+            self._watcher.start()
+        return self._watcher
+
+    def stop(self):
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stopped.set()
+
+    def _forked(self):
+        # The watcher thread does not exist in a forked child; it reloads
+        # inline until it starts a watcher of its own
+        self._watcher = None
+
+    def stats(self):
+        snapshot = self._snapshot
+        sheets = snapshot.sheets if snapshot is not None else {}
+        return {
+            'path': self.path,
+            'key': snapshot.version if snapshot is not None else None,
+            'source': snapshot.source if snapshot is not None else None,
+            'load_seconds': snapshot.load_seconds if snapshot is not None else None,
+            'loaded_at': snapshot.loaded_at if snapshot is not None else None,
+            'sheets': sorted(sheets),
+            'cache_bytes': sum(sheet.values.nbytes for sheet in sheets.values()),
+            'watching': self._watcher is not None,
+            'reloads': self.reloads,
+            'rejected': self.rejected,
+            'last_error': self.last_error,
+        }
+
+
+class _Watcher(threading.Thread):
+    def __init__(self, book, interval):
+        super().__init__(name='workbook-watcher', daemon=True)
+        self.book = book
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        book = self.book
+        pending = None
+        while not self.stopped.wait(self.interval):
+            stamp = book._stat()
+            # Nothing loaded yet: the first request that needs the data loads it
+            if book._snapshot is None or stamp is None or stamp == book._stamp:
+                pending = None
+            elif stamp != pending:
+                pending = stamp  # changed: wait for it to settle
+            else:
+                try:
+                    book.reload(stamp)
+                except Exception:
+                    log.exception('Could not load %s', book.path)
+                    book._stamp = stamp
+                pending = None
+
+
+# Snapshot pinned by the current request: a one-item list filled with the
+# current snapshot the first time data is read, so requests that never touch
+# the workbook never load it
+_pinned = contextvars.ContextVar('workbook_snapshot', default=None)
+
+
+def pin(snapshot=None):
+    # Called at the start of a request: every read until unpin() sees one snapshot
+    _pinned.set([snapshot])
+
+
+def unpin():
+    _pinned.set(None)
+
+
+@contextlib.contextmanager
+def pinned(snapshot):
+    token = _pinned.set([snapshot])
+    try:
+        yield snapshot
+    finally:
+        _pinned.reset(token)
+
+
+# Module level workbook used by the app; configured by the entry point
+_default = None
+_watching = None
+_validate = None
+
+
+def configure(path, sheets=(), cache_dir=None, validate=None):
+    # validate: callable(snapshot) run on every version before it is used,
+    # whether the watcher or a request finds it; kept for any workbook
+    # configured after this one
+    global _default, _validate
+    if validate is not None:
+        _validate = validate
+    if _default is not None:
+        _default.stop()
+    _default = Workbook(path, sheets=sheets, cache_dir=cache_dir)
+    _default.validate = _validate
+    if _watching is not None:
+        _default.watch(*_watching)
+    return _default
+
+
+def watch(interval=2.0, validate=None):
+    # Watch the configured workbook, and any configured after it
+    global _watching, _validate
+    if validate is not None:
+        _validate = validate
+    _watching = (interval, validate)
+    return default().watch(interval, validate)
+
+
+def _after_fork():
+    if _default is not None:
+        _default._forked()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def default():
+    if _default is None:
+        raise RuntimeError('workbook.configure() has not been called')
+    return _default
+
+
+def snapshot():
+    return default().snapshot() if _default is not None else None
+
+
+def sheet(name):
+    return default().sheet(name)
+
+
+def stats():
+    return default().stats() if _default is not None else {}
+
+
+def version():
+    return default().version() if _default is not None else None
+
+
+if __name__ == '__main__':
+    # Pre-build the cache: python workbook.py sizing.xlsx [SHEET ...]
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    book = Workbook(sys.argv[1], sheets=sys.argv[2:] or ('DEV',))
+    for name in book.sheet_names:
+        book.sheet(name)
+    print(json.dumps(book.stats(), indent=2))
@@ -0,0 +1,52 @@
+"""Production entry point for a prefork WSGI server.
+
+create_app() is the application factory.  With gunicorn's preload_app it
+runs once in the master: the workbook sheets are loaded from the binary
+cache, the sizing catalog, engine model and CALCULATOR formulas are built
+and the input form is pre-rendered before any worker is forked, so every
+worker starts with that data already in memory and shares its pages
+copy-on-write instead of re-reading sizing.xlsx.
+
+    gunicorn -c gunicorn.conf.py 'wsgi:create_app()'
+"""
+import gc
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+def preload(app_module):
+    # Load everything the request path reads so forked workers inherit it
+    import catalog
+    import engine
+    import formula
+    import workbook
+
+    start = time.perf_counter()
+    book = workbook.default()
+    try:
+        for name in book.sheet_names:
+            book.sheet(name)
+    except (OSError, KeyError) as exc:
+        log.warning('Could not preload %s: %s', book.path, exc)
+    catalog.current()
+    catalog.profile_set()
+    try:
+        formula.current()
+    except formula.FormulaError as exc:
+        log.warning('Could not compile the workbook formulas: %s', exc)
+    app_module.index_page()
+    app_module.calculate_requirements(dict(engine.INPUT_DEFAULTS))
+    # Move everything allocated so far out of the collector's reach: a
+    # collection in a worker would otherwise touch (and copy) every shared page
+    gc.collect()
+    gc.freeze()
+    log.info('Preloaded %s in %.3fs', book.path, time.perf_counter() - start)
+
+
+def create_app():
+    import app
+
+    preload(app)
+    return app.app